@@ -0,0 +1,231 @@
+import math
+import re
+import threading
+
+from flask import g, jsonify, request
+
+from microsetta_public_api._metrics import metrics
+
+# endpoints that hold a thread, and memory, for a long time. Group summaries
+#  cost more the more samples they are asked for. Queued requests hold a
+#  worker thread while they wait, so queues are kept short
+DEFAULT_LIMITS = (
+    {'name': 'taxonomy-group', 'pattern': r'/taxonomy/(present/)?group/',
+     'max_concurrent': 8, 'max_queue': 4, 'queue_timeout': 5,
+     'cost': 'sample_ids', 'samples_per_unit': 1000},
+    {'name': 'alpha-group', 'pattern': r'/diversity/alpha/group/',
+     'max_concurrent': 8, 'max_queue': 4, 'queue_timeout': 5,
+     'cost': 'sample_ids', 'samples_per_unit': 5000},
+    {'name': 'plotting', 'pattern': r'/plotting/',
+     'max_concurrent': 4, 'max_queue': 4, 'queue_timeout': 5},
+    {'name': 'empress', 'pattern': r'/taxonomy/empress/',
+     'max_concurrent': 2, 'max_queue': 2, 'queue_timeout': 5},
+)
+# the number of requests that can wait across all limits
+DEFAULT_MAX_WAITING = 8
+
+
+def sample_ids_cost(samples_per_unit):
+    """Estimates the cost of a request by its number of sample IDs
+
+    A request costs one unit, plus one per `samples_per_unit` of the sample
+    IDs listed in its JSON body.
+    """
+    def cost():
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return 1
+        sample_ids = body.get('sample_ids')
+        if not isinstance(sample_ids, list):
+            return 1
+        return 1 + len(sample_ids) // samples_per_unit
+    return cost
+
+
+def _unit_cost():
+    return 1
+
+
+class Limit:
+    """Bounds the total cost of concurrent requests to some endpoints
+
+    Requests that do not fit are queued until enough of the requests ahead
+    of them finish, unless the queue is full or they wait for longer than
+    `queue_timeout`, in which case they are rejected. A queued request
+    blocks the thread serving it while it waits.
+
+    Parameters
+    ----------
+    name : str
+        Labels the limit in responses and metrics.
+    pattern : str
+        A regular expression, which matches (`re.search`) the path of the
+        requests that are subject to the limit.
+    max_concurrent : int
+        The total cost of the requests that run at once. A request that
+        costs more runs alone.
+    max_queue : int
+        The number of requests that can wait to run.
+    queue_timeout : float
+        The number of seconds a request waits to run before it is rejected.
+    cost : callable, optional
+        Estimates the cost of the current request, defaults to 1.
+    """
+
+    def __init__(self, name, pattern, max_concurrent, max_queue=0,
+                 queue_timeout=0, cost=None):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.cost = _unit_cost if cost is None else cost
+        self.in_use = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config):
+        cost = None
+        if config.get('cost') == 'sample_ids':
+            cost = sample_ids_cost(config.get('samples_per_unit', 1000))
+        elif config.get('cost') is not None:
+            raise ValueError(f"Unknown admission cost: '{config['cost']}'. "
+                             f"Expected 'sample_ids'.")
+        return cls(config['name'], config['pattern'],
+                   config.get('max_concurrent', 4),
+                   max_queue=config.get('max_queue', 0),
+                   queue_timeout=config.get('queue_timeout', 0),
+                   cost=cost)
+
+    def matches(self, path):
+        return self.pattern.search(path) is not None
+
+    def acquire(self, cost, waiters=None):
+        """Waits for a request to fit within the limit
+
+        Parameters
+        ----------
+        cost : int
+            The cost of the request.
+        waiters : threading.Semaphore, optional
+            Bounds the number of requests that wait across several limits.
+            The request is rejected as if the queue was full if it would
+            wait and none is available.
+
+        Returns
+        -------
+        str or None
+            None if the request was admitted, otherwise why it was not,
+            'queue_full' or 'timeout'.
+
+        """
+        cost = min(cost, self.max_concurrent)
+        with self._condition:
+            if self.waiting == 0 and self._fits(cost):
+                self.in_use += cost
+                return None
+            if self.waiting >= self.max_queue:
+                return 'queue_full'
+            if waiters is not None and not waiters.acquire(blocking=False):
+                return 'queue_full'
+            self.waiting += 1
+            try:
+                admitted = self._condition.wait_for(
+                    lambda: self._fits(cost), timeout=self.queue_timeout)
+            finally:
+                self.waiting -= 1
+                if waiters is not None:
+                    waiters.release()
+            if not admitted:
+                return 'timeout'
+            self.in_use += cost
+            return None
+
+    def release(self, cost):
+        cost = min(cost, self.max_concurrent)
+        with self._condition:
+            self.in_use -= cost
+            self._condition.notify_all()
+
+    def _fits(self, cost):
+        return self.in_use + cost <= self.max_concurrent
+
+
+class AdmissionControl:
+    """Rejects requests to heavy endpoints that the server has no room for
+
+    Requests that match a limit run once their cost fits within it, so that
+    a spike of, e.g., plots cannot occupy every worker thread and requests
+    to cheap endpoints keep their latency. Requests that do not fit in time
+    get a 429 (the queue is full) or a 503 (they waited too long), with a
+    Retry-After header. As waiting requests hold a worker thread, the total
+    number of them is bounded across all limits, and should be well below
+    the number of worker threads.
+
+    Parameters
+    ----------
+    config : dict, optional
+        Settings, usually ``SERVER_CONFIG['admission']``. Recognized keys:
+        ``enabled`` (bool, default False), ``retry_after`` (seconds, default
+        1), ``max_waiting`` (the number of requests that can wait across
+        all limits, default `DEFAULT_MAX_WAITING`) and ``limits`` (a list of
+        the arguments of `Limit`, where ``cost`` is 'sample_ids' to estimate
+        it with `sample_ids_cost` and ``samples_per_unit`` its argument,
+        defaults to `DEFAULT_LIMITS`). The first limit that matches a
+        request applies to it.
+
+    Examples
+    --------
+    >>> app = connexion.FlaskApp(__name__)
+    >>> AdmissionControl({'enabled': True}).init_app(app.app)
+
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = dict()
+        self.enabled = config.get('enabled', False)
+        self.retry_after = config.get('retry_after', 1)
+        self.max_waiting = config.get('max_waiting', DEFAULT_MAX_WAITING)
+        self._waiters = threading.Semaphore(self.max_waiting)
+        self.limits = [Limit.from_config(limit)
+                       for limit in config.get('limits', DEFAULT_LIMITS)]
+
+    def init_app(self, app):
+        if self.enabled and self.limits:
+            app.before_request(self.before_request)
+            app.teardown_request(self.teardown_request)
+        return app
+
+    def limit_for(self, path):
+        for limit in self.limits:
+            if limit.matches(path):
+                return limit
+        return None
+
+    def before_request(self):
+        limit = self.limit_for(request.path)
+        if limit is None:
+            return None
+        cost = limit.cost()
+        reason = limit.acquire(cost, waiters=self._waiters)
+        if reason is None:
+            g._admission = (limit, cost)
+            return None
+        if metrics.enabled:
+            metrics.admission_rejections.inc(limit.name, reason)
+        code = 429 if reason == 'queue_full' else 503
+        response = jsonify(text=f"The server is busy with '{limit.name}' "
+                                f"requests, retry later.",
+                           code=code)
+        response.status_code = code
+        response.headers['Retry-After'] = str(math.ceil(self.retry_after))
+        return response
+
+    @staticmethod
+    def teardown_request(exc=None):
+        admitted = g.pop('_admission', None)
+        if admitted is not None:
+            limit, cost = admitted
+            limit.release(cost)
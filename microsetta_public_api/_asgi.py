@@ -0,0 +1,185 @@
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+try:
+    from asgiref.sync import async_to_sync, sync_to_async
+except ImportError:
+    async_to_sync = sync_to_async = None
+
+# endpoints that render plots, summarize groups of samples or run several
+#  operations, which can hold a thread for seconds
+DEFAULT_HEAVY = (
+    r'/plotting/',
+    r'/taxonomy/(present/)?group/',
+    r'/taxonomy/empress/',
+    r'/batch$',
+    r'/admin/profile$',
+)
+
+
+def _environ(scope, body):
+    """Builds the WSGI environ of an ASGI HTTP request"""
+    script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+    path_info = scope['path'].encode('utf8').decode('latin1')
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        # the whole body has been received, so it can be read to its end
+        #  whether or not it was sent with a Content-Length
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client') is not None:
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin1')
+        if key in environ:
+            environ[key] += ',' + value
+        else:
+            environ[key] = value
+    return environ
+
+
+def _run_wsgi_app(app, environ, send):
+    """Runs a WSGI app and sends its response as ASGI messages
+
+    Parameters
+    ----------
+    app : callable
+        The WSGI app.
+    environ : dict
+        The WSGI environ of the request.
+    send : callable
+        Sends an ASGI message, from the thread running the app.
+    """
+    response = dict()
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info is not None and response.get('started'):
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['start'] = {
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin1'),
+                         value.encode('latin1'))
+                        for name, value in headers],
+        }
+
+    def start():
+        if not response.get('started'):
+            response['started'] = True
+            send(response['start'])
+
+    result = app(environ, start_response)
+    try:
+        for output in result:
+            if output:
+                start()
+                send({'type': 'http.response.body', 'body': output,
+                      'more_body': True})
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    start()
+    send({'type': 'http.response.body'})
+
+
+class ASGIAdapter:
+    """Serves a WSGI app, e.g., a Flask app, to an ASGI server
+
+    Requests are received and responses sent on the event loop, while the
+    app runs on one of two thread pools. Requests to heavy endpoints (e.g.,
+    plots) run on a small pool, so that however many of them are in
+    flight, requests to cheap endpoints (e.g., existence checks) run on
+    their own pool without queuing behind them.
+
+    Parameters
+    ----------
+    app : callable
+        The WSGI app.
+    heavy : iterable of str, optional
+        Regular expressions, any of which matches (`re.search`) the path of
+        a heavy request. Defaults to `DEFAULT_HEAVY`.
+    heavy_workers : int
+        The number of threads that run heavy requests.
+    cheap_workers : int
+        The number of threads that run other requests.
+    """
+
+    def __init__(self, app, heavy=None, heavy_workers=4, cheap_workers=32):
+        if sync_to_async is None:
+            raise ImportError("Serving with ASGI requires asgiref, install "
+                              "it with `pip install -e .[asgi]`.")
+        self.app = app
+        if heavy is None:
+            heavy = DEFAULT_HEAVY
+        self.heavy = [re.compile(pattern) for pattern in heavy]
+        self.heavy_executor = ThreadPoolExecutor(
+            max_workers=heavy_workers, thread_name_prefix='asgi-heavy')
+        self.cheap_executor = ThreadPoolExecutor(
+            max_workers=cheap_workers, thread_name_prefix='asgi-cheap')
+
+    def is_heavy(self, path):
+        return any(pattern.search(path) for pattern in self.heavy)
+
+    def executor_for(self, path):
+        if self.is_heavy(path):
+            return self.heavy_executor
+        return self.cheap_executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported scope type: '{scope['type']}'")
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                # e.g., the client disconnected before sending its body
+                if message['type'] != 'http.request':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            run = sync_to_async(_run_wsgi_app, thread_sensitive=False,
+                                executor=self.executor_for(scope['path']))
+            await run(self.app, _environ(scope, body), async_to_sync(send))
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def shutdown(self):
+        self.heavy_executor.shutdown(wait=False)
+        self.cheap_executor.shutdown(wait=False)
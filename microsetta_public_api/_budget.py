@@ -0,0 +1,140 @@
+import logging
+import threading
+
+from microsetta_public_api._loading import resource_units
+from microsetta_public_api.utils._memory import estimate_size
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBudget:
+    """Keeps the estimated size of loaded resources within a budget
+
+    When the loaded resources exceed the budget, reloadable resources
+    (elements with a loader, see `Element.set_loader`) are evicted, least
+    recently used first, until they fit. Evicted resources are loaded again
+    on their next use.
+
+    Parameters
+    ----------
+    root : DictElement
+        The served resources.
+    element_types : iterable of type
+        The element types that hold data.
+    tracker : LoadTracker
+        Provides the sizes estimated at load time, and is told about
+        evictions.
+    budget : int
+        The budget in bytes.
+    interval : float
+        Seconds between checks when running in the background.
+    min_idle : float
+        Resources used within this many seconds are not evicted, as they
+        are likely in use and would be loaded again right away.
+    """
+
+    def __init__(self, root, element_types, tracker, budget, interval=30.,
+                 min_idle=60.):
+        self.root = root
+        self.element_types = list(element_types)
+        self.tracker = tracker
+        self.budget = budget
+        self.interval = interval
+        self.min_idle = min_idle
+        self.evictions = 0
+        # sizes estimated here, by path and id of the data, for resources
+        # the tracker did not estimate
+        self._estimates = dict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sizes(self):
+        """Estimates the size of each loaded resource
+
+        Returns
+        -------
+        list of (tuple, Element, int)
+            The path, element and size in bytes of each loaded resource.
+
+        """
+        estimated = {unit['resource']: unit['nbytes'] for unit in
+                     self.tracker.summary()['resources']}
+        sizes = []
+        estimates = dict()
+        for path, element in resource_units(self.root, self.element_types):
+            # _data rather than data, which would load lazy elements
+            data = element._data
+            if data is None:
+                continue
+            nbytes = estimated.get('/'.join(str(key) for key in path))
+            if nbytes is None:
+                key = (path, id(data))
+                nbytes = self._estimates.get(key)
+                if nbytes is None:
+                    nbytes = estimate_size(data)
+                estimates[key] = nbytes
+            sizes.append((path, element, nbytes))
+        self._estimates = estimates
+        return sizes
+
+    def enforce(self):
+        """Evicts resources until the loaded resources fit the budget
+
+        Returns
+        -------
+        list of tuple
+            The paths of the evicted resources.
+
+        """
+        with self._lock:
+            sizes = self.sizes()
+            total = sum(nbytes for _, _, nbytes in sizes)
+            evicted = []
+            candidates = sorted(
+                ((path, element, nbytes) for path, element, nbytes in sizes
+                 if element.reloadable),
+                key=lambda x: x[1].last_access or 0)
+            for path, element, nbytes in candidates:
+                if total <= self.budget:
+                    break
+                if element.evict(max_idle=self.min_idle):
+                    self.tracker.defer(path)
+                    evicted.append(path)
+                    total -= nbytes
+            self.evictions += len(evicted)
+        if evicted:
+            logger.info(f'Evicted {len(evicted)} resource(s) to stay within '
+                        f'the memory budget of {self.budget} bytes')
+        if total > self.budget:
+            logger.warning(f'Loaded resources use {total} bytes, which '
+                           f'exceeds the memory budget of {self.budget} '
+                           f'bytes, and no more can be evicted')
+        return evicted
+
+    def summary(self):
+        sizes = self.sizes()
+        return {
+            'budget_bytes': self.budget,
+            'loaded_bytes': sum(nbytes for _, _, nbytes in sizes),
+            'evictions': self.evictions,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run,
+                                        name='memory-budget', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.enforce()
+
+
+def get_memory_budget(app):
+    return app.extensions.get('memory_budget')
@@ -0,0 +1,211 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _gzip(data, level):
+    return gzip.compress(data, compresslevel=level)
+
+
+def _brotli(data, level):
+    return brotli.compress(data, quality=level)
+
+
+def _zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# ordered by server preference, used to break ties in client quality values
+_CODECS = OrderedDict()
+if brotli is not None:
+    _CODECS['br'] = (_brotli, 5)
+if zstandard is not None:
+    _CODECS['zstd'] = (_zstd, 3)
+_CODECS['gzip'] = (_gzip, 6)
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'image/svg+xml',
+    'text/css',
+    'text/csv',
+    'text/html',
+    'text/plain',
+}
+
+
+class CompressedBodyCache:
+    """A thread-safe LRU of compressed payloads bounded by their total size
+
+    Entries are keyed on the encoding and a digest of the uncompressed body,
+    so a payload is compressed once per distinct content (i.e., once per
+    version of the underlying resource) no matter how many times, or through
+    which route, it is requested.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The maximum number of compressed bytes to retain.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
+
+
+class ResponseCompression:
+    """Negotiates and applies Content-Encoding to outgoing responses
+
+    Parameters
+    ----------
+    config : dict, optional
+        Settings, usually ``SERVER_CONFIG['compression']``. Recognized keys:
+        ``enabled`` (bool, default True), ``min_size`` (bytes, responses
+        smaller than this are sent as-is, default 1024), ``cache_size_mb``
+        (size of the precompressed payload cache, 0 disables it, default
+        64), ``levels`` (mapping of encoding to compression level) and
+        ``encodings`` (the encodings to offer, in order of preference).
+
+    Examples
+    --------
+    >>> app = connexion.FlaskApp(__name__)
+    >>> ResponseCompression({'min_size': 500}).init_app(app.app)
+
+    """
+    def __init__(self, config=None):
+        if config is None:
+            config = dict()
+        self.enabled = config.get('enabled', True)
+        self.min_size = config.get('min_size', 1024)
+        levels = config.get('levels', dict())
+        encodings = config.get('encodings', list(_CODECS))
+        self.codecs = OrderedDict(
+            (name, (_CODECS[name][0], levels.get(name, _CODECS[name][1])))
+            for name in encodings if name in _CODECS
+        )
+        cache_bytes = int(config.get('cache_size_mb', 64) * 1024 ** 2)
+        self.cache = CompressedBodyCache(cache_bytes) if cache_bytes \
+            else None
+
+    def init_app(self, app):
+        if self.enabled and self.codecs:
+            app.after_request(self.after_request)
+        return app
+
+    def select_encoding(self, accept_encodings):
+        """Pick the best supported encoding for an Accept-Encoding header
+
+        Parameters
+        ----------
+        accept_encodings : werkzeug.datastructures.Accept
+            The parsed Accept-Encoding header of the request.
+
+        Returns
+        -------
+        str or None
+            The chosen encoding, or None if the response should be sent
+            uncompressed.
+
+        """
+        best, best_quality = None, 0
+        for name in self.codecs:
+            quality = accept_encodings.quality(name)
+            if quality > best_quality:
+                best, best_quality = name, quality
+        return best
+
+    def _is_compressible(self, response):
+        return (200 <= response.status_code < 300 and
+                response.status_code != 204 and
+                not response.direct_passthrough and
+                not response.is_streamed and
+                'Content-Encoding' not in response.headers and
+                response.mimetype in COMPRESSIBLE_MIMETYPES
+                )
+
+    def compress(self, data, encoding, cacheable=True):
+        compressor, level = self.codecs[encoding]
+        if self.cache is None or not cacheable:
+            return compressor(data, level)
+
+        key = (encoding, level, hashlib.blake2b(data,
+                                                digest_size=20).digest())
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = compressor(data, level)
+            self.cache.put(key, compressed)
+        return compressed
+
+    def after_request(self, response):
+        if not self._is_compressible(response):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.select_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        cacheable = request.method in {'GET', 'HEAD'} and \
+            'no-store' not in response.cache_control
+        compressed = self.compress(data, encoding, cacheable=cacheable)
+        if len(compressed) >= len(data):
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,332 @@
+import logging
+import threading
+import time
+from time import perf_counter
+
+from microsetta_public_api.config import DictElement, ListElement
+from microsetta_public_api.utils._memory import estimate_size
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LOADING = 'loading'
+LOADED = 'loaded'
+FAILED = 'failed'
+# lazy resources that will be loaded on first access
+DEFERRED = 'deferred'
+
+
+def resource_units(element, element_types, path=()):
+    """Finds the elements of a resource tree that are loaded as a unit
+
+    Parameters
+    ----------
+    element : Element
+        The root of the resource tree.
+    element_types : iterable of type
+        The element types that hold data, e.g.,
+        ``schema.element_map().values()``.
+    path : tuple, optional
+        The path of keys that leads to element.
+
+    Returns
+    -------
+    list of (tuple, Element)
+        The path of keys to, and the element for, each unit.
+
+    """
+    element_types = tuple(set(element_types))
+    units = []
+    if isinstance(element, element_types):
+        units.append((path, element))
+    elif isinstance(element, DictElement):
+        for key, value in element.items():
+            units.extend(resource_units(value, element_types, path + (key,)))
+    elif isinstance(element, ListElement):
+        for i, value in enumerate(element):
+            units.extend(resource_units(value, element_types, path + (i,)))
+    return units
+
+
+class _Unit:
+    def __init__(self, path):
+        self.path = path
+        self.state = PENDING
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.duration = None
+        self.nbytes = None
+        self.error = None
+        # whether data for the unit has been published to the server
+        self.served = False
+        self._start = None
+
+    def to_dict(self):
+        return {
+            'resource': '/'.join(str(key) for key in self.path),
+            'state': self.state,
+            'served': self.served,
+            'queued_at': self.queued_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'duration_s': self.duration,
+            'nbytes': self.nbytes,
+            'error': self.error,
+        }
+
+
+class LoadTracker:
+    """Tracks the state of resources that are loaded in the background
+
+    Each resource unit (e.g., the alpha diversity or metadata of a dataset)
+    moves from pending, to loading, to either loaded or failed. An update
+    covers the units of one resource tree, and its units are marked as
+    served once the update has been published.
+
+    Parameters
+    ----------
+    estimate_memory : bool
+        Whether to estimate the size of the data held by each unit once it
+        has loaded.
+    """
+
+    def __init__(self, estimate_memory=True):
+        self.estimate_memory = estimate_memory
+        self._units = dict()
+        self._in_progress = 0
+        self._started = False
+        self._lock = threading.Lock()
+
+    def begin(self, units):
+        """Registers the units of an update as pending
+
+        Parameters
+        ----------
+        units : list of (tuple, Element)
+            As returned by `resource_units`.
+
+        Returns
+        -------
+        list of tuple
+            The paths of the units in the update, to pass to `end`.
+
+        """
+        paths = [path for path, _ in units]
+        with self._lock:
+            self._started = True
+            self._in_progress += 1
+            for path in paths:
+                unit = _Unit(path)
+                previous = self._units.get(path)
+                if previous is not None:
+                    unit.served = previous.served
+                self._units[path] = unit
+        return paths
+
+    def start(self, path):
+        with self._lock:
+            unit = self._units.get(path)
+            if unit is None:
+                return
+            unit.state = LOADING
+            unit.started_at = time.time()
+            unit._start = perf_counter()
+
+    def finish(self, path, data=None):
+        nbytes = estimate_size(data) if self.estimate_memory else None
+        with self._lock:
+            unit = self._units.get(path)
+            if unit is None:
+                return
+            unit.state = LOADED
+            unit.finished_at = time.time()
+            if unit._start is not None:
+                unit.duration = perf_counter() - unit._start
+            unit.nbytes = nbytes
+
+    def defer(self, path):
+        with self._lock:
+            unit = self._units.get(path)
+            if unit is not None:
+                unit.state = DEFERRED
+                unit.nbytes = None
+
+    def fail(self, path, exc):
+        with self._lock:
+            unit = self._units.get(path)
+            if unit is None:
+                return
+            unit.state = FAILED
+            unit.finished_at = time.time()
+            if unit._start is not None:
+                unit.duration = perf_counter() - unit._start
+            unit.error = f'{type(exc).__name__}: {exc}'
+
+    def end(self, paths, published):
+        """Marks an update as complete
+
+        Parameters
+        ----------
+        paths : list of tuple
+            As returned by `begin`.
+        published : bool
+            Whether the data of the update is now being served.
+
+        """
+        with self._lock:
+            self._in_progress -= 1
+            if published:
+                for path in paths:
+                    self._units[path].served = True
+
+    def remove(self, paths):
+        """Stops tracking units that are no longer configured"""
+        with self._lock:
+            for path in paths:
+                self._units.pop(path, None)
+
+    @property
+    def ready(self):
+        """Whether every known resource is being served"""
+        with self._lock:
+            return self._started and \
+                all(unit.served for unit in self._units.values())
+
+    def summary(self):
+        with self._lock:
+            units = [unit.to_dict() for unit in self._units.values()]
+            in_progress = self._in_progress
+            started = self._started
+        counts = {state: 0 for state in (PENDING, LOADING, LOADED, FAILED,
+                                         DEFERRED)}
+        for unit in units:
+            counts[unit['state']] += 1
+
+        if not started:
+            status = 'not_started'
+        elif in_progress:
+            status = 'loading'
+        elif counts[FAILED]:
+            status = 'failed'
+        else:
+            status = 'loaded'
+
+        return {
+            'status': status,
+            'ready': started and all(unit['served'] for unit in units),
+            'updates_in_progress': in_progress,
+            'counts': counts,
+            'nbytes': sum(unit['nbytes'] or 0 for unit in units),
+            'resources': units,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._units = dict()
+            self._in_progress = 0
+            self._started = False
+
+
+class TrackingVisitor:
+    """Wraps a visitor so the resource units it visits are tracked
+
+    Elements that are not a known unit are passed through to the wrapped
+    visitor untouched.
+
+    Parameters
+    ----------
+    visitor : ConfigElementVisitor
+        The visitor that loads data.
+    tracker : LoadTracker
+        The tracker to record progress in.
+    units : list of (tuple, Element)
+        The units being loaded.
+    """
+
+    def __init__(self, visitor, tracker, units):
+        self._visitor = visitor
+        self._tracker = tracker
+        self._paths = {id(element): path for path, element in units}
+
+    def defer(self, element):
+        """Records that loading a unit was deferred, e.g., by a LazyVisitor
+        """
+        path = self._paths.get(id(element))
+        if path is not None:
+            self._tracker.defer(path)
+
+    def __getattr__(self, name):
+        method = getattr(self._visitor, name)
+        if not name.startswith('visit_'):
+            return method
+
+        def visit(element):
+            path = self._paths.get(id(element))
+            if path is None:
+                return method(element)
+            self._tracker.start(path)
+            try:
+                result = method(element)
+            except Exception as e:
+                self._tracker.fail(path, e)
+                raise
+            self._tracker.finish(path, element.data)
+            return result
+        return visit
+
+
+class IdleEvictor:
+    """Periodically drops the data of lazy resources that have gone unused
+
+    Parameters
+    ----------
+    root : DictElement
+        The served resources.
+    element_types : iterable of type
+        The element types that hold data.
+    tracker : LoadTracker
+        Evicted resources are reported as deferred.
+    max_idle : float
+        Seconds without access after which a lazy resource is evicted.
+    interval : float
+        Seconds between checks.
+    """
+
+    def __init__(self, root, element_types, tracker, max_idle, interval=60.):
+        self.root = root
+        self.element_types = list(element_types)
+        self.tracker = tracker
+        self.max_idle = max_idle
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run,
+                                        name='idle-evictor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.evict()
+
+    def evict(self):
+        """Evicts idle resources, returning the paths that were evicted"""
+        evicted = []
+        for path, element in resource_units(self.root, self.element_types):
+            if element.evict(self.max_idle):
+                self.tracker.defer(path)
+                evicted.append(path)
+        if evicted:
+            logger.info(f'Evicted {len(evicted)} idle resource(s)')
+        return evicted
+
+
+tracker = LoadTracker()
@@ -1,31 +1,11 @@
 import logging
-from functools import wraps
-from time import time
 import os
 
+# timeit is re-exported here so existing imports keep working, its
+# measurements are recorded by microsetta_public_api._metrics
+from microsetta_public_api._metrics import timeit  # noqa: F401
+
 FORMAT = '%(asctime)s PID={pid} %(levelname)s: %(message)s '
 logging.basicConfig(level=logging.INFO,
                     format=FORMAT.format(pid=os.getpid()))
 logger = logging.getLogger(__name__)
-
-
-class timeit:
-
-    def __init__(self, msg):
-        self.msg = msg
-
-    def __call__(self, f):
-        @wraps(f)
-        def wrapper(*args, **kwargs):
-            logger.info('%(message)s Start.',
-                        {'message': self.msg},
-                        )
-            start = time()
-            result = f(*args, **kwargs)
-            end = time()
-            total = end - start
-            logger.info('%(message)s Elapsed: %(elapsed)s',
-                        {'message': self.msg, 'elapsed': total},
-                        )
-            return result
-        return wrapper
@@ -0,0 +1,297 @@
+import logging
+import threading
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))
+
+PREFIX = 'mpubapi'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace(
+        '"', r'\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"'
+                          for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_ = None
+
+    def __init__(self, name, help_, labelnames=()):
+        self.name = name
+        self.help = help_
+        self.labelnames = tuple(labelnames)
+        self._children = dict()
+        self._lock = threading.Lock()
+
+    def _check_labels(self, labelvalues):
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"Expected labels {self.labelnames}, got "
+                             f"{labelvalues}")
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}',
+                 f'# TYPE {self.name} {self.type_}']
+        lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, optionally split by labels"""
+    type_ = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        self._check_labels(labelvalues)
+        with self._lock:
+            self._children[labelvalues] = \
+                self._children.get(labelvalues, 0) + amount
+
+    def get(self, *labelvalues):
+        return self._children.get(labelvalues, 0)
+
+    def _render_samples(self):
+        with self._lock:
+            children = sorted(self._children.items())
+        for labelvalues, value in children:
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f'{self.name}{labels} {_format_value(value)}'
+
+
+class Histogram(_Metric):
+    """Observations bucketed by fixed upper bounds, optionally by labels
+
+    Parameters
+    ----------
+    name : str
+        The exposed name of the metric.
+    help_ : str
+        A description of the metric.
+    labelnames : iterable of str
+        The names of the labels observations are split by.
+    buckets : tuple of float
+        The inclusive upper bounds of the buckets. A +Inf bucket is always
+        appended.
+    """
+    type_ = 'histogram'
+
+    def __init__(self, name, help_, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, *labelvalues):
+        self._check_labels(labelvalues)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(labelvalues)
+            if child is None:
+                child = self._children[labelvalues] = \
+                    [[0] * len(self.buckets), 0.0, 0]
+            child[0][index] += 1
+            child[1] += value
+            child[2] += 1
+
+    def get(self, *labelvalues):
+        """Returns a dict with 'buckets', 'sum' and 'count' for the labels"""
+        with self._lock:
+            counts, sum_, count = self._children.get(
+                labelvalues, [[0] * len(self.buckets), 0.0, 0])
+            counts = list(counts)
+        cumulative = []
+        total = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            total += bucket_count
+            cumulative.append((bound, total))
+        return {'buckets': cumulative, 'sum': sum_, 'count': count}
+
+    def _render_samples(self):
+        with self._lock:
+            labelsets = sorted(self._children)
+        for labelvalues in labelsets:
+            summary = self.get(*labelvalues)
+            for bound, count in summary['buckets']:
+                labels = _format_labels(self.labelnames, labelvalues,
+                                        extra=('le', _format_value(bound)))
+                yield f'{self.name}_bucket{labels} {count}'
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f'{self.name}_sum{labels} {_format_value(summary["sum"])}'
+            yield f'{self.name}_count{labels} {summary["count"]}'
+
+
+class MetricsRegistry:
+    """In-process store of the server's instrumentation
+
+    Recording is a no-op while ``enabled`` is False, so instrumented code
+    only pays for an attribute lookup when metrics are turned off.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.function_duration = Histogram(
+            f'{PREFIX}_function_duration_seconds',
+            'Latency of instrumented functions.',
+            ['function'],
+        )
+        self.function_errors = Counter(
+            f'{PREFIX}_function_errors_total',
+            'Exceptions raised by instrumented functions.',
+            ['function'],
+        )
+        self.request_duration = Histogram(
+            f'{PREFIX}_request_duration_seconds',
+            'Latency of HTTP requests by endpoint.',
+            ['method', 'endpoint'],
+        )
+        self.requests = Counter(
+            f'{PREFIX}_requests_total',
+            'HTTP requests by endpoint and status code.',
+            ['method', 'endpoint', 'status'],
+        )
+        self.response_size = Histogram(
+            f'{PREFIX}_response_size_bytes',
+            'Size of HTTP response bodies by endpoint.',
+            ['method', 'endpoint'],
+            buckets=SIZE_BUCKETS,
+        )
+        self.reload_duration = Histogram(
+            f'{PREFIX}_resource_reload_duration_seconds',
+            'Duration of resource reloads by trigger and outcome.',
+            ['trigger', 'outcome'],
+        )
+        self.admission_rejections = Counter(
+            f'{PREFIX}_admission_rejected_total',
+            'Requests rejected by admission control by limit and reason.',
+            ['limit', 'reason'],
+        )
+        self._metrics = [self.function_duration, self.function_errors,
+                         self.request_duration, self.requests,
+                         self.response_size, self.reload_duration,
+                         self.admission_rejections,
+                         ]
+
+    def register(self, metric):
+        """Adds an additional metric to the exposition"""
+        self._metrics.append(metric)
+        return metric
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+    def render(self):
+        """Renders all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+class timeit:
+    """Records the latency, call count and errors of the decorated function
+
+    Parameters
+    ----------
+    msg : str
+        The name the function's measurements are recorded under.
+
+    Examples
+    --------
+    >>> @timeit('load_table')
+    ... def load_table(path):
+    ...     pass
+
+    """
+
+    def __init__(self, msg):
+        self.msg = msg
+
+    def __call__(self, f):
+        msg = self.msg
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return f(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return f(*args, **kwargs)
+            except Exception:
+                metrics.function_errors.inc(msg)
+                raise
+            finally:
+                elapsed = perf_counter() - start
+                metrics.function_duration.observe(elapsed, msg)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('%(message)s Elapsed: %(elapsed)s',
+                                 {'message': msg, 'elapsed': elapsed})
+        return wrapper
+
+
+class RequestMetrics:
+    """Records per-endpoint latency, status codes and payload sizes
+
+    Endpoints are labelled by their URL rule (e.g.,
+    ``/results-api/dataset/<dataset>/taxonomy/available``) rather than the
+    requested path, which keeps the number of label values bounded.
+    """
+
+    def __init__(self, registry=None):
+        if registry is None:
+            registry = metrics
+        self.registry = registry
+
+    def init_app(self, app):
+        if self.registry.enabled:
+            app.before_request(self.before_request)
+            app.after_request(self.after_request)
+        return app
+
+    @staticmethod
+    def before_request():
+        g._metrics_start = perf_counter()
+
+    def after_request(self, response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+        elapsed = perf_counter() - start
+        rule = request.url_rule
+        endpoint = rule.rule if rule is not None else 'unmatched'
+        method = request.method
+        self.registry.request_duration.observe(elapsed, method, endpoint)
+        self.registry.requests.inc(method, endpoint,
+                                   str(response.status_code))
+        size = response.calculate_content_length()
+        if size is not None:
+            self.registry.response_size.observe(size, method, endpoint)
+        return response
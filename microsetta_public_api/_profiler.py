@@ -0,0 +1,123 @@
+import os
+import sys
+import threading
+from collections import Counter
+from time import perf_counter, sleep
+
+MAX_DURATION = 60.
+
+# frames that indicate a thread is blocked rather than consuming CPU
+_IDLE_FUNCTIONS = {
+    'wait', 'select', 'poll', 'epoll', 'accept', 'recv', 'recv_into',
+    'readinto', 'sleep', 'get', 'serve_forever', '_worker', 'acquire',
+    'dowait', 'join',
+}
+_IDLE_MODULES = {'threading.py', 'selectors.py', 'socket.py', 'queue.py',
+                 'socketserver.py', 'thread.py', 'ssl.py'}
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def _is_idle(frame):
+    code = frame.f_code
+    return code.co_name in _IDLE_FUNCTIONS and \
+        os.path.basename(code.co_filename) in _IDLE_MODULES
+
+
+class StackSampler:
+    """A statistical profiler that periodically samples every thread's stack
+
+    Nothing is installed in the interpreter (no trace or profile hooks), the
+    sampler only runs for the requested duration in the calling thread, so
+    there is no cost when it is not in use.
+
+    Examples
+    --------
+    >>> profile = StackSampler().profile(seconds=5, interval=0.01)
+    >>> print(StackSampler.collapse(profile))
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self):
+        return self._lock.locked()
+
+    def profile(self, seconds, interval=0.005, include_idle=False):
+        """Samples the stacks of all other threads
+
+        Parameters
+        ----------
+        seconds : float
+            How long to sample for, capped at 60 seconds.
+        interval : float
+            Seconds between samples.
+        include_idle : bool
+            Whether to keep samples of threads blocked in a wait, e.g., a
+            worker waiting on its queue.
+
+        Returns
+        -------
+        collections.Counter
+            Maps a tuple of frame labels, outermost first and prefixed by
+            the thread name, to the number of samples it was observed in.
+
+        Raises
+        ------
+        ProfilerBusy
+            If another profile is already being collected.
+
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already being collected.")
+        try:
+            return self._sample(min(seconds, MAX_DURATION), interval,
+                                include_idle)
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _sample(seconds, interval, include_idle):
+        own_id = threading.get_ident()
+        counts = Counter()
+        stop = perf_counter() + seconds
+        while perf_counter() < stop:
+            names = {thread.ident: thread.name
+                     for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if not include_idle and _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                counts[tuple(reversed(stack))] += 1
+            sleep(interval)
+        return counts
+
+    @staticmethod
+    def collapse(counts):
+        """Formats samples as collapsed stacks
+
+        The output is one ``frame;frame;frame count`` line per distinct
+        stack, as consumed by flamegraph.pl, speedscope and similar tools.
+        """
+        lines = [';'.join(frame.replace(';', ':') for frame in stack) +
+                 f' {count}' for stack, count in counts.most_common()]
+        return '\n'.join(lines) + '\n'
+
+
+sampler = StackSampler()
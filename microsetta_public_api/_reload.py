@@ -0,0 +1,365 @@
+import os
+import threading
+from copy import deepcopy
+from time import perf_counter
+
+from microsetta_public_api.config import DictElement, LazyVisitor
+from microsetta_public_api._loading import resource_units, TrackingVisitor
+from microsetta_public_api._metrics import metrics
+
+
+def fingerprint(value):
+    """Summarizes a resource configuration, including the files it names
+
+    Files are identified by their path, modification time and size, so a
+    file that is replaced in place changes the fingerprint.
+
+    Parameters
+    ----------
+    value : object
+        A (JSON-like) resource configuration.
+
+    Returns
+    -------
+    object
+        A hashable value that is equal for equal configurations over
+        unchanged files.
+
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), fingerprint(val))
+                            for key, val in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(fingerprint(val) for val in value)
+    if isinstance(value, str) and os.path.isfile(value):
+        stat = os.stat(value)
+        return str(value), stat.st_mtime_ns, stat.st_size
+    if isinstance(value, str):
+        return str(value)
+    return value
+
+
+def _unit_fingerprint(element):
+    if isinstance(element, dict):
+        return {key: fingerprint(value) for key, value in element.items()}
+    return fingerprint(element)
+
+
+def unit_fingerprints(units):
+    """Fingerprints resource units
+
+    Must be called before the units are loaded, as loading can modify the
+    configuration held by an element.
+
+    Parameters
+    ----------
+    units : list of (tuple, Element)
+        As returned by `resource_units`.
+
+    Returns
+    -------
+    dict
+        Maps the path of each unit to its fingerprint.
+
+    """
+    return {path: _unit_fingerprint(element) for path, element in units}
+
+
+class Change:
+    """A resource unit that differs between the loaded and new configuration
+
+    Attributes
+    ----------
+    path : tuple
+        The path of keys to the unit.
+    element : Element or None
+        The unit in the new configuration, None if it was removed.
+    keys : list or None
+        For units whose data is a dict keyed like their configuration
+        (e.g., alpha diversity metrics), the keys that need to be loaded.
+        None if the whole unit needs to be loaded.
+    removed_keys : list
+        Keys that are no longer configured.
+    """
+
+    def __init__(self, path, element, keys=None, removed_keys=()):
+        self.path = path
+        self.element = element
+        self.keys = keys
+        self.removed_keys = list(removed_keys)
+
+    @property
+    def kind(self):
+        if self.element is None:
+            return 'removed'
+        if self.keys is None:
+            return 'full'
+        return 'partial'
+
+    def to_dict(self):
+        return {
+            'resource': '/'.join(str(key) for key in self.path),
+            'kind': self.kind,
+            'keys': self.keys,
+            'removed_keys': self.removed_keys,
+        }
+
+
+class ResourceReloader:
+    """Reloads only the resources whose configuration or files changed
+
+    The fingerprint of each resource unit is recorded when it is loaded.
+    A reload compares a new configuration against those fingerprints,
+    loads what changed in new elements, and then swaps them into the
+    served resources one parent (e.g., dataset) at a time, so requests see
+    either all or none of the changes to a dataset.
+
+    Parameters
+    ----------
+    root : DictElement
+        The served resources, e.g., `resources_alt`.
+    schema : SchemaBase
+        The schema used to build elements from a configuration.
+    visitor_factory : callable
+        Returns the visitor that loads the data of elements.
+    tracker : LoadTracker
+        Records the progress of loads.
+    executor : concurrent.futures.Executor, optional
+        Runs reloads submitted with `submit`.
+    lazy_types : iterable of type, optional
+        Element types that are loaded on first access rather than when
+        reloaded.
+    reloadable : bool
+        Whether loaded elements keep their loader, so that they can be
+        evicted and loaded again.
+    """
+
+    def __init__(self, root, schema, visitor_factory, tracker,
+                 executor=None, lazy_types=(), reloadable=False):
+        self.root = root
+        self.schema = schema
+        self.visitor_factory = visitor_factory
+        self.tracker = tracker
+        self.executor = executor
+        self.lazy_types = tuple(lazy_types)
+        self.reloadable = reloadable
+        self._fingerprints = dict()
+        # serializes reloads
+        self._lock = threading.Lock()
+        # held briefly, so that plans are not blocked by a reload in progress
+        self._fingerprints_lock = threading.Lock()
+
+    @property
+    def element_types(self):
+        return self.schema.element_map().values()
+
+    def record(self, fingerprints):
+        """Records the fingerprints of units that are being served
+
+        Parameters
+        ----------
+        fingerprints : dict
+            As returned by `unit_fingerprints`.
+
+        """
+        with self._fingerprints_lock:
+            self._fingerprints.update(fingerprints)
+
+    def plan(self, config):
+        """Determines which resource units need to be (re)loaded
+
+        Parameters
+        ----------
+        config : dict
+            The new resource configuration.
+
+        Returns
+        -------
+        list of Change
+
+        """
+        new = self.schema.make_elements(deepcopy(config))
+        units = resource_units(new, self.element_types)
+        with self._fingerprints_lock:
+            fingerprints = dict(self._fingerprints)
+        changes = []
+        for path, element in units:
+            new_print = _unit_fingerprint(element)
+            old_print = fingerprints.get(path)
+            if new_print == old_print:
+                continue
+            old_element = self._loaded(path)
+            # lazy elements are replaced as a whole, which defers their load
+            if isinstance(new_print, dict) and isinstance(old_print, dict) \
+                    and not isinstance(element, self.lazy_types) \
+                    and old_element is not None \
+                    and isinstance(old_element.data, dict):
+                keys = [key for key, value in new_print.items()
+                        if old_print.get(key) != value]
+                removed = [key for key in old_print if key not in new_print]
+                changes.append(Change(path, element, keys, removed))
+            else:
+                changes.append(Change(path, element))
+
+        new_paths = {path for path, _ in units}
+        for path in fingerprints:
+            if path not in new_paths:
+                changes.append(Change(path, None))
+        return changes
+
+    def _loaded(self, path):
+        try:
+            return self.root.gets(*path)
+        except KeyError:
+            return None
+
+    def submit(self, config, trigger='manual', on_publish=None):
+        """Plans a reload and runs it in the background
+
+        Parameters
+        ----------
+        config : dict
+            The new resource configuration.
+        trigger : str
+            What caused the reload, recorded in the reload metrics.
+        on_publish : callable, optional
+            Called without arguments once the changes are being served.
+
+        Returns
+        -------
+        list of Change
+            The changes being loaded.
+        concurrent.futures.Future
+            Completes when the changes are being served.
+
+        """
+        changes = self.plan(config)
+        # registered before submitting so that progress is visible at once
+        paths = self.begin(changes)
+        future = self.executor.submit(self.reload, changes, paths, trigger,
+                                      on_publish)
+        return changes, future
+
+    def reload(self, changes, paths=None, trigger='manual', on_publish=None):
+        """Loads and swaps in the changes of a plan
+
+        Parameters
+        ----------
+        changes : list of Change
+            As returned by `plan`.
+        paths : list of tuple, optional
+            As returned by `begin`, if the units were registered with the
+            tracker ahead of time.
+        trigger : str
+            What caused the reload, recorded in the reload metrics.
+        on_publish : callable, optional
+            Called without arguments once the changes are being served,
+            e.g., to commit the configuration they were planned from. It is
+            not called if the reload fails.
+
+        """
+        with self._lock:
+            if paths is None:
+                paths = self.begin(changes)
+            published = False
+            start = perf_counter()
+            try:
+                self._reload(changes)
+                published = True
+                if on_publish is not None:
+                    on_publish()
+            finally:
+                self.tracker.end(paths, published)
+                if metrics.enabled:
+                    metrics.reload_duration.observe(
+                        perf_counter() - start, trigger,
+                        'success' if published else 'failure')
+            self.tracker.remove([change.path for change in changes
+                                 if change.element is None])
+
+    def begin(self, changes):
+        units = [(change.path, change.element) for change in changes
+                 if change.element is not None]
+        return self.tracker.begin(units)
+
+    def _reload(self, changes):
+        visitor = self.visitor_factory()
+        loaded = []
+        for change in changes:
+            if change.element is None:
+                continue
+            element = change.element
+            if change.keys is None:
+                target = element
+            else:
+                target = type(element)({key: element[key]
+                                        for key in change.keys})
+            # fingerprinted before loading, which can modify the element
+            fingerprint_ = _unit_fingerprint(element)
+            target_visitor = TrackingVisitor(visitor, self.tracker,
+                                             [(change.path, target)])
+            if self.lazy_types or self.reloadable:
+                target_visitor = LazyVisitor(target_visitor, self.lazy_types,
+                                             on_defer=target_visitor.defer,
+                                             reloadable=self.reloadable)
+            target.accept(target_visitor)
+            if change.keys is not None:
+                old = self._loaded(change.path)
+                # a copy of the same type, e.g., a ResourceDict
+                data = type(old.data)(old.data)
+                for key in change.removed_keys:
+                    data.pop(key, None)
+                data.update(target.data)
+                if old.reloadable:
+                    # the old loader loads whatever element it is given
+                    element.set_loader(old._loader)
+                element.data = data
+            loaded.append((change, fingerprint_))
+
+        self._swap(changes)
+        with self._fingerprints_lock:
+            for change, fingerprint_ in loaded:
+                self._fingerprints[change.path] = fingerprint_
+            for change in changes:
+                if change.element is None:
+                    self._fingerprints.pop(change.path, None)
+
+    def _swap(self, changes):
+        by_parent = dict()
+        for change in changes:
+            by_parent.setdefault(change.path[:-1], []).append(change)
+
+        for parent_path, parent_changes in by_parent.items():
+            if not parent_path:
+                # top level units are replaced one at a time
+                for change in parent_changes:
+                    self._set(self.root, change)
+                continue
+            parent = self._ensure_parent(parent_path[:-1])
+            current = parent.get(parent_path[-1])
+            new_parent = DictElement() if current is None else \
+                type(current)(current)
+            for change in parent_changes:
+                self._set(new_parent, change)
+            # a single assignment, so that the parent is swapped atomically
+            parent[parent_path[-1]] = new_parent
+
+    @staticmethod
+    def _set(parent, change):
+        key = change.path[-1]
+        if change.element is None:
+            parent.pop(key, None)
+        else:
+            parent[key] = change.element
+
+    def _ensure_parent(self, path):
+        node = self.root
+        for key in path:
+            if key not in node:
+                node[key] = DictElement()
+            node = node[key]
+        return node
+
+
+def get_reloader(app):
+    return app.extensions.get('reloader')
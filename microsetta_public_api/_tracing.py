@@ -0,0 +1,320 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from functools import wraps
+from time import perf_counter
+
+from flask import g, request
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+FORCE_TRACE_HEADER = 'X-Trace'
+# client supplied request IDs are only reused when they are short and
+# printable, others are replaced with a generated one
+_REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+# requests are served start to finish by a single thread, so the active
+# trace and span are tracked per thread
+_local = threading.local()
+
+
+def _get_trace():
+    return getattr(_local, 'trace', None)
+
+
+class Trace:
+    """The spans recorded while serving a single request
+
+    Attributes
+    ----------
+    trace_id : str
+        The request ID the trace belongs to.
+    name : str
+        A description of the request, e.g., 'GET /results-api/...'.
+    spans : list of dict
+        The finished spans. Offsets and durations are in milliseconds
+        relative to the start of the trace.
+    """
+
+    def __init__(self, trace_id, name):
+        self.trace_id = trace_id
+        self.name = name
+        self.timestamp = time.time()
+        self.start = perf_counter()
+        self.duration = None
+        self.attributes = dict()
+        self.spans = []
+        self._next_span_id = 0
+        self._lock = threading.Lock()
+
+    def new_span_id(self):
+        with self._lock:
+            self._next_span_id += 1
+            return self._next_span_id
+
+    def add(self, span_):
+        with self._lock:
+            self.spans.append(span_)
+
+    def finish(self, **attributes):
+        self.duration = perf_counter() - self.start
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'timestamp': self.timestamp,
+            'duration_ms': None if self.duration is None else
+            1000 * self.duration,
+            'attributes': self.attributes,
+            'spans': sorted(self.spans, key=lambda x: x['start_ms']),
+        }
+
+
+class span:
+    """Records a nested span in the active trace, if there is one
+
+    When the current request is not being traced this amounts to a thread
+    local lookup.
+
+    Parameters
+    ----------
+    name : str
+        The name of the span.
+    **attributes
+        Additional information to attach to the span. Values should be JSON
+        serializable.
+
+    Examples
+    --------
+    >>> with span('Taxonomy.get_group', n_ids=len(ids)):
+    ...     group = model.get_group(ids, name='')
+
+    """
+    __slots__ = ('name', 'attributes', '_trace', '_id', '_parent', '_start')
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self._trace = None
+
+    def __enter__(self):
+        trace = _get_trace()
+        if trace is None:
+            return self
+        self._trace = trace
+        self._id = trace.new_span_id()
+        self._parent = getattr(_local, 'span', None)
+        _local.span = self._id
+        self._start = perf_counter()
+        return self
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        trace = self._trace
+        if trace is None:
+            return False
+        end = perf_counter()
+        _local.span = self._parent
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        trace.add({
+            'span_id': self._id,
+            'parent_id': self._parent,
+            'name': self.name,
+            'start_ms': 1000 * (self._start - trace.start),
+            'duration_ms': 1000 * (end - self._start),
+            'attributes': self.attributes,
+        })
+        return False
+
+
+def traced(name=None):
+    """Decorates a function so each call is recorded as a span
+
+    Parameters
+    ----------
+    name : str, optional
+        The name of the span. Defaults to the function's qualified name.
+    """
+    def decorator(f):
+        span_name = name if name is not None else f.__qualname__
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if _get_trace() is None:
+                return f(*args, **kwargs)
+            with span(span_name):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace():
+    return _get_trace()
+
+
+def current_context():
+    """The active trace and span of this thread, see `continued`"""
+    return _get_trace(), getattr(_local, 'span', None)
+
+
+class continued:
+    """Continues a trace on another thread, e.g., one of a pool
+
+    Spans recorded within the block are added to the trace of `context`,
+    as children of its span.
+
+    Parameters
+    ----------
+    context : tuple
+        The trace and span, from `current_context` on the thread that
+        started the trace.
+
+    Examples
+    --------
+    >>> context = current_context()
+    >>> def work():
+    ...     with continued(context):
+    ...         pass
+    >>> executor.submit(work)
+
+    """
+    __slots__ = ('context', '_previous')
+
+    def __init__(self, context):
+        self.context = context
+
+    def __enter__(self):
+        self._previous = current_context()
+        _local.trace, _local.span = self.context
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _local.trace, _local.span = self._previous
+        return False
+
+
+class TraceStore:
+    """Keeps the most recent traces in memory and optionally appends them to
+    a file as JSON lines
+
+    Parameters
+    ----------
+    maxlen : int
+        The number of traces to retain in the ring buffer.
+    path : str, optional
+        A file to append finished traces to.
+    """
+
+    def __init__(self, maxlen=1000, path=None):
+        self._traces = deque(maxlen=maxlen)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def add(self, trace):
+        record = trace.to_dict()
+        with self._lock:
+            self._traces.append(record)
+            if self.path is not None:
+                with open(self.path, 'a') as fp:
+                    fp.write(json.dumps(record) + '\n')
+
+    def list(self, limit=None):
+        with self._lock:
+            traces = list(self._traces)
+        traces.reverse()
+        if limit is not None:
+            traces = traces[:limit]
+        return traces
+
+    def get(self, trace_id):
+        with self._lock:
+            for trace in reversed(self._traces):
+                if trace['trace_id'] == trace_id:
+                    return trace
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+class Tracer:
+    """Assigns request IDs and records sampled requests as traces
+
+    Parameters
+    ----------
+    config : dict, optional
+        Settings, usually ``SERVER_CONFIG['tracing']``. Recognized keys:
+        ``enabled`` (bool, default False), ``sample_rate`` (the fraction of
+        requests to trace, default 1.0), ``buffer_size`` (the number of
+        traces kept in memory, default 1000) and ``export_path`` (a file
+        that traces are appended to as JSON lines). Regardless of
+        ``sample_rate``, requests sent with an ``X-Trace: 1`` header are
+        traced. When tracing is disabled no request hooks are registered.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = dict()
+        self.enabled = config.get('enabled', False)
+        self.sample_rate = config.get('sample_rate', 1.0)
+        self.store = TraceStore(maxlen=config.get('buffer_size', 1000),
+                                path=config.get('export_path'))
+
+    def init_app(self, app):
+        app.extensions['tracer'] = self
+        if not self.enabled:
+            return app
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        return app
+
+    def should_sample(self):
+        if not self.enabled:
+            return False
+        if request.headers.get(FORCE_TRACE_HEADER) == '1':
+            return True
+        return random.random() < self.sample_rate
+
+    def before_request(self):
+        request_id = request.headers.get(REQUEST_ID_HEADER)
+        if request_id is None or \
+                not _REQUEST_ID_PATTERN.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        g.request_id = request_id
+        if self.should_sample():
+            _local.trace = Trace(request_id,
+                                 f'{request.method} {request.path}')
+            _local.span = None
+
+    def after_request(self, response):
+        response.headers[REQUEST_ID_HEADER] = g.get('request_id', '')
+        trace = _get_trace()
+        if trace is not None:
+            trace.attributes['status'] = response.status_code
+        return response
+
+    def teardown_request(self, exc=None):
+        trace = _get_trace()
+        if trace is None:
+            return
+        _local.trace = None
+        _local.span = None
+        rule = request.url_rule
+        trace.finish(endpoint=rule.rule if rule is not None else None)
+        if exc is not None:
+            trace.attributes['error'] = type(exc).__name__
+        self.store.add(trace)
+
+
+def get_tracer(app):
+    return app.extensions.get('tracer')
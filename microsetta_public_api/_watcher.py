@@ -0,0 +1,207 @@
+import logging
+import os
+import threading
+from time import monotonic
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+logger = logging.getLogger(__name__)
+
+
+def referenced_files(config):
+    """Finds the file paths named in a resource configuration
+
+    Parameters
+    ----------
+    config : object
+        A (JSON-like) resource configuration.
+
+    Returns
+    -------
+    set of str
+        Absolute paths. Paths to files that do not currently exist are
+        included as long as their directory does.
+
+    """
+    files = set()
+    stack = [config]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, str):
+            if os.path.isfile(value) or \
+                    (os.sep in value and
+                     os.path.isdir(os.path.dirname(value))):
+                files.add(os.path.abspath(value))
+    return files
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PollingBackend:
+    """Detects changes by periodically comparing file modification times
+
+    Parameters
+    ----------
+    interval : float
+        Seconds between checks.
+    """
+
+    def __init__(self, interval=2.):
+        self.interval = interval
+        self._snapshot = dict()
+
+    def watch(self, files):
+        self._snapshot = {path: _stat(path) for path in files}
+
+    def wait(self, stop):
+        """Blocks for up to one interval, returning whether a file changed
+        """
+        if stop.wait(self.interval):
+            return False
+        changed = False
+        for path, previous in self._snapshot.items():
+            current = _stat(path)
+            if current != previous:
+                self._snapshot[path] = current
+                changed = True
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    """Detects changes with inotify watches on the referenced directories
+
+    Watching the directories, rather than the files, picks up files that are
+    replaced (e.g., moved into place) as well as modified.
+
+    Parameters
+    ----------
+    interval : float
+        The longest to block for before checking whether to stop.
+    """
+
+    def __init__(self, interval=2.):
+        flags = inotify_simple.flags
+        self._mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | \
+            flags.DELETE | flags.MOVED_FROM
+        self.interval = interval
+        self._inotify = inotify_simple.INotify()
+        self._directories = dict()
+        self._files = set()
+
+    def watch(self, files):
+        for wd in self._directories:
+            try:
+                self._inotify.rm_watch(wd)
+            except OSError:
+                pass
+        self._directories = dict()
+        for directory in {os.path.dirname(path) for path in files}:
+            wd = self._inotify.add_watch(directory, self._mask)
+            self._directories[wd] = directory
+        self._files = set(files)
+
+    def wait(self, stop):
+        events = self._inotify.read(timeout=int(1000 * self.interval))
+        return any(os.path.join(self._directories.get(event.wd, ''),
+                                event.name) in self._files
+                   for event in events)
+
+    def close(self):
+        self._inotify.close()
+
+
+class ResourceWatcher:
+    """Reloads resources when the files they were loaded from change
+
+    Changes are debounced, so a reload starts only once the referenced
+    files have stopped changing, e.g., after a pipeline has finished
+    writing a batch of artifacts. Reloads go through the reloader, so only
+    the resources whose files changed are loaded.
+
+    Parameters
+    ----------
+    reloader : ResourceReloader
+        Plans and performs reloads.
+    get_config : callable
+        Returns the current resource configuration.
+    config : dict, optional
+        Settings, usually ``SERVER_CONFIG['watch']``. Recognized keys:
+        ``debounce`` (seconds without changes before reloading, default
+        5), ``interval`` (seconds between polls, default 2) and ``inotify``
+        (whether to use inotify when inotify_simple is installed, default
+        True).
+    """
+
+    def __init__(self, reloader, get_config, config=None):
+        if config is None:
+            config = dict()
+        self.reloader = reloader
+        self.get_config = get_config
+        self.debounce = config.get('debounce', 5.)
+        interval = config.get('interval', 2.)
+        if config.get('inotify', True) and inotify_simple is not None:
+            self.backend = InotifyBackend(interval)
+        else:
+            self.backend = PollingBackend(interval)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.backend.watch(referenced_files(self.get_config()))
+        self._thread = threading.Thread(target=self._run,
+                                        name='resource-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.backend.close()
+
+    def _run(self):
+        last_change = None
+        while not self._stop.is_set():
+            if self.backend.wait(self._stop):
+                last_change = monotonic()
+            if last_change is not None and \
+                    monotonic() - last_change >= self.debounce:
+                last_change = None
+                self.check()
+
+    def check(self):
+        """Reloads any resources that changed
+
+        Returns
+        -------
+        list of Change
+            The changes that were loaded.
+
+        """
+        config = self.get_config()
+        changes = []
+        try:
+            changes = self.reloader.plan(config)
+            if changes:
+                logger.info(f'Reloading {len(changes)} changed resource(s)')
+                self.reloader.reload(changes, trigger='watch')
+        except Exception:
+            logger.exception('Failed to reload changed resources')
+        self.backend.watch(referenced_files(config))
+        return changes
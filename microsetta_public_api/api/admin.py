@@ -0,0 +1,67 @@
+import hmac
+import os
+from functools import partial
+from flask import Response, current_app
+from jsonschema import ValidationError
+from microsetta_public_api.config import (
+    SERVER_CONFIG,
+    resources as config_resources,
+    schema,
+)
+from microsetta_public_api.utils import jsonify
+from microsetta_public_api._profiler import sampler, ProfilerBusy
+from microsetta_public_api._reload import get_reloader
+
+
+def _admin_token():
+    return os.getenv('MPUBAPI_ADMIN_TOKEN', SERVER_CONFIG.get('admin_token'))
+
+
+def token_info(token):
+    """Validates the bearer token of requests to admin endpoints
+
+    Admin endpoints are unavailable unless a token is configured through
+    the `admin_token` server configuration or the MPUBAPI_ADMIN_TOKEN
+    environment variable.
+    """
+    expected = _admin_token()
+    if not expected or not hmac.compare_digest(token.encode(),
+                                               expected.encode()):
+        return None
+    return {'sub': 'admin'}
+
+
+def profile(seconds=10, interval=0.005, include_idle=False):
+    try:
+        counts = sampler.profile(seconds, interval=interval,
+                                 include_idle=include_idle)
+    except ProfilerBusy as e:
+        return jsonify(text=str(e), error=409), 409
+    return Response(sampler.collapse(counts), mimetype='text/plain')
+
+
+def _publish(config):
+    """Makes config the served resource configuration"""
+    # updated in place, as it is shared by reference, rather than cleared
+    #  first so that it never appears empty to concurrent readers
+    config_resources.update(config)
+    for key in [key for key in config_resources if key not in config]:
+        config_resources.pop(key, None)
+    SERVER_CONFIG['resources'] = config
+
+
+def reload(body=None):
+    config = dict(config_resources)
+    on_publish = None
+    if body:
+        try:
+            schema.validate(body)
+        except ValidationError as e:
+            return jsonify(text=e.message, error=400), 400
+        # the configuration only describes what is served once it has
+        #  loaded, a failed reload keeps the current one
+        config = body
+        on_publish = partial(_publish, body)
+    changes, _ = get_reloader(current_app).submit(config,
+                                                  on_publish=on_publish)
+    return jsonify(changes=[change.to_dict() for change in changes]), 202
@@ -0,0 +1,384 @@
+import contextvars
+import inspect
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import yaml
+from jsonschema import Draft4Validator
+from pkg_resources import resource_filename
+from microsetta_public_api.config import SERVER_CONFIG, schema
+from microsetta_public_api.resources_alt import get_resources
+from microsetta_public_api.repo._alpha_repo import AlphaRepo
+from microsetta_public_api.repo._beta_repo import NeighborsRepo, BetaRepo
+from microsetta_public_api.repo._metadata_repo import MetadataRepo
+from microsetta_public_api.repo._taxonomy_repo import TaxonomyRepo
+from microsetta_public_api.utils import jsonify
+from microsetta_public_api.utils._utils import validate_resource_alt
+from microsetta_public_api._tracing import current_context, continued
+from microsetta_public_api.exceptions import (
+    UnknownMetric,
+    UnknownResource,
+    UnknownID,
+    UnknownCategory,
+    IncompatibleOptions,
+    InvalidParameter,
+)
+from microsetta_public_api.api import datasets, metadata, taxonomy
+from microsetta_public_api.api.diversity import alpha, beta
+
+logger = logging.getLogger(__name__)
+
+
+class _Dataset:
+    """The resources of the dataset of a batch
+
+    The dataset is resolved once per batch, and each repo is built on first
+    use and shared by the operations of the batch.
+
+    Parameters
+    ----------
+    name : str
+        The dataset.
+    resources : DictElement
+        The served resources, which hold the dataset.
+    """
+
+    def __init__(self, name, resources):
+        try:
+            resource = resources.gets('datasets', name)
+        except KeyError:
+            raise UnknownResource(f"Unknown dataset: '{name}'")
+        self.name = name
+        self.resources = resources
+        self.resource = resource
+        self._repos = dict()
+
+    def _repo(self, keyword, type_, repo_type):
+        repo = self._repos.get(keyword)
+        if repo is None:
+            try:
+                element = self.resource.gets(keyword)
+            except KeyError:
+                raise UnknownResource(f"No {type_} data (kw: '{keyword}') "
+                                      f"for dataset='{self.name}'.")
+            # concurrent operations may both build the repo, but share the
+            #  data of the element
+            repo = self._repos.setdefault(keyword, repo_type(element.data))
+        return repo
+
+    def alpha_repo(self):
+        return self._repo(schema.alpha_kw, 'alpha', AlphaRepo)
+
+    def taxonomy_repo(self):
+        return self._repo(schema.taxonomy_kw, 'taxonomy', TaxonomyRepo)
+
+    def beta_repo(self):
+        return self._repo(schema.beta_kw, 'beta', BetaRepo)
+
+    def neighbors_repo(self):
+        return self._repo(schema.neighbors_kw, 'neighbors', NeighborsRepo)
+
+    def metadata_repo(self):
+        if not self.resource.has(schema.metadata_kw):
+            return MetadataRepo()
+        return self._repo(schema.metadata_kw, 'metadata', MetadataRepo)
+
+    def check_sample_id(self, sample_id):
+        """Raises UnknownID if the metadata of the dataset lacks the sample"""
+        if self.resource.has(schema.metadata_kw) and \
+                not self.metadata_repo().has_sample_id(sample_id):
+            raise UnknownID(f"Sample ID not found. Got: {sample_id}")
+
+
+def _alpha(dataset, sample_id, alpha_metric):
+    return alpha._get_alpha(dataset.alpha_repo(), alpha_metric, sample_id)
+
+
+def _alpha_exists(dataset, alpha_metric, sample_id):
+    return alpha._exists(dataset.alpha_repo(), alpha_metric, sample_id)
+
+
+def _alpha_sample(dataset, sample_id, alpha_metrics=None):
+    return alpha._get_alpha_sample(dataset.alpha_repo(), sample_id,
+                                   alpha_metrics)
+
+
+def _alpha_metrics(dataset):
+    return alpha._available_metrics(dataset.alpha_repo())
+
+
+def _taxonomy_available(dataset):
+    return taxonomy._resources(dataset.taxonomy_repo())
+
+
+def _taxonomy_exists(dataset, resource, sample_id):
+    taxonomy_repo = dataset.taxonomy_repo()
+    validate_resource_alt(taxonomy_repo.resources(), resource, 'resource')
+    return taxonomy_repo.exists(sample_id, resource)
+
+
+def _taxonomy_repo_for(dataset, resource, sample_id):
+    taxonomy_repo = dataset.taxonomy_repo()
+    taxonomy._check_resource_and_missing_ids_alt(taxonomy_repo, [sample_id],
+                                                 resource)
+    return taxonomy_repo
+
+
+def _taxonomy_single(dataset, sample_id, resource):
+    taxonomy_repo = _taxonomy_repo_for(dataset, resource, sample_id)
+    return taxonomy._group_summary([sample_id], resource, taxonomy_repo)
+
+
+def _taxonomy_counts(dataset, resource, sample_id, level):
+    taxonomy_repo = _taxonomy_repo_for(dataset, resource, sample_id)
+    return taxonomy._taxonomy_counts(resource, taxonomy_repo, level,
+                                     [sample_id])
+
+
+def _taxonomy_ranks(dataset, resource, sample_id):
+    taxonomy_repo = _taxonomy_repo_for(dataset, resource, sample_id)
+    return taxonomy._ranks_specific(taxonomy_repo, resource, sample_id)
+
+
+def _taxonomy_present(dataset, sample_id, resource):
+    taxonomy_repo = _taxonomy_repo_for(dataset, resource, sample_id)
+    return taxonomy._presence_table([sample_id], resource, taxonomy_repo)
+
+
+def _neighbors(dataset, beta_metric, sample_id, k=1):
+    return beta._k_nearest(dataset.neighbors_repo, dataset.beta_repo,
+                           beta_metric, k, sample_id)
+
+
+def _category_values(dataset, category):
+    return metadata._get_category_values(category, dataset.metadata_repo())
+
+
+def _datasets(dataset):
+    return datasets._available(dataset.resources)
+
+
+def _dataset_detail(dataset):
+    return {dataset.name: dataset.resource['__dataset_detail__']}
+
+
+def _dataset_contains(dataset, sample_id):
+    return dataset.metadata_repo().has_sample_id(sample_id)
+
+
+def _datasets_for_sample(dataset, sample_id):
+    return datasets.datasets_for_sample(sample_id)
+
+
+Operation = namedtuple('Operation', ['endpoint', 'run'])
+
+# the operations that can be run in a batch. `endpoint` is the handler of
+#  the endpoint whose parameters the operation takes, and `run` returns the
+#  body of its result given the `_Dataset` of the batch and those
+#  parameters, plus the sample ID of the batch if it takes one and does not
+#  set its own.
+operations = {
+    'alpha': Operation(alpha.get_alpha_alt, _alpha),
+    'alpha_exists': Operation(alpha.exists_single_alt, _alpha_exists),
+    'alpha_sample': Operation(alpha.get_alpha_sample_alt, _alpha_sample),
+    'alpha_metrics': Operation(alpha.available_metrics_alpha_alt,
+                               _alpha_metrics),
+    'taxonomy_available': Operation(taxonomy.resources_alt,
+                                    _taxonomy_available),
+    'taxonomy_exists': Operation(taxonomy.exists_single_alt,
+                                 _taxonomy_exists),
+    'taxonomy_single': Operation(taxonomy.single_sample_alt,
+                                 _taxonomy_single),
+    'taxonomy_counts': Operation(taxonomy.single_counts, _taxonomy_counts),
+    'taxonomy_ranks': Operation(taxonomy.ranks_specific, _taxonomy_ranks),
+    'taxonomy_present': Operation(taxonomy.single_sample_taxa_present_alt,
+                                  _taxonomy_present),
+    'neighbors': Operation(beta.k_nearest, _neighbors),
+    'category_values': Operation(metadata.category_values_alt,
+                                 _category_values),
+    'datasets': Operation(datasets.available, _datasets),
+    'dataset_detail': Operation(datasets.dataset_detail, _dataset_detail),
+    'dataset_contains': Operation(datasets.dataset_sample_exists,
+                                  _dataset_contains),
+    'datasets_for_sample': Operation(datasets.datasets_for_sample,
+                                     _datasets_for_sample),
+}
+
+
+def _params_validators():
+    """Validators of the params of each operation, from the API spec
+
+    The params of an operation must fit the parameters of its endpoint,
+    except for the dataset, which is set once for the whole batch.
+    """
+    api_file = resource_filename('microsetta_public_api.api',
+                                 'microsetta_public_api.yml')
+    with open(api_file) as fp:
+        api = yaml.safe_load(fp)
+    components = api['components']
+
+    def resolve(parameter):
+        if '$ref' in parameter:
+            return components['parameters'][parameter['$ref'].split('/')[-1]]
+        return parameter
+
+    parameters = dict()
+    for item in api['paths'].values():
+        for method, operation in item.items():
+            if method not in ('get', 'put', 'post', 'delete', 'patch'):
+                continue
+            parameters[operation['operationId']] = [
+                resolve(parameter) for parameter in
+                item.get('parameters', []) + operation.get('parameters', [])
+            ]
+
+    validators = dict()
+    for op, operation in operations.items():
+        endpoint = operation.endpoint
+        operation_id = f'{endpoint.__module__}.{endpoint.__name__}'
+        properties = {parameter['name']: parameter['schema']
+                      for parameter in parameters[operation_id]
+                      if parameter['name'] != 'dataset'}
+        validators[op] = Draft4Validator({
+            'type': 'object',
+            'properties': properties,
+            'additionalProperties': False,
+            # so that references into the spec resolve
+            'components': components,
+        })
+    return validators
+
+
+_validators = _params_validators()
+
+# the same status codes that the app registers for these errors
+_error_codes = (
+    (UnknownMetric, 404),
+    (UnknownResource, 404),
+    (UnknownID, 404),
+    (UnknownCategory, 404),
+    (IncompatibleOptions, 400),
+    (InvalidParameter, 400),
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            max_workers = SERVER_CONFIG.get('batch', {}).get('max_workers',
+                                                             4)
+            _executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='batch')
+    return _executor
+
+
+def batch(body, dataset):
+    max_operations = SERVER_CONFIG.get('batch', {}).get('max_operations',
+                                                        50)
+    requested = body['operations']
+    if len(requested) > max_operations:
+        return jsonify(text=f"A batch can have at most {max_operations} "
+                            f"operations. Got {len(requested)}.",
+                       error=400), 400
+    unknown = [operation['op'] for operation in requested
+               if operation['op'] not in operations]
+    if unknown:
+        return jsonify(text=f"Unknown operation(s): {unknown}. Available "
+                            f"operations: {sorted(operations)}",
+                       error=400), 400
+    # resolved once for the whole batch, rather than failing every operation
+    dataset = _Dataset(dataset, get_resources())
+    shared = dict()
+    if body.get('sample_id') is not None:
+        dataset.check_sample_id(body['sample_id'])
+        shared['sample_id'] = body['sample_id']
+    calls = [_bind(operation, dataset, shared) for operation in requested]
+
+    parallel = body.get('parallel', True) and len(calls) > 1
+    if parallel:
+        trace_context = current_context()
+        # each operation sees the request (e.g., flask.g) and continues the
+        #  trace of the batch
+        futures = [_get_executor().submit(contextvars.copy_context().run,
+                                          _run_continued, trace_context,
+                                          call)
+                   for call in calls]
+        results = [future.result() for future in futures]
+    else:
+        results = [_run(call) for call in calls]
+
+    return jsonify(results=[
+        dict(id=operation.get('id', str(i)), op=operation['op'],
+             status=status, body=result)
+        for i, (operation, (result, status))
+        in enumerate(zip(requested, results))
+    ]), 200
+
+
+def _bind(operation, dataset, shared):
+    """Binds the arguments of an operation
+
+    Returns
+    -------
+    callable or str
+        A callable with no arguments, or a message explaining why the
+        arguments do not fit the operation.
+
+    """
+    op = operation['op']
+    params = operation.get('params', {})
+    # the dataset was checked once for the whole batch
+    if 'dataset' in params:
+        return f"Invalid parameters for '{op}': the dataset is set by the " \
+               f"batch."
+    validator = _validators.get(op)
+    if validator is not None:
+        error = next(validator.iter_errors(params), None)
+        if error is not None:
+            where = ''.join(f'.{key}' for key in error.path)
+            return f"Invalid parameters for '{op}': params{where}: " \
+                   f"{error.message}"
+    run = operations[op].run
+    signature = inspect.signature(run)
+    kwargs = {name: value for name, value in shared.items()
+              if name in signature.parameters}
+    kwargs.update(params)
+    try:
+        signature.bind(dataset, **kwargs)
+    except TypeError as e:
+        return f"Invalid parameters for '{op}': {e}"
+    return lambda: run(dataset, **kwargs)
+
+
+def _run_continued(trace_context, call):
+    with continued(trace_context):
+        return _run(call)
+
+
+def _run(call):
+    """Runs a bound operation
+
+    Returns
+    -------
+    object
+        The (JSON) body of the result of the operation.
+    int
+        The status code of the operation.
+
+    """
+    if isinstance(call, str):
+        return dict(text=call, error=400), 400
+    try:
+        return call(), 200
+    except tuple(error for error, _ in _error_codes) as e:
+        code = next(code for error, code in _error_codes
+                    if isinstance(e, error))
+        return dict(text=str(e), error=code), code
+    except Exception:
+        logger.exception('Batch operation failed')
+        return dict(text='The operation failed.', error=500), 500
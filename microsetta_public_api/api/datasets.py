@@ -6,13 +6,16 @@ from microsetta_public_api.api.metadata import _get_repo_alt as \
 
 
 def available():
-    resources = get_resources()
+    return jsonify(_available(get_resources())), 200
+
+
+def _available(resources):
     escape = {schema.metadata_kw}
     dataset_key = 'datasets'
     detail_key = '__dataset_detail__'
 
     if dataset_key not in resources:
-        return jsonify({}), 200
+        return {}
 
     datasets = {}
     for k, v in resources[dataset_key].items():
@@ -20,7 +23,7 @@ def available():
             continue
         datasets[k] = v.get(detail_key)
 
-    return jsonify(datasets), 200
+    return datasets
 
 
 def datasets_for_sample(sample_id):
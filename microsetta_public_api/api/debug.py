@@ -0,0 +1,28 @@
+from flask import current_app
+from microsetta_public_api.utils import jsonify
+from microsetta_public_api._tracing import get_tracer
+
+
+def _get_tracer():
+    tracer = get_tracer(current_app)
+    if tracer is None or not tracer.enabled:
+        return None
+    return tracer
+
+
+def traces(limit=50):
+    tracer = _get_tracer()
+    if tracer is None:
+        return jsonify(text='Tracing is disabled.', error=404), 404
+    return jsonify(tracer.store.list(limit=limit)), 200
+
+
+def trace(trace_id):
+    tracer = _get_tracer()
+    if tracer is None:
+        return jsonify(text='Tracing is disabled.', error=404), 404
+    trace_ = tracer.store.get(trace_id)
+    if trace_ is None:
+        return jsonify(text=f"No trace with ID '{trace_id}'.",
+                       error=404), 404
+    return jsonify(trace_), 200
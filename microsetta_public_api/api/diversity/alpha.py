@@ -1,3 +1,4 @@
+import numpy as np
 from microsetta_public_api.models._alpha import Alpha
 from microsetta_public_api.repo._alpha_repo import AlphaRepo
 from microsetta_public_api.repo._metadata_repo import MetadataRepo
@@ -24,6 +25,42 @@ def get_alpha_alt(dataset, sample_id, alpha_metric):
     return jsonify(alpha_value), 200
 
 
+def get_alpha_sample_alt(dataset, sample_id, alpha_metrics=None):
+    alpha_resource = _validate_dataset_alpha(dataset, get_resources)
+    alpha_repo = AlphaRepo(alpha_resource.data)
+    ret_val = _get_alpha_sample(alpha_repo, sample_id, alpha_metrics)
+    return jsonify(ret_val), 200
+
+
+def _get_alpha_sample(alpha_repo, sample_id, alpha_metrics=None):
+    alpha_values = alpha_repo.get_alpha_diversities([sample_id],
+                                                    alpha_metrics)
+    values = _nan_to_none(alpha_values.values)[0]
+    ret_val = {
+        'sample_id': sample_id,
+        'data': dict(zip(alpha_values.columns, values)),
+    }
+    return ret_val
+
+
+def alpha_values_alt(body, dataset):
+    alpha_resource = _validate_dataset_alpha(dataset, get_resources)
+    alpha_repo = AlphaRepo(alpha_resource.data)
+    alpha_values = alpha_repo.get_alpha_diversities(
+        body['sample_ids'], body.get('alpha_metrics'))
+    ret_val = {
+        'sample_ids': list(alpha_values.index),
+        'alpha_metrics': list(alpha_values.columns),
+        'data': _nan_to_none(alpha_values.values),
+    }
+    return jsonify(ret_val), 200
+
+
+def _nan_to_none(values):
+    # NaN is not valid JSON
+    return np.where(np.isnan(values), None, values).tolist()
+
+
 def _validate_dataset_alpha(dataset, resource_getter):
     try:
         dataset_resource = resource_getter().gets('datasets', dataset)
@@ -179,23 +216,23 @@ def _available_metrics(alpha_repo):
 def exists_single_alt(dataset, alpha_metric, sample_id):
     alpha_resource = _validate_dataset_alpha(dataset, get_resources)
     alpha_repo = AlphaRepo(alpha_resource.data)
-    return _exists(alpha_repo, alpha_metric, sample_id)
+    return jsonify(_exists(alpha_repo, alpha_metric, sample_id)), 200
 
 
 def exists_single(alpha_metric, sample_id):
     alpha_repo = AlphaRepo()
-    return _exists(alpha_repo, alpha_metric, sample_id)
+    return jsonify(_exists(alpha_repo, alpha_metric, sample_id)), 200
 
 
 def exists_group_alt(body, dataset, alpha_metric):
     alpha_resource = _validate_dataset_alpha(dataset, get_resources)
     alpha_repo = AlphaRepo(alpha_resource.data)
-    return _exists(alpha_repo, alpha_metric, body)
+    return jsonify(_exists(alpha_repo, alpha_metric, body)), 200
 
 
 def exists_group(body, alpha_metric):
     alpha_repo = AlphaRepo()
-    return _exists(alpha_repo, alpha_metric, body)
+    return jsonify(_exists(alpha_repo, alpha_metric, body)), 200
 
 
 def _exists(alpha_repo, alpha_metric, samples):
@@ -205,4 +242,4 @@ def _exists(alpha_repo, alpha_metric, samples):
     validate_resource_alt(available_metrics, alpha_metric,
                           type_)
 
-    return jsonify(alpha_repo.exists(samples, alpha_metric)), 200
+    return alpha_repo.exists(samples, alpha_metric)
@@ -1,10 +1,20 @@
+from functools import partial
 from microsetta_public_api.utils import jsonify
+from microsetta_public_api.utils._utils import stepwise_resource_getter
 from microsetta_public_api.resources_alt import get_resources
-from microsetta_public_api.repo._beta_repo import NeighborsRepo
+from microsetta_public_api.repo._beta_repo import NeighborsRepo, BetaRepo
+from microsetta_public_api.repo._pcoa_repo import PCoARepo
+from microsetta_public_api.api.metadata import _get_repo_alt as \
+    _get_metadata_repo
 from microsetta_public_api.exceptions import (
     UnknownResource,
+    UnknownMetric,
+    UnknownID,
+    InvalidParameter,
+    IncompatibleOptions,
 )
 from microsetta_public_api.config import schema
+from microsetta_public_api.utils import _downsample
 
 
 def _validate_dataset_neighbors(dataset, resource_getter):
@@ -20,6 +30,27 @@ def _validate_dataset_neighbors(dataset, resource_getter):
     return dataset_resource.gets(schema.neighbors_kw)
 
 
+def _get_beta_repo(dataset):
+    beta_resource = stepwise_resource_getter(
+        get_resources(),
+        dataset,
+        schema.beta_kw,
+        'beta',
+    )
+    return BetaRepo(beta_resource.data)
+
+
+def _get_pcoa_repo(dataset, named_sample_set, beta_metric):
+    pcoas = stepwise_resource_getter(get_resources(), dataset,
+                                     schema.pcoa_kw, 'pcoa')
+    pcoa_repo = PCoARepo(pcoas.data)
+    if not pcoa_repo.has_pcoa(named_sample_set, beta_metric):
+        raise UnknownResource(f"No PCoA for named_sample_set="
+                              f"'{named_sample_set}',beta_metric="
+                              f"'{beta_metric}'")
+    return pcoa_repo
+
+
 def pcoa_contains_alt(named_sample_set, sample_id):
     raise NotImplementedError()
 
@@ -29,11 +60,137 @@ def pcoa_contains(named_sample_set, sample_id):
 
 
 def k_nearest(dataset, beta_metric, k, sample_id):
-    beta_resource = _validate_dataset_neighbors(dataset,
-                                                resource_getter=get_resources)
-    neigh_repo = NeighborsRepo(beta_resource.data)
-    k_nearest_ids = neigh_repo.k_nearest(sample_id=sample_id,
-                                         metric=beta_metric,
-                                         k=k,
-                                         )
+    k_nearest_ids = _k_nearest(partial(_get_neighbors_repo, dataset),
+                               partial(_get_beta_repo, dataset),
+                               beta_metric, k, sample_id)
     return jsonify(k_nearest_ids), 200
+
+
+def _get_neighbors_repo(dataset):
+    beta_resource = _validate_dataset_neighbors(
+        dataset, resource_getter=get_resources)
+    return NeighborsRepo(beta_resource.data)
+
+
+def _k_nearest(neighbors_repo_getter, beta_repo_getter, beta_metric, k,
+               sample_id):
+    try:
+        neigh_repo = neighbors_repo_getter()
+        k_nearest_ids = neigh_repo.k_nearest(sample_id=sample_id,
+                                             metric=beta_metric,
+                                             k=k,
+                                             )
+    except (UnknownResource, UnknownMetric, UnknownID,
+            InvalidParameter) as e:
+        # not answerable from the precomputed neighbors, so find the
+        #  neighbors from the distances if they are loaded
+        try:
+            beta_repo = beta_repo_getter()
+            if beta_metric not in beta_repo.available_metrics():
+                raise e
+        except UnknownResource:
+            raise e
+        k_nearest_ids = beta_repo.k_nearest([sample_id], beta_metric,
+                                            k=k)[sample_id]
+    return k_nearest_ids
+
+
+def k_nearest_group(body, dataset, beta_metric):
+    sample_ids = body['sample_ids']
+    k = body.get('k', 1)
+    candidates = None
+    if 'metadata_query' in body:
+        metadata_repo = _get_metadata_repo(dataset)
+        candidates = metadata_repo.sample_id_matches(body['metadata_query'])
+
+    if 'named_sample_set' in body:
+        named_sample_set = body['named_sample_set']
+        pcoa_repo = _get_pcoa_repo(dataset, named_sample_set, beta_metric)
+        nearest = pcoa_repo.k_nearest(named_sample_set, beta_metric,
+                                      sample_ids, k=k, candidates=candidates)
+    else:
+        beta_repo = _get_beta_repo(dataset)
+        nearest = beta_repo.k_nearest(sample_ids, beta_metric, k=k,
+                                      candidates=candidates)
+    return jsonify(nearest), 200
+
+
+def beta_distances(body, dataset, beta_metric, summary_statistics=True,
+                   percentiles=None, return_raw=False):
+    if not (summary_statistics or return_raw):
+        raise IncompatibleOptions('Either `summary_statistics`, '
+                                  '`return_raw`, or both are required to be '
+                                  'true.')
+    if 'sample_ids' in body and 'metadata_query' in body and \
+            body.get('condition') is None:
+        raise IncompatibleOptions('`condition` is required when both '
+                                  '`sample_ids` and `metadata_query` are '
+                                  'given.')
+    beta_repo = _get_beta_repo(dataset)
+    sample_id = body['sample_id']
+    sample_ids = body.get('sample_ids')
+    if 'metadata_query' in body:
+        metadata_repo = _get_metadata_repo(dataset)
+        matching_ids = metadata_repo.sample_id_matches(body['metadata_query'])
+        existing = beta_repo.exists(matching_ids, beta_metric)
+        matching_ids = [id_ for id_, exists in zip(matching_ids, existing)
+                        if exists]
+        if sample_ids is None:
+            sample_ids = matching_ids
+        elif body['condition'] == 'OR':
+            sample_ids = list(set(sample_ids) | set(matching_ids))
+        elif body['condition'] == 'AND':
+            sample_ids = list(set(sample_ids) & set(matching_ids))
+
+    beta_data = {'beta_metric': beta_metric, 'sample_id': sample_id}
+    if return_raw:
+        distances = beta_repo.distances(sample_id, beta_metric, sample_ids)
+        beta_data['distances'] = distances.to_dict()
+    if summary_statistics:
+        beta_data['group_summary'] = beta_repo.distance_summary(
+            sample_id, beta_metric, sample_ids, percentiles=percentiles)
+    return jsonify(beta_data), 200
+
+
+def pcoa_region(body, dataset, beta_metric, named_sample_set):
+    pcoa_repo = _get_pcoa_repo(dataset, named_sample_set, beta_metric)
+    axes = body.get('axes')
+    if 'lower' in body and 'upper' in body and 'center' not in body:
+        coordinates = pcoa_repo.samples_in_box(
+            named_sample_set, beta_metric, body['lower'], body['upper'],
+            axes=axes)
+    elif 'center' in body and 'radius' in body and 'lower' not in body:
+        coordinates = pcoa_repo.samples_in_radius(
+            named_sample_set, beta_metric, body['center'], body['radius'],
+            axes=axes)
+    else:
+        raise IncompatibleOptions('Either `lower` and `upper`, or `center` '
+                                  'and `radius` are required.')
+
+    total_samples = len(coordinates)
+    max_samples = body.get('max_samples')
+    if max_samples is not None and total_samples > max_samples:
+        # keeps the outline of the region, rather than its densest parts
+        positions = _downsample.downsample(coordinates.values, max_samples,
+                                           mode='grid',
+                                           seed=body.get('seed', 0))
+        coordinates = coordinates.iloc[positions]
+    return jsonify(
+        axes=list(coordinates.columns),
+        sample_ids=list(coordinates.index),
+        coordinates=coordinates.values.tolist(),
+        total_samples=total_samples,
+    ), 200
+
+
+def pcoa_closest(dataset, beta_metric, named_sample_set, point, k=1,
+                 axes=None):
+    pcoa_repo = _get_pcoa_repo(dataset, named_sample_set, beta_metric)
+    coordinates, distances = pcoa_repo.closest_samples(
+        named_sample_set, beta_metric, point, k=k, axes=axes)
+    return jsonify(
+        axes=list(coordinates.columns),
+        sample_ids=list(coordinates.index),
+        coordinates=coordinates.values.tolist(),
+        distances=distances.tolist(),
+    ), 200
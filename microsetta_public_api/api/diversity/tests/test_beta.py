@@ -1,18 +1,26 @@
 import json
 from microsetta_public_api.api.diversity.beta import (
     k_nearest,
+    k_nearest_group,
+    beta_distances,
+    pcoa_region,
+    pcoa_closest,
 )
 
-from microsetta_public_api.config import DictElement, BetaElement
+from microsetta_public_api.config import (
+    DictElement, BetaElement, PCOAElement,
+)
 
 from microsetta_public_api.exceptions import (
-    UnknownResource, UnknownID, UnknownMetric, InvalidParameter
+    UnknownResource, UnknownID, UnknownMetric, InvalidParameter,
+    IncompatibleOptions,
 )
 from microsetta_public_api.utils.testing import (
     MockedJsonifyTestCase,
     TrivialVisitor,
 )
 import pandas as pd
+from skbio import DistanceMatrix, OrdinationResults
 from unittest.mock import patch
 
 
@@ -40,6 +48,34 @@ class BetaTests(MockedJsonifyTestCase):
                         'unifrac': neighbors
                     })
                 }),
+                'dataset2': DictElement({
+                    '__neighbors__': BetaElement({
+                        'unifrac': neighbors
+                    }),
+                    '__beta__': BetaElement({
+                        'unifrac': DistanceMatrix(
+                            [[0, 1, 4, 5, 2],
+                             [1, 0, 2, 6, 7],
+                             [4, 2, 0, 3, 8],
+                             [5, 6, 3, 0, 9],
+                             [2, 7, 8, 9, 0]],
+                            ids=['s1', 's2', 's3', 's4', 's5'])
+                    }),
+                    '__pcoa__': PCOAElement({
+                        'set1': DictElement({
+                            'unifrac': OrdinationResults(
+                                'pcoa', 'pcoa',
+                                eigvals=pd.Series([3, 2, 1]),
+                                samples=pd.DataFrame(
+                                    [[0, 0, 0], [1, 0, 1], [3, 1, 2],
+                                     [3, 4, 3], [0, 5, 4]],
+                                    index=['s1', 's2', 's3', 's4', 's5']),
+                                proportion_explained=pd.Series(
+                                    [0.5, 0.3, 0.2]),
+                            ),
+                        }),
+                    }),
+                }),
             }),
         })
         self.resources.accept(TrivialVisitor())
@@ -104,3 +140,244 @@ class BetaTests(MockedJsonifyTestCase):
                 k=724,
                 sample_id='s2'
             )
+
+    def test_k_nearest_from_distances(self):
+        # s5 is not in the precomputed neighbors
+        results, code = k_nearest(
+            dataset='dataset2',
+            beta_metric='unifrac',
+            k=2,
+            sample_id='s5'
+        )
+        self.assertEqual(200, code)
+        self.assertListEqual(json.loads(results), ['s1', 's2'])
+
+        # k is more than the precomputed neighbors
+        results, code = k_nearest(
+            dataset='dataset2',
+            beta_metric='unifrac',
+            k=4,
+            sample_id='s1'
+        )
+        self.assertListEqual(json.loads(results), ['s2', 's5', 's3', 's4'])
+
+    def test_k_nearest_from_distances_invalid(self):
+        with self.assertRaises(UnknownID):
+            k_nearest(
+                dataset='dataset2',
+                beta_metric='unifrac',
+                k=2,
+                sample_id='s2-dne'
+            )
+        with self.assertRaises(InvalidParameter):
+            k_nearest(
+                dataset='dataset2',
+                beta_metric='unifrac',
+                k=724,
+                sample_id='s2'
+            )
+
+    def test_k_nearest_group(self):
+        results, code = k_nearest_group(
+            body={'sample_ids': ['s1', 's5'], 'k': 2},
+            dataset='dataset2',
+            beta_metric='unifrac',
+        )
+        self.assertEqual(200, code)
+        self.assertDictEqual(json.loads(results), {'s1': ['s2', 's5'],
+                                                   's5': ['s1', 's2']})
+
+    def test_k_nearest_group_metadata_query(self):
+        query = {'condition': 'AND', 'rules': []}
+        with patch('microsetta_public_api.api.diversity.beta.'
+                   '_get_metadata_repo') as mock_metadata:
+            mock_metadata.return_value.sample_id_matches.return_value = \
+                ['s3', 's4']
+            results, code = k_nearest_group(
+                body={'sample_ids': ['s1'], 'k': 2,
+                      'metadata_query': query},
+                dataset='dataset2',
+                beta_metric='unifrac',
+            )
+        mock_metadata.return_value.sample_id_matches.assert_called_once_with(
+            query)
+        self.assertDictEqual(json.loads(results), {'s1': ['s3', 's4']})
+
+    def test_k_nearest_group_no_beta(self):
+        with self.assertRaises(UnknownResource):
+            k_nearest_group(
+                body={'sample_ids': ['s1']},
+                dataset='dataset1',
+                beta_metric='unifrac',
+            )
+
+    def test_beta_distances(self):
+        results, code = beta_distances(
+            body={'sample_id': 's1', 'sample_ids': ['s2', 's4']},
+            dataset='dataset2',
+            beta_metric='unifrac',
+            return_raw=True,
+            percentiles=[0, 100],
+        )
+        self.assertEqual(200, code)
+        obs = json.loads(results)
+        self.assertEqual('unifrac', obs['beta_metric'])
+        self.assertEqual('s1', obs['sample_id'])
+        self.assertDictEqual({'s2': 1, 's4': 5}, obs['distances'])
+        self.assertEqual(2, obs['group_summary']['group_size'])
+        self.assertEqual(3, obs['group_summary']['mean'])
+        self.assertListEqual([1, 5],
+                             obs['group_summary']['percentile_values'])
+
+    def test_beta_distances_all(self):
+        results, code = beta_distances(
+            body={'sample_id': 's5'},
+            dataset='dataset2',
+            beta_metric='unifrac',
+            summary_statistics=False,
+            return_raw=True,
+        )
+        obs = json.loads(results)
+        self.assertDictEqual({'s1': 2, 's2': 7, 's3': 8, 's4': 9},
+                             obs['distances'])
+        self.assertNotIn('group_summary', obs)
+
+    def test_beta_distances_metadata_query(self):
+        query = {'condition': 'AND', 'rules': []}
+        with patch('microsetta_public_api.api.diversity.beta.'
+                   '_get_metadata_repo') as mock_metadata:
+            # s6 has no distances, so it is left out of the group
+            mock_metadata.return_value.sample_id_matches.return_value = \
+                ['s3', 's4', 's6']
+            results, code = beta_distances(
+                body={'sample_id': 's1', 'sample_ids': ['s2', 's3'],
+                      'metadata_query': query, 'condition': 'OR'},
+                dataset='dataset2',
+                beta_metric='unifrac',
+                return_raw=True,
+            )
+        obs = json.loads(results)
+        self.assertDictEqual({'s2': 1, 's3': 4, 's4': 5}, obs['distances'])
+        self.assertEqual(3, obs['group_summary']['group_size'])
+
+    def test_beta_distances_metadata_query_no_condition(self):
+        query = {'condition': 'AND', 'rules': []}
+        with self.assertRaisesRegex(IncompatibleOptions, 'condition'):
+            beta_distances(
+                body={'sample_id': 's1', 'sample_ids': ['s2', 's3'],
+                      'metadata_query': query},
+                dataset='dataset2',
+                beta_metric='unifrac',
+            )
+
+    def test_beta_distances_unknown_id(self):
+        with self.assertRaises(UnknownID):
+            beta_distances(
+                body={'sample_id': 's1', 'sample_ids': ['s2', 'dne']},
+                dataset='dataset2',
+                beta_metric='unifrac',
+            )
+
+    def test_beta_distances_no_beta(self):
+        with self.assertRaises(UnknownResource):
+            beta_distances(
+                body={'sample_id': 's1'},
+                dataset='dataset1',
+                beta_metric='unifrac',
+            )
+
+    def test_beta_distances_incompatible_options(self):
+        with self.assertRaises(IncompatibleOptions):
+            beta_distances(
+                body={'sample_id': 's1'},
+                dataset='dataset2',
+                beta_metric='unifrac',
+                summary_statistics=False,
+                return_raw=False,
+            )
+
+    def test_pcoa_region_box(self):
+        results, code = pcoa_region(
+            body={'lower': [0.5, -1], 'upper': [3, 1]},
+            dataset='dataset2',
+            beta_metric='unifrac',
+            named_sample_set='set1',
+        )
+        self.assertEqual(200, code)
+        self.assertDictEqual({'axes': [0, 1],
+                              'sample_ids': ['s2', 's3'],
+                              'coordinates': [[1, 0], [3, 1]],
+                              'total_samples': 2},
+                             json.loads(results))
+
+    def test_pcoa_region_radius(self):
+        results, code = pcoa_region(
+            body={'center': [4], 'radius': 1, 'axes': [1]},
+            dataset='dataset2',
+            beta_metric='unifrac',
+            named_sample_set='set1',
+        )
+        obs = json.loads(results)
+        self.assertListEqual(['s4', 's5'], obs['sample_ids'])
+        self.assertListEqual([[4], [5]], obs['coordinates'])
+        self.assertListEqual([1], obs['axes'])
+
+    def test_pcoa_region_max_samples(self):
+        results, code = pcoa_region(
+            body={'lower': [-10, -10], 'upper': [10, 10], 'max_samples': 2},
+            dataset='dataset2',
+            beta_metric='unifrac',
+            named_sample_set='set1',
+        )
+        obs = json.loads(results)
+        self.assertEqual(5, obs['total_samples'])
+        self.assertLessEqual(len(obs['sample_ids']), 2)
+
+    def test_pcoa_region_incomplete(self):
+        with self.assertRaises(IncompatibleOptions):
+            pcoa_region(
+                body={'lower': [0, 0]},
+                dataset='dataset2',
+                beta_metric='unifrac',
+                named_sample_set='set1',
+            )
+
+    def test_pcoa_region_invalid_axes(self):
+        with self.assertRaises(InvalidParameter):
+            pcoa_region(
+                body={'center': [0, 0], 'radius': 1, 'axes': [0]},
+                dataset='dataset2',
+                beta_metric='unifrac',
+                named_sample_set='set1',
+            )
+
+    def test_pcoa_region_unknown_pcoa(self):
+        with self.assertRaises(UnknownResource):
+            pcoa_region(
+                body={'center': [0], 'radius': 1},
+                dataset='dataset2',
+                beta_metric='unifrac',
+                named_sample_set='dne',
+            )
+
+    def test_pcoa_closest(self):
+        results, code = pcoa_closest(
+            dataset='dataset2',
+            beta_metric='unifrac',
+            named_sample_set='set1',
+            point=[2.5, 4],
+            k=2,
+        )
+        self.assertEqual(200, code)
+        obs = json.loads(results)
+        self.assertListEqual(['s4', 's5'], obs['sample_ids'])
+        self.assertListEqual([[3, 4], [0, 5]], obs['coordinates'])
+        self.assertAlmostEqual(0.5, obs['distances'][0])
+
+    def test_k_nearest_group_pcoa(self):
+        results, code = k_nearest_group(
+            body={'sample_ids': ['s1'], 'k': 2, 'named_sample_set': 'set1'},
+            dataset='dataset2',
+            beta_metric='unifrac',
+        )
+        self.assertDictEqual({'s1': ['s2', 's3']}, json.loads(results))
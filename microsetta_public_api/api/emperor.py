@@ -6,7 +6,9 @@ from microsetta_public_api.resources_alt import get_resources
 from microsetta_public_api.config import schema
 from microsetta_public_api.api.metadata import _get_repo_alt as \
     _get_metadata_repo_alt
-from microsetta_public_api.exceptions import UnknownResource
+from microsetta_public_api.utils import _downsample
+from microsetta_public_api.utils._singleflight import flights
+from microsetta_public_api.exceptions import UnknownResource, InvalidParameter
 
 
 def _get_pcoa_repo(dataset):
@@ -21,25 +23,76 @@ def _get_pcoa_repo(dataset):
 
 
 def plot_pcoa_alt(dataset, beta_metric, named_sample_set, metadata_categories,
-                  fillna='nan'):
+                  fillna='nan', downsample=None, max_samples=10000, seed=0,
+                  sample_id=None, downsample_category=None):
     pcoa_repo = _get_pcoa_repo(dataset)
     metadata_repo = _get_metadata_repo_alt(dataset, get_resources)
 
     return _plot_pcoa(beta_metric, fillna, metadata_categories,
-                      named_sample_set, metadata_repo, pcoa_repo)
+                      named_sample_set, metadata_repo, pcoa_repo,
+                      downsample=downsample, max_samples=max_samples,
+                      seed=seed, sample_id=sample_id,
+                      downsample_category=downsample_category)
 
 
 def plot_pcoa(beta_metric, named_sample_set, metadata_categories,
-              fillna='nan'):
+              fillna='nan', downsample=None, max_samples=10000, seed=0,
+              sample_id=None, downsample_category=None):
     pcoa_repo = PCoARepo()
     metadata_repo = MetadataRepo()
 
     return _plot_pcoa(beta_metric, fillna, metadata_categories,
-                      named_sample_set, metadata_repo, pcoa_repo)
+                      named_sample_set, metadata_repo, pcoa_repo,
+                      downsample=downsample, max_samples=max_samples,
+                      seed=seed, sample_id=sample_id,
+                      downsample_category=downsample_category)
+
+
+def _downsample_pcoa(pcoa, metadata_repo, mode, max_samples, seed,
+                     category=None, sample_id=None):
+    """Chooses the samples of an ordination to plot
+
+    Parameters
+    ----------
+    pcoa : skbio.OrdinationResults
+        The ordination to plot.
+    metadata_repo : MetadataRepo
+        Provides the groups for stratified downsampling.
+    mode : str
+        One of `_downsample.modes`.
+    max_samples : int
+        The maximum number of samples to plot.
+    seed : int
+        Seeds the random choices.
+    category : str, optional
+        The metadata category to stratify by, required for 'stratified'.
+    sample_id : str, optional
+        A sample that is always plotted, if it is in the ordination.
+
+    Returns
+    -------
+    np.ndarray of int
+        The positions of the samples to plot.
+
+    """
+    samples = pcoa.samples.index
+    groups = None
+    if mode == 'stratified':
+        if category is None:
+            raise InvalidParameter("'stratified' downsampling requires a "
+                                   "metadata category")
+        groups = metadata_repo.get_metadata(category, sample_ids=samples)
+    keep = None
+    if sample_id is not None and sample_id in samples:
+        keep = [samples.get_loc(sample_id)]
+    return _downsample.downsample(pcoa.samples.values, max_samples,
+                                  mode=mode, groups=groups, keep=keep,
+                                  seed=seed)
 
 
 def _plot_pcoa(beta_metric, fillna, metadata_categories, named_sample_set,
-               metadata_repo, pcoa_repo):
+               metadata_repo, pcoa_repo, downsample=None, max_samples=10000,
+               seed=0, sample_id=None, downsample_category=None):
     if not pcoa_repo.has_pcoa(named_sample_set, beta_metric):
         raise UnknownResource(f"No PCoA for named_sample_set="
                               f"'{named_sample_set}',beta_metric="
@@ -53,21 +106,52 @@ def _plot_pcoa(beta_metric, fillna, metadata_categories, named_sample_set,
         raise UnknownResource(f"Missing specified metadata categories: "
                               f"{missing_categories}"
                               )
+    if downsample is not None:
+        if downsample_category is None and len(metadata_categories) > 0:
+            downsample_category = metadata_categories[0]
+        elif downsample_category is not None and \
+                not metadata_repo.has_category(downsample_category):
+            raise UnknownResource(f"Missing specified metadata categories: "
+                                  f"{[downsample_category]}")
     pcoa = pcoa_repo.get_pcoa(named_sample_set, beta_metric)
-    # grab the sample ids from the PCoA
-    samples = pcoa.samples.index
-    # metadata for samples not in the repo will be filled in as None
-    metadata = metadata_repo.get_metadata(metadata_categories,
-                                          sample_ids=samples,
-                                          fillna=fillna,
-                                          )
-    response = dict()
-    response['decomposition'] = {
-        "coordinates": pcoa.samples.values.tolist(),
-        "percents_explained": list(100 * prop for
-                                   prop in pcoa.proportion_explained),
-        "sample_ids": list(samples),
-    }
-    response["metadata"] = metadata.values.tolist()
-    response["metadata_headers"] = metadata.columns.tolist()
-    return jsonify(response), 200
+    # identical concurrent plots, e.g., after a reload, are computed once
+    key = ('pcoa', id(pcoa), id(metadata_repo.metadata), fillna,
+           tuple(metadata_categories), downsample, max_samples, seed,
+           sample_id, downsample_category)
+
+    def compute():
+        # grab the sample ids from the PCoA
+        samples = pcoa.samples.index
+        coordinates = pcoa.samples.values
+        total_samples = len(samples)
+        if downsample is not None:
+            positions = _downsample_pcoa(pcoa, metadata_repo, downsample,
+                                         max_samples, seed,
+                                         category=downsample_category,
+                                         sample_id=sample_id)
+            samples = samples[positions]
+            coordinates = coordinates[positions]
+        # metadata for samples not in the repo will be filled in as None
+        metadata = metadata_repo.get_metadata_rows(metadata_categories,
+                                                   sample_ids=samples,
+                                                   fillna=fillna,
+                                                   )
+        response = dict()
+        response['decomposition'] = {
+            "coordinates": coordinates.tolist(),
+            "percents_explained": list(100 * prop for
+                                       prop in pcoa.proportion_explained),
+            "sample_ids": list(samples),
+        }
+        response["metadata"] = metadata
+        response["metadata_headers"] = list(metadata_categories)
+        if downsample is not None:
+            response["downsampling"] = {
+                "mode": downsample,
+                "seed": seed,
+                "max_samples": max_samples,
+                "total_samples": total_samples,
+            }
+        return response
+
+    return jsonify(flights.do(key, compute)), 200
@@ -0,0 +1,21 @@
+from flask import current_app
+from microsetta_public_api._budget import get_memory_budget
+from microsetta_public_api._loading import tracker
+from microsetta_public_api.utils import jsonify
+from microsetta_public_api.utils._memory import process_memory
+
+
+def health():
+    summary = tracker.summary()
+    summary['process'] = process_memory()
+    budget = get_memory_budget(current_app)
+    if budget is not None:
+        summary['memory_budget'] = budget.summary()
+    return jsonify(summary), 200
+
+
+def ready():
+    summary = tracker.summary()
+    response = {key: summary[key] for key in
+                ('status', 'ready', 'updates_in_progress', 'counts')}
+    return jsonify(response), 200 if summary['ready'] else 503
@@ -28,9 +28,42 @@ def category_values_alt(dataset, category):
 
 
 def _category_values(category, repo):
+    try:
+        return jsonify(_get_category_values(category, repo)), 200
+    except UnknownCategory as e:
+        return jsonify(text=str(e), error=404), 404
+
+
+def _get_category_values(category, repo):
+    if category not in repo.categories:
+        raise UnknownCategory(f"Metadata category: '{category}' does not "
+                              f"exist.")
+    return repo.category_values(category)
+
+
+def all_category_values():
+    repo = _get_repo()
+    return jsonify(repo.all_category_values()), 200
+
+
+def all_category_values_alt(dataset):
+    repo = _get_repo_alt(dataset)
+    return jsonify(repo.all_category_values()), 200
+
+
+def category_statistics(category):
+    repo = _get_repo()
+    return _category_statistics(category, repo)
+
+
+def category_statistics_alt(dataset, category):
+    repo = _get_repo_alt(dataset)
+    return _category_statistics(category, repo)
+
+
+def _category_statistics(category, repo):
     if category in repo.categories:
-        values = repo.category_values(category)
-        return jsonify(values), 200
+        return jsonify(repo.category_statistics(category)), 200
     else:
         text = f"Metadata category: '{category}' does not exist."
         return jsonify(text=text, error=404), 404
@@ -40,14 +73,14 @@ def get_metadata_values(body, cat):
     repo = _get_repo()
     # check all categories are valid
     metadata = _get_metadata_values(body, cat, repo)
-    return jsonify(metadata.values.tolist()), 200
+    return jsonify(metadata), 200
 
 
 def get_metadata_values_alt(body, dataset, cat):
     repo = _get_repo_alt(dataset)
     # check all categories are valid
     metadata = _get_metadata_values(body, cat, repo)
-    return jsonify(metadata.values.tolist()), 200
+    return jsonify(metadata), 200
 
 
 def _get_metadata_values(body, cat, repo):
@@ -64,10 +97,10 @@ def _get_metadata_values(body, cat, repo):
         raise UnknownID(
             f"Cannot find sample ID's corresponding to: {invalid_ids}"
         )
-    metadata = repo.get_metadata(cat,
-                                 sample_ids=sample_ids,
-                                 fillna=None,
-                                 )
+    metadata = repo.get_metadata_rows(cat,
+                                      sample_ids=sample_ids,
+                                      fillna=None,
+                                      )
     return metadata
 
 
@@ -0,0 +1,11 @@
+from flask import Response
+from microsetta_public_api._metrics import metrics as registry
+from microsetta_public_api.utils import jsonify
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics():
+    if not registry.enabled:
+        return jsonify(text='Metrics are disabled.', error=404), 404
+    return Response(registry.render(), content_type=CONTENT_TYPE)
@@ -1,3 +1,4 @@
+import json
 import pandas as pd
 import altair as alt
 from flask import send_file
@@ -13,7 +14,9 @@ from microsetta_public_api.exceptions import UnknownID
 from microsetta_public_api.utils._utils import stepwise_resource_getter
 from microsetta_public_api.config import schema
 from microsetta_public_api.repo._pcoa_repo import PCoARepo
+from microsetta_public_api.api.emperor import _downsample_pcoa
 from microsetta_public_api.exceptions import UnknownResource
+from microsetta_public_api.utils._singleflight import flights
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import io
@@ -90,24 +93,35 @@ def plot_alpha_filtered_json_query(body, alpha_metric=None, percentiles=None,
 
 def _plot_alpha_percentiles_querybuilder(alpha_metric, percentiles, query,
                                          repo, sample_id, alpha_repo_getter):
-    matching_ids = _filter_ids(repo, alpha_repo_getter(), alpha_metric, query,
-                               sample_id)
-
-    if len(matching_ids) <= 1:
+    alpha_repo = alpha_repo_getter()
+    # identical concurrent plots, e.g., after a reload, are computed once
+    key = ('alpha-percentiles', id(repo.metadata), id(alpha_repo.resources),
+           alpha_metric, percentiles and tuple(percentiles),
+           json.dumps(query, sort_keys=True, default=str), sample_id)
+
+    def compute():
+        matching_ids = _filter_ids(repo, alpha_repo, alpha_metric, query,
+                                   sample_id)
+        if len(matching_ids) <= 1:
+            return None
+
+        alpha_summary, sample_diversity = _get_alpha_info(alpha_metric,
+                                                          matching_ids,
+                                                          percentiles,
+                                                          sample_id,
+                                                          alpha_repo_getter,
+                                                          )
+
+        chart = _plot_percentiles_plot(alpha_metric, alpha_summary,
+                                       sample_diversity)
+        return chart.to_dict()
+
+    chart = flights.do(key, compute)
+    if chart is None:
         return jsonify(text='Did not find more than 1 ID\'s matching '
                             'request. Plot would be nonsensical.'), 422
 
-    alpha_summary, sample_diversity = _get_alpha_info(alpha_metric,
-                                                      matching_ids,
-                                                      percentiles,
-                                                      sample_id,
-                                                      alpha_repo_getter,
-                                                      )
-
-    chart = _plot_percentiles_plot(alpha_metric, alpha_summary,
-                                   sample_diversity)
-
-    return jsonify(**chart.to_dict()), 200
+    return jsonify(**chart), 200
 
 
 def _plot_percentiles_plot(metric, summary, sample_value=None):
@@ -245,7 +259,8 @@ def _make_mpl_fig(series, x, y, target):
 
 
 def plot_beta_alt_mpl(dataset, beta_metric, named_sample_set, sample_id=None,
-                      category=None):
+                      category=None, downsample=None, max_samples=10000,
+                      seed=0):
     pcoa_repo = _get_pcoa_repo(dataset)
     metadata_repo = _get_metadata_repo(dataset, get_resources)
 
@@ -263,10 +278,19 @@ def plot_beta_alt_mpl(dataset, beta_metric, named_sample_set, sample_id=None,
                               f"{missing_categories}"
                               )
     pcoa = pcoa_repo.get_pcoa(named_sample_set, beta_metric)
-    metadata = metadata_repo.get_metadata(category)
-
-    x = pcoa.samples[0]
-    y = pcoa.samples[1]
+    samples = pcoa.samples
+    if downsample is None:
+        metadata = metadata_repo.get_metadata(category)
+    else:
+        positions = _downsample_pcoa(pcoa, metadata_repo, downsample,
+                                     max_samples, seed, category=category,
+                                     sample_id=sample_id)
+        samples = samples.iloc[positions]
+        metadata = metadata_repo.get_metadata(category,
+                                              sample_ids=samples.index)
+
+    x = samples[0]
+    y = samples[1]
     response = _make_mpl_fig(metadata, x, y, sample_id)
 
     return send_file(response, mimetype='image/png', as_attachment=True,
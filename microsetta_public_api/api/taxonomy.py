@@ -9,6 +9,8 @@ from microsetta_public_api.utils._utils import (
     validate_resource_alt,
     check_missing_ids_alt
 )
+from microsetta_public_api.utils._singleflight import flights
+from microsetta_public_api._tracing import traced
 from empress import Empress
 
 
@@ -47,6 +49,7 @@ def summarize_group(body, resource):
     return _summarize_group(sample_ids, resource, taxonomy_repo)
 
 
+@traced()
 def _check_resource_and_missing_ids_alt(taxonomy_repo, sample_ids, resource):
     available_resources = taxonomy_repo.resources()
     type_ = 'resource'
@@ -63,33 +66,38 @@ def _taxonomy_counts(resource, taxonomy_repo, level, sample_ids):
     taxonomy_ = taxonomy_repo.model(resource)
 
     counts = taxonomy_.get_counts(level, sample_ids)
-    response = jsonify(counts)
-    return response
+    return counts
 
 
 def group_counts(body, dataset, resource, level):
     taxonomy_repo = _get_taxonomy_repo(dataset)
     sample_ids = body['sample_ids']
     _check_resource_and_missing_ids_alt(taxonomy_repo, sample_ids, resource)
-    response = _taxonomy_counts(resource, taxonomy_repo, level, sample_ids)
-    return response, 200
+    counts = _taxonomy_counts(resource, taxonomy_repo, level, sample_ids)
+    return jsonify(counts), 200
 
 
 def single_counts(dataset, resource, sample_id, level):
     taxonomy_repo = _get_taxonomy_repo(dataset)
     sample_ids = [sample_id]
     _check_resource_and_missing_ids_alt(taxonomy_repo, sample_ids, resource)
-    response = _taxonomy_counts(resource, taxonomy_repo, level, sample_ids)
-    return response, 200
+    counts = _taxonomy_counts(resource, taxonomy_repo, level, sample_ids)
+    return jsonify(counts), 200
 
 
 def get_empress(dataset, resource):
     taxonomy_repo = _get_taxonomy_repo(dataset)
-    taxonomy_model = taxonomy_repo.model(resource)
-    empress_model = Empress(taxonomy_model.bp_tree)
-    return empress_model.to_dict()
+    # the tree is the same for any concurrent request of the resource
+    key = ('empress', id(taxonomy_repo.tables.get(resource)), resource)
+
+    def compute():
+        taxonomy_model = taxonomy_repo.model(resource)
+        return Empress(taxonomy_model.bp_tree).to_dict()
 
+    return flights.do(key, compute)
 
+
+@traced()
 def _check_resource_and_missing_ids(taxonomy_repo, sample_ids, resource):
     available_resources = taxonomy_repo.resources()
 
@@ -113,20 +121,33 @@ def _summarize_group(sample_ids, table_name, taxonomy_repo):
                                                      sample_ids, table_name)
     if error_response:
         return error_response
-    taxonomy_ = taxonomy_repo.model(table_name)
-
-    taxonomy_data = taxonomy_.get_group(sample_ids, '').to_dict()
-    del taxonomy_data['name']
-    response = jsonify(taxonomy_data)
+    response = jsonify(_group_summary(sample_ids, table_name, taxonomy_repo))
     return response, 200
 
 
+def _group_summary(sample_ids, table_name, taxonomy_repo):
+    key = ('taxonomy-group', id(taxonomy_repo.tables.get(table_name)),
+           table_name, tuple(sample_ids))
+
+    def compute():
+        taxonomy_ = taxonomy_repo.model(table_name)
+        taxonomy_data = taxonomy_.get_group(sample_ids, '').to_dict()
+        del taxonomy_data['name']
+        return taxonomy_data
+
+    return flights.do(key, compute)
+
+
 def resources_alt(dataset):
     taxonomy_repo = _get_taxonomy_repo(dataset)
+    return jsonify(_resources(taxonomy_repo)), 200
+
+
+def _resources(taxonomy_repo):
     ret_val = {
         'resources': taxonomy_repo.resources(),
     }
-    return jsonify(ret_val), 200
+    return ret_val
 
 
 def resources():
@@ -173,10 +194,14 @@ def _present_microbes_taxonomy_table(sample_ids, resource, taxonomy_repo):
     if error_response:
         return error_response
 
+    response = jsonify(_presence_table(sample_ids, resource, taxonomy_repo))
+    return response, 200
+
+
+def _presence_table(sample_ids, resource, taxonomy_repo):
     taxonomy_ = taxonomy_repo.model(resource)
     taxonomy_table = taxonomy_.presence_data_table(sample_ids)
-    response = jsonify(taxonomy_table.to_dict())
-    return response, 200
+    return taxonomy_table.to_dict()
 
 
 def exists_single_alt(dataset, resource, sample_id):
@@ -238,6 +263,10 @@ def ranks_specific(dataset, resource, sample_id):
     if error_response:
         return error_response
 
+    return jsonify(_ranks_specific(taxonomy_repo, resource, sample_id)), 200
+
+
+def _ranks_specific(taxonomy_repo, resource, sample_id):
     taxonomy_ = taxonomy_repo.model(resource)
     summary = taxonomy_.ranks_specific(sample_id)
     order = taxonomy_.ranks_order(summary['Taxon'])
@@ -245,5 +274,4 @@ def ranks_specific(dataset, resource, sample_id):
     payload = summary.to_dict('list')
     payload.pop('Sample ID')
     payload['Taxa-order'] = order
-
-    return jsonify(payload), 200
+    return payload
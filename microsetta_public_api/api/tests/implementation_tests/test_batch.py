@@ -0,0 +1,236 @@
+import json
+from unittest import TestCase
+from unittest.mock import patch
+import pandas as pd
+import yaml
+from flask import Flask, g
+from pkg_resources import resource_filename
+from microsetta_public_api.api.batch import batch, operations, Operation
+from microsetta_public_api.api.diversity import alpha
+from microsetta_public_api.config import DictElement, AlphaElement
+from microsetta_public_api.exceptions import UnknownID, UnknownResource
+from microsetta_public_api.repo._alpha_repo import AlphaRepo
+from microsetta_public_api.utils.testing import (
+    MockMetadataElement,
+    TrivialVisitor,
+)
+from microsetta_public_api._tracing import Trace, continued, span
+
+
+def _alpha(dataset, sample_id, alpha_metric):
+    if sample_id == 'dne':
+        raise UnknownID(f"Sample ID not found. Got: {sample_id}")
+    return dict(dataset=dataset.name, sample_id=sample_id,
+                alpha_metric=alpha_metric)
+
+
+def _available(dataset):
+    return ['shannon', 'chao1']
+
+
+def _broken(dataset):
+    raise RuntimeError('broken')
+
+
+def _context(dataset):
+    with span('context'):
+        return g.get('marker')
+
+
+class BatchImplementationTests(TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.context = self.app.app_context()
+        self.context.push()
+        self.operations_patcher = patch.dict(
+            'microsetta_public_api.api.batch.operations',
+            {'alpha': Operation(alpha.get_alpha_alt, _alpha),
+             'alpha_metrics': Operation(alpha.available_metrics_alpha_alt,
+                                        _available),
+             'broken': Operation(None, _broken),
+             'context': Operation(None, _context)},
+            clear=True)
+        self.operations_patcher.start()
+        self.resources = DictElement({
+            'datasets': DictElement({'16S': DictElement({})}),
+        })
+        self.resources_patcher = patch(
+            'microsetta_public_api.api.batch.get_resources',
+            return_value=self.resources)
+        self.resources_patcher.start()
+
+    def tearDown(self):
+        self.resources_patcher.stop()
+        self.operations_patcher.stop()
+        self.context.pop()
+
+    def _batch(self, body, dataset='16S'):
+        response, code = batch(body, dataset)
+        return json.loads(response.data), code
+
+    def test_batch(self):
+        for parallel in [True, False]:
+            with self.subTest(parallel=parallel):
+                obs, code = self._batch({
+                    'sample_id': 'sample-1',
+                    'parallel': parallel,
+                    'operations': [
+                        {'id': 'shannon', 'op': 'alpha',
+                         'params': {'alpha_metric': 'shannon'}},
+                        {'op': 'alpha', 'params': {'alpha_metric': 'chao1',
+                                                   'sample_id': 'sample-2'}},
+                        {'id': 'metrics', 'op': 'alpha_metrics'},
+                    ]
+                })
+                self.assertEqual(200, code)
+                self.assertListEqual([
+                    {'id': 'shannon', 'op': 'alpha', 'status': 200,
+                     'body': {'dataset': '16S', 'sample_id': 'sample-1',
+                              'alpha_metric': 'shannon'}},
+                    {'id': '1', 'op': 'alpha', 'status': 200,
+                     'body': {'dataset': '16S', 'sample_id': 'sample-2',
+                              'alpha_metric': 'chao1'}},
+                    {'id': 'metrics', 'op': 'alpha_metrics', 'status': 200,
+                     'body': ['shannon', 'chao1']},
+                ], obs['results'])
+
+    def test_batch_operation_errors(self):
+        obs, code = self._batch({
+            'sample_id': 'dne',
+            'operations': [
+                {'op': 'alpha', 'params': {'alpha_metric': 'shannon'}},
+                {'op': 'alpha'},
+                {'op': 'broken'},
+                {'op': 'alpha_metrics'},
+            ]
+        })
+        self.assertEqual(200, code)
+        self.assertListEqual([404, 400, 500, 200],
+                             [result['status'] for result in obs['results']])
+        self.assertIn('Sample ID not found', obs['results'][0]['body']['text'])
+        self.assertIn('alpha_metric', obs['results'][1]['body']['text'])
+        # internal errors are not described to the client
+        self.assertNotIn('broken', obs['results'][2]['body']['text'])
+
+    def test_batch_invalid_params(self):
+        obs, code = self._batch({
+            'sample_id': 'sample-1',
+            'operations': [
+                {'op': 'alpha', 'params': {'alpha_metric': 'shannon',
+                                           'dataset': 'WGS'}},
+                {'op': 'alpha', 'params': {'alpha_metric': 5}},
+                {'op': 'alpha', 'params': {'alpha_metric': 'shannon',
+                                           'foo': 'bar'}},
+                {'op': 'alpha_metrics', 'params': {'dataset': 'WGS'}},
+            ]
+        })
+        self.assertEqual(200, code)
+        self.assertListEqual([400, 400, 400, 400],
+                             [result['status'] for result in obs['results']])
+        self.assertIn('dataset', obs['results'][0]['body']['text'])
+        self.assertIn('params.alpha_metric',
+                      obs['results'][1]['body']['text'])
+        self.assertIn('foo', obs['results'][2]['body']['text'])
+        self.assertIn('dataset', obs['results'][3]['body']['text'])
+
+    def test_batch_unknown_dataset(self):
+        with self.assertRaises(UnknownResource):
+            batch({'operations': [{'op': 'alpha_metrics'}]}, 'dne')
+
+    def test_batch_unknown_sample(self):
+        metadata = MockMetadataElement(pd.DataFrame({'age_cat': ['30s']},
+                                                    index=['sample-1']))
+        metadata.accept(TrivialVisitor())
+        self.resources['datasets']['16S']['__metadata__'] = metadata
+        obs, code = self._batch({
+            'sample_id': 'sample-1',
+            'operations': [{'op': 'alpha',
+                            'params': {'alpha_metric': 'shannon'}}],
+        })
+        self.assertEqual(200, code)
+        with self.assertRaisesRegex(UnknownID, 'dne'):
+            batch({'sample_id': 'dne',
+                   'operations': [{'op': 'alpha_metrics'}] * 2}, '16S')
+
+    def test_batch_shares_request_and_trace(self):
+        g.marker = 'batch'
+        trace = Trace('batch', 'POST /batch')
+        with continued((trace, None)):
+            obs, code = self._batch({
+                'operations': [{'op': 'context'}] * 3,
+            })
+        self.assertEqual(200, code)
+        self.assertListEqual(['batch'] * 3,
+                             [result['body'] for result in obs['results']])
+        self.assertEqual(3, [span_['name'] for span_ in trace.spans]
+                         .count('context'))
+
+    def test_batch_unknown_operation(self):
+        obs, code = self._batch({'operations': [{'op': 'foo'}]})
+        self.assertEqual(400, code)
+        self.assertIn('foo', obs['text'])
+
+    def test_batch_too_many_operations(self):
+        obs, code = self._batch({'operations': [{'op': 'alpha_metrics'}] *
+                                 51})
+        self.assertEqual(400, code)
+        self.assertIn('at most 50', obs['text'])
+
+
+class BatchRepoTests(TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.context = self.app.app_context()
+        self.context.push()
+        resources = DictElement({'datasets': DictElement({
+            '16S': DictElement({'__alpha__': AlphaElement({
+                'shannon': pd.Series({'sample-1': 5.1, 'sample-2': 6.2}),
+                'chao1': pd.Series({'sample-1': 1.1}),
+            })}),
+        })})
+        resources.accept(TrivialVisitor())
+        self.resources_patcher = patch(
+            'microsetta_public_api.api.batch.get_resources',
+            return_value=resources)
+        self.resources_patcher.start()
+
+    def tearDown(self):
+        self.resources_patcher.stop()
+        self.context.pop()
+
+    def test_repo_built_once(self):
+        with patch('microsetta_public_api.api.batch.AlphaRepo',
+                   wraps=AlphaRepo) as repo:
+            response, code = batch({
+                'sample_id': 'sample-1',
+                'parallel': False,
+                'operations': [
+                    {'op': 'alpha', 'params': {'alpha_metric': 'shannon'}},
+                    {'op': 'alpha', 'params': {'alpha_metric': 'chao1'}},
+                    {'op': 'alpha_metrics'},
+                    {'op': 'taxonomy_available'},
+                ]
+            }, '16S')
+        self.assertEqual(1, repo.call_count)
+        results = json.loads(response.data)['results']
+        self.assertListEqual([200, 200, 200, 404],
+                             [result['status'] for result in results])
+        self.assertEqual(5.1, results[0]['body']['data'])
+        self.assertEqual(1.1, results[1]['body']['data'])
+        self.assertCountEqual(['shannon', 'chao1'],
+                              results[2]['body']['alpha_metrics'])
+        self.assertIn('No taxonomy data', results[3]['body']['text'])
+
+
+class BatchOperationsTests(TestCase):
+
+    def test_operations_match_api(self):
+        api_file = resource_filename('microsetta_public_api.api',
+                                     'microsetta_public_api.yml')
+        with open(api_file) as fp:
+            api = yaml.safe_load(fp)
+        request = api['components']['schemas']['batchRequest']
+        ops = request['properties']['operations']['items']['properties']
+        self.assertCountEqual(operations, ops['op']['enum'])
@@ -15,7 +15,9 @@ from microsetta_public_api.config import (
     DictElement,
     PCOAElement,
 )
-from microsetta_public_api.exceptions import UnknownResource
+from microsetta_public_api.exceptions import (
+    UnknownResource, InvalidParameter,
+)
 
 
 class EmperorImplementationTests(MockedJsonifyTestCase):
@@ -60,16 +62,15 @@ class EmperorImplementationTests(MockedJsonifyTestCase):
         with patch.object(PCoARepo, 'has_pcoa') as mock_has_pc, \
                 patch.object(MetadataRepo, 'has_category') as mock_has_md, \
                 patch.object(PCoARepo, 'get_pcoa') as mock_get_pc, \
-                patch.object(MetadataRepo, 'get_metadata') as mock_get_md:
+                patch.object(MetadataRepo, 'get_metadata_rows') as \
+                mock_get_md:
             # using samples s1, s2
             # using categories 'num_cat' and 'age_cat'
             mock_has_pc.return_value = True
             mock_has_md.return_value = [True, True]
             mock_get_pc.return_value = self.pcoa1
-            mock_get_md.return_value = self.test_metadata.loc[['s1', 's2'],
-                                                              ['num_cat',
-                                                               'age_cat']
-                                                              ]
+            mock_get_md.return_value = self.test_metadata.loc[
+                ['s1', 's2'], ['num_cat', 'age_cat']].values.tolist()
             response, code = plot_pcoa('beta_metric', 'sample_set',
                                        ['num_cat', 'age_cat'])
         response = json.loads(response)
@@ -154,6 +155,21 @@ class EmperorAltTests(MockedJsonifyTestCase):
                 'other': [1, 2, 3, 4, None],
             }, index=pd.Series(['s1', 's2', 'c', 'd', 'e'], name='#SampleID')
         )
+        # 200 samples, 3 in 4 of which are in their 30s
+        large_ids = [f'x{i}' for i in range(200)]
+        rng = np.random.RandomState(0)
+        cls.large_pcoa = OrdinationResults(
+            'large', 'large',
+            eigvals=pd.Series([7, 2, 1], index=axis_labels),
+            samples=pd.DataFrame(rng.normal(size=(200, 3)),
+                                 index=large_ids, columns=axis_labels),
+            proportion_explained=pd.Series([0.7, 0.2, 0.1],
+                                           index=axis_labels),
+        )
+        cls.large_metadata = pd.DataFrame(
+            {'age_cat': ['30s', '30s', '30s', '40s'] * 50},
+            index=pd.Series(large_ids, name='#SampleID'),
+        )
         cls.resources = DictElement({
             'datasets': DictElement({
                 'dataset1': DictElement({
@@ -167,6 +183,15 @@ class EmperorAltTests(MockedJsonifyTestCase):
                 'dataset2': DictElement({
                     '__metadata__': MockMetadataElement(cls.test_metadata),
                 }),
+                'dataset3': DictElement({
+                    '__metadata__': MockMetadataElement(
+                        cls.large_metadata),
+                    '__pcoa__': PCOAElement({
+                        'sample_set': DictElement({
+                            'beta_metric': cls.large_pcoa,
+                        }),
+                    })
+                }),
             }),
         })
         cls.resources.accept(TrivialVisitor())
@@ -217,3 +242,64 @@ class EmperorAltTests(MockedJsonifyTestCase):
             plot_pcoa_alt('dataset1', beta_metric='beta_metric',
                           named_sample_set='sample_set',
                           metadata_categories=['num_var', 'age_cat'])
+
+    def test_emperor_downsample_stratified(self):
+        response, code = plot_pcoa_alt('dataset3', beta_metric='beta_metric',
+                                       named_sample_set='sample_set',
+                                       metadata_categories=['age_cat'],
+                                       downsample='stratified',
+                                       max_samples=20, sample_id='x0')
+        self.assertEqual(code, 200)
+        response = json.loads(response)
+        decomp = response['decomposition']
+        self.assertEqual(20, len(decomp['sample_ids']))
+        self.assertEqual(20, len(decomp['coordinates']))
+        self.assertIn('x0', decomp['sample_ids'])
+        # the coordinates and metadata are of the chosen samples
+        np.testing.assert_array_equal(
+            decomp['coordinates'],
+            self.large_pcoa.samples.loc[decomp['sample_ids']].values)
+        ages = [row[0] for row in response['metadata']]
+        self.assertEqual(15, ages.count('30s'))
+        self.assertEqual(5, ages.count('40s'))
+        self.assertDictEqual({'mode': 'stratified', 'seed': 0,
+                              'max_samples': 20, 'total_samples': 200},
+                             response['downsampling'])
+
+    def test_emperor_downsample_deterministic(self):
+        kwargs = dict(beta_metric='beta_metric',
+                      named_sample_set='sample_set',
+                      metadata_categories=['age_cat'], max_samples=30)
+        for mode in ('random', 'stratified', 'grid'):
+            first, _ = plot_pcoa_alt('dataset3', downsample=mode, seed=5,
+                                     **kwargs)
+            second, _ = plot_pcoa_alt('dataset3', downsample=mode, seed=5,
+                                      **kwargs)
+            self.assertEqual(json.loads(first), json.loads(second))
+            self.assertLessEqual(
+                len(json.loads(first)['decomposition']['sample_ids']), 30)
+
+    def test_emperor_downsample_not_needed(self):
+        response, code = plot_pcoa_alt('dataset1', beta_metric='beta_metric',
+                                       named_sample_set='sample_set',
+                                       metadata_categories=['age_cat'],
+                                       downsample='random', max_samples=10)
+        response = json.loads(response)
+        self.assertListEqual(['s1', 's2'],
+                             response['decomposition']['sample_ids'])
+        self.assertEqual(2, response['downsampling']['total_samples'])
+
+    def test_emperor_downsample_missing_category_404(self):
+        with self.assertRaisesRegex(UnknownResource, 'dne'):
+            plot_pcoa_alt('dataset3', beta_metric='beta_metric',
+                          named_sample_set='sample_set',
+                          metadata_categories=['age_cat'],
+                          downsample='stratified', max_samples=10,
+                          downsample_category='dne')
+
+    def test_emperor_downsample_stratified_no_category(self):
+        with self.assertRaises(InvalidParameter):
+            plot_pcoa_alt('dataset3', beta_metric='beta_metric',
+                          named_sample_set='sample_set',
+                          metadata_categories=[],
+                          downsample='stratified', max_samples=10)
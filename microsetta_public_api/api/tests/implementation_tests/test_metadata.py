@@ -14,6 +14,10 @@ from microsetta_public_api.api.metadata import (
     filter_sample_ids_query_builder_alt,
     categories_alt,
     get_metadata_values_alt,
+    all_category_values,
+    all_category_values_alt,
+    category_statistics,
+    category_statistics_alt,
 )
 import pandas as pd
 
@@ -130,6 +134,46 @@ class MetadataImplementationTests(MockedJsonifyTestCase):
         self.assertRegex(api_out['text'],
                          r"Metadata category: 'foo' does not exist.")
 
+    def test_metadata_all_category_values(self):
+        metadata_df = pd.DataFrame({'age_cat': ['30s', None, '40s', '30s'],
+                                    'num_cat': [7.5, 7.5, 8.0, None]})
+        with patch('microsetta_public_api.api.metadata._get_repo') as \
+                mock_repo:
+            mock_repo.return_value = MetadataRepo(metadata_df)
+            response, code = all_category_values()
+
+        self.assertEqual(code, 200)
+        self.assertDictEqual({'age_cat': ['30s', '40s'],
+                              'num_cat': [7.5, 8.0]},
+                             json.loads(response))
+
+    def test_metadata_category_statistics(self):
+        metadata_df = pd.DataFrame({'age_cat': ['30s', None, '40s', '30s']})
+        with patch('microsetta_public_api.api.metadata._get_repo') as \
+                mock_repo:
+            mock_repo.return_value = MetadataRepo(metadata_df)
+            response, code = category_statistics('age_cat')
+
+        self.assertEqual(code, 200)
+        self.assertDictEqual({'category': 'age_cat',
+                              'n_samples': 4,
+                              'null_count': 1,
+                              'values': [{'value': '30s', 'count': 2},
+                                         {'value': '40s', 'count': 1}]},
+                             json.loads(response))
+
+    def test_metadata_category_statistics_category_dne(self):
+        metadata_df = pd.DataFrame({'age_cat': ['30s', None, '40s', '30s']})
+        with patch('microsetta_public_api.api.metadata._get_repo') as \
+                mock_repo:
+            mock_repo.return_value = MetadataRepo(metadata_df)
+            response, code = category_statistics('foo')
+
+        self.assertEqual(code, 404)
+        api_out = json.loads(response)
+        self.assertRegex(api_out['text'],
+                         r"Metadata category: 'foo' does not exist.")
+
     def test_metadata_filter_sample_ids_age_cat(self):
         with patch.object(MetadataRepo, 'sample_id_matches') as mock_matches, \
                 patch('microsetta_public_api.repo._metadata_repo.MetadataRepo.'
@@ -407,6 +451,46 @@ class MetadataAltImplementationTests(MockedJsonifyTestCase):
         self.assertRegex(api_out['text'],
                          r"Metadata category: 'foo' does not exist.")
 
+    def test_metadata_all_category_values(self):
+        metadata_df = pd.DataFrame({'age_cat': ['30s', None, '40s', '30s'],
+                                    'num_cat': [7.5, 7.5, 8.0, None]})
+        with patch('microsetta_public_api.api.metadata._get_repo_alt') as \
+                mock_repo:
+            mock_repo.return_value = MetadataRepo(metadata_df)
+            response, code = all_category_values_alt(self.dataset)
+
+        self.assertEqual(code, 200)
+        self.assertDictEqual({'age_cat': ['30s', '40s'],
+                              'num_cat': [7.5, 8.0]},
+                             json.loads(response))
+
+    def test_metadata_category_statistics(self):
+        metadata_df = pd.DataFrame({'age_cat': ['30s', None, '40s', '30s']})
+        with patch('microsetta_public_api.api.metadata._get_repo_alt') as \
+                mock_repo:
+            mock_repo.return_value = MetadataRepo(metadata_df)
+            response, code = category_statistics_alt(self.dataset, 'age_cat')
+
+        self.assertEqual(code, 200)
+        self.assertDictEqual({'category': 'age_cat',
+                              'n_samples': 4,
+                              'null_count': 1,
+                              'values': [{'value': '30s', 'count': 2},
+                                         {'value': '40s', 'count': 1}]},
+                             json.loads(response))
+
+    def test_metadata_category_statistics_category_dne(self):
+        metadata_df = pd.DataFrame({'age_cat': ['30s', None, '40s', '30s']})
+        with patch('microsetta_public_api.api.metadata._get_repo_alt') as \
+                mock_repo:
+            mock_repo.return_value = MetadataRepo(metadata_df)
+            response, code = category_statistics_alt(self.dataset, 'foo')
+
+        self.assertEqual(code, 404)
+        api_out = json.loads(response)
+        self.assertRegex(api_out['text'],
+                         r"Metadata category: 'foo' does not exist.")
+
     def test_metadata_filter_sample_ids_age_cat(self):
         with patch.object(MetadataRepo, 'sample_id_matches') as mock_matches, \
                 patch('microsetta_public_api.repo._metadata_repo.MetadataRepo.'
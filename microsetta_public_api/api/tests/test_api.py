@@ -2,7 +2,12 @@ from unittest.mock import patch
 from flask import jsonify
 import json
 from microsetta_public_api.utils.testing import FlaskTests
+from microsetta_public_api.config import (
+    SERVER_CONFIG,
+    resources as config_resources,
+)
 from microsetta_public_api.exceptions import UnknownID
+from microsetta_public_api._loading import LoadTracker
 
 
 class DatasetsAvailableTests(FlaskTests):
@@ -1973,3 +1978,154 @@ class EmperorTests(FlaskTests):
             named_sample_set='body-habitat',
             metadata_categories=['bmi_cat', 'num_cat'],
         )
+
+
+class MetricsAPITests(FlaskTests):
+
+    def test_metrics(self):
+        self.client.get('/results-api/available/dataset')
+        response = self.client.get('/results-api/metrics')
+        self.assertStatusCode(200, response)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        self.assertIn(b'mpubapi_requests_total{method="GET",'
+                      b'endpoint="/results-api/available/dataset"',
+                      response.data)
+
+
+class AdminProfileTests(FlaskTests):
+
+    def test_profile_requires_token(self):
+        with patch('microsetta_public_api.api.admin._admin_token') as token:
+            token.return_value = 'secret'
+            response = self.client.get('/results-api/admin/profile'
+                                       '?seconds=0.1')
+            self.assertStatusCode(401, response)
+            response = self.client.get(
+                '/results-api/admin/profile?seconds=0.1',
+                headers={'Authorization': 'Bearer wrong'})
+            self.assertStatusCode(401, response)
+
+    def test_profile_unconfigured(self):
+        with patch('microsetta_public_api.api.admin._admin_token') as token:
+            token.return_value = None
+            response = self.client.get(
+                '/results-api/admin/profile?seconds=0.1',
+                headers={'Authorization': 'Bearer '})
+            self.assertStatusCode(401, response)
+
+    def test_profile(self):
+        with patch('microsetta_public_api.api.admin._admin_token') as token:
+            token.return_value = 'secret'
+            response = self.client.get(
+                '/results-api/admin/profile?seconds=0.1&include_idle=true',
+                headers={'Authorization': 'Bearer secret'})
+        self.assertStatusCode(200, response)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+
+
+class DebugTracesTests(FlaskTests):
+
+    def test_traces_require_token(self):
+        with patch('microsetta_public_api.api.admin._admin_token') as token:
+            token.return_value = 'secret'
+            response = self.client.get('/results-api/debug/traces')
+            self.assertStatusCode(401, response)
+            response = self.client.get('/results-api/debug/traces/abc123')
+            self.assertStatusCode(401, response)
+            response = self.client.get(
+                '/results-api/debug/traces',
+                headers={'Authorization': 'Bearer wrong'})
+            self.assertStatusCode(401, response)
+
+    def test_traces_disabled(self):
+        with patch('microsetta_public_api.api.admin._admin_token') as token:
+            token.return_value = 'secret'
+            response = self.client.get(
+                '/results-api/debug/traces',
+                headers={'Authorization': 'Bearer secret'})
+        self.assertStatusCode(404, response)
+
+
+class HealthAPITests(FlaskTests):
+
+    def setUp(self):
+        super().setUp()
+        self.patcher = patch('microsetta_public_api.api.health.tracker',
+                             LoadTracker(estimate_memory=False))
+        self.tracker = self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        super().tearDown()
+
+    def test_ready(self):
+        response = self.client.get('/results-api/health/ready')
+        self.assertStatusCode(503, response)
+        self.assertEqual('not_started', json.loads(response.data)['status'])
+
+        paths = self.tracker.begin([(('datasets', '16S', '__alpha__'),
+                                     None)])
+        response = self.client.get('/results-api/health/ready')
+        self.assertStatusCode(503, response)
+
+        self.tracker.start(paths[0])
+        self.tracker.finish(paths[0])
+        self.tracker.end(paths, True)
+        response = self.client.get('/results-api/health/ready')
+        self.assertStatusCode(200, response)
+        self.assertTrue(json.loads(response.data)['ready'])
+
+    def test_health(self):
+        paths = self.tracker.begin([(('datasets', '16S', '__alpha__'),
+                                     None)])
+        response = self.client.get('/results-api/health')
+        self.assertStatusCode(200, response)
+        obs = json.loads(response.data)
+        self.assertEqual('loading', obs['status'])
+        self.assertEqual('datasets/16S/__alpha__',
+                         obs['resources'][0]['resource'])
+        self.assertEqual('pending', obs['resources'][0]['state'])
+        self.assertIn('rss_bytes', obs['process'])
+        self.tracker.end(paths, False)
+
+
+class AdminReloadTests(FlaskTests):
+
+    def test_reload_requires_token(self):
+        with patch('microsetta_public_api.api.admin._admin_token') as token:
+            token.return_value = 'secret'
+            response = self.client.post('/results-api/admin/reload')
+        self.assertStatusCode(401, response)
+
+    def test_reload(self):
+        with patch('microsetta_public_api.api.admin._admin_token') as token, \
+                patch('microsetta_public_api.api.admin.get_reloader') as \
+                get_reloader:
+            token.return_value = 'secret'
+            get_reloader.return_value.submit.return_value = ([], None)
+            response = self.client.post(
+                '/results-api/admin/reload',
+                headers={'Authorization': 'Bearer secret'})
+        self.assertStatusCode(202, response)
+        self.assertDictEqual({'changes': []}, json.loads(response.data))
+
+    def test_reload_config_committed_once_published(self):
+        config = {'datasets': {'16S': {'__metadata__': '/tmp/md.txt'}}}
+        served = dict(config_resources)
+        with patch('microsetta_public_api.api.admin._admin_token') as token, \
+                patch('microsetta_public_api.api.admin.get_reloader') as \
+                get_reloader, \
+                patch.dict(SERVER_CONFIG), patch.dict(config_resources):
+            token.return_value = 'secret'
+            get_reloader.return_value.submit.return_value = ([], None)
+            response = self.client.post(
+                '/results-api/admin/reload', json=config,
+                headers={'Authorization': 'Bearer secret'})
+            self.assertStatusCode(202, response)
+            (planned,), kwargs = get_reloader.return_value.submit.call_args
+            self.assertDictEqual(config, planned)
+            # not committed until the reload is served
+            self.assertDictEqual(served, config_resources)
+            kwargs['on_publish']()
+            self.assertDictEqual(config, config_resources)
+            self.assertDictEqual(config, SERVER_CONFIG['resources'])
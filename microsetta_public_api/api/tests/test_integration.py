@@ -6,6 +6,7 @@ from biom.util import biom_open
 from qiime2 import Artifact, Metadata
 from numpy.testing import assert_allclose
 from skbio.stats.ordination import OrdinationResults
+from skbio import DistanceMatrix
 from copy import deepcopy
 
 from microsetta_public_api import config
@@ -152,6 +153,30 @@ class MetadataIntegrationTests(IntegrationTests):
             "/results-api/metadata/category/values/non-existing-cat")
         self.assertStatusCode(404, response)
 
+    def test_metadata_all_category_values(self):
+        response = self.client.get(
+            "/results-api/metadata/category/values")
+        self.assertStatusCode(200, response)
+        obs = json.loads(response.data)
+        self.assertDictEqual({'age_cat': ['30s', '40s', '50s'],
+                              'bmi_cat': ['normal', 'not', 'overweight'],
+                              'num_cat': [20, 30, 7.15, 8.25]},
+                             obs)
+
+    def test_metadata_category_statistics(self):
+        response = self.client.get(
+            "/results-api/metadata/category/statistics/num_cat")
+        self.assertStatusCode(200, response)
+        obs = json.loads(response.data)
+        self.assertDictEqual({'category': 'num_cat',
+                              'n_samples': 7,
+                              'null_count': 1,
+                              'values': [{'value': 20, 'count': 1},
+                                         {'value': 30, 'count': 2},
+                                         {'value': 7.15, 'count': 2},
+                                         {'value': 8.25, 'count': 1}]},
+                             obs)
+
     def test_metadata_sample_ids_returns_simple(self):
         exp_ids = ['sample-1', 'sample-4']
         response = self.client.get(
@@ -848,6 +873,85 @@ class AlphaIntegrationTests(IntegrationTests):
                              obs['alpha_diversity'])
         self.assertEqual('observed_otus', obs['alpha_metric'])
 
+    def test_alpha_sample(self):
+        response = self.client.get(
+            '/results-api/dataset/16SAmplicon/diversity/alpha/sample/'
+            'sample-foo-bar')
+        self.assertStatusCode(200, response)
+        obs = json.loads(response.data)
+        self.assertDictEqual({'sample_id': 'sample-foo-bar',
+                              'data': {'observed_otus': 7.24,
+                                       'chao1': 9.01,
+                                       'shannon': None}},
+                             obs)
+
+        response = self.client.get(
+            '/results-api/dataset/16SAmplicon/diversity/alpha/sample/'
+            'sample-foo-bar?alpha_metrics=chao1')
+        self.assertStatusCode(200, response)
+        obs = json.loads(response.data)
+        self.assertDictEqual({'chao1': 9.01}, obs['data'])
+
+    def test_alpha_sample_404(self):
+        response = self.client.get(
+            '/results-api/dataset/16SAmplicon/diversity/alpha/sample/'
+            'sample-dne')
+        self.assertStatusCode(404, response)
+        response = self.client.get(
+            '/results-api/dataset/16SAmplicon/diversity/alpha/sample/'
+            'sample-foo-bar?alpha_metrics=dne-metric')
+        self.assertStatusCode(404, response)
+
+    def test_alpha_values(self):
+        response = self.client.post(
+            '/results-api/dataset/16SAmplicon/diversity/alpha/values',
+            content_type='application/json',
+            data=json.dumps({'sample_ids': ['sample-3', 'sample-qux-quux'],
+                             'alpha_metrics': ['shannon', 'chao1']})
+        )
+        self.assertStatusCode(200, response)
+        obs = json.loads(response.data)
+        self.assertDictEqual({'sample_ids': ['sample-3', 'sample-qux-quux'],
+                              'alpha_metrics': ['shannon', 'chao1'],
+                              'data': [[9.31, None], [None, 9.04]]},
+                             obs)
+
+    def test_batch(self):
+        response = self.client.post(
+            '/results-api/dataset/16SAmplicon/batch',
+            content_type='application/json',
+            data=json.dumps({
+                'sample_id': 'sample-foo-bar',
+                'operations': [
+                    {'id': 'observed_otus', 'op': 'alpha',
+                     'params': {'alpha_metric': 'observed_otus'}},
+                    {'id': 'chao1', 'op': 'alpha',
+                     'params': {'alpha_metric': 'chao1'}},
+                    {'id': 'shannon', 'op': 'alpha',
+                     'params': {'alpha_metric': 'shannon'}},
+                    {'id': 'metrics', 'op': 'alpha_metrics'},
+                ]
+            })
+        )
+        self.assertStatusCode(200, response)
+        results = json.loads(response.data)['results']
+        self.assertListEqual(['observed_otus', 'chao1', 'shannon', 'metrics'],
+                             [result['id'] for result in results])
+        self.assertListEqual([200, 200, 404, 200],
+                             [result['status'] for result in results])
+        self.assertEqual(7.24, results[0]['body']['data'])
+        self.assertEqual(9.01, results[1]['body']['data'])
+        self.assertCountEqual(['observed_otus', 'chao1', 'shannon'],
+                              results[3]['body']['alpha_metrics'])
+
+    def test_batch_unknown_dataset(self):
+        response = self.client.post(
+            '/results-api/dataset/dne/batch',
+            content_type='application/json',
+            data=json.dumps({'operations': [{'op': 'alpha_metrics'}]})
+        )
+        self.assertStatusCode(404, response)
+
 
 class TaxonomyAltIntegrationTests(IntegrationTests):
 
@@ -1448,12 +1552,24 @@ class BetaIntegrationTests(IntegrationTests):
                               header=True)
         import os
         print(os.stat(self.neighbors_path))
+        self.distances_path = self.create_tempfile(suffix='.qza').name
+        distances = DistanceMatrix([[0, 1, 2, 5, 9],
+                                    [1, 0, 3, 6, 8],
+                                    [2, 3, 0, 4, 7],
+                                    [5, 6, 4, 0, 1],
+                                    [9, 8, 7, 1, 0]],
+                                   ids=['s1', 's2', 's3', 's4', 's5'])
+        Artifact.import_data('DistanceMatrix', distances).save(
+            self.distances_path)
         config_alt = {
             'datasets': {
                 '16SAmplicon': {
                     '__neighbors__': {
                         'awesome-metric': self.neighbors_path,
                     },
+                    '__beta__': {
+                        'awesome-metric': self.distances_path,
+                    },
                 },
             }
         }
@@ -1486,6 +1602,60 @@ class BetaIntegrationTests(IntegrationTests):
         )
         self.assertStatusCode(404, response)
 
+    def test_k_nearest_from_distances(self):
+        response = self.client.get(
+            '/results-api/dataset/16SAmplicon/diversity/beta/awesome-metric'
+            '/nearest?sample_id=s5&k=2'
+        )
+        self.assertStatusCode(200, response)
+        self.assertListEqual(['s4', 's3'], json.loads(response.data))
+
+    def test_k_nearest_group(self):
+        response = self.client.post(
+            '/results-api/dataset/16SAmplicon/diversity/beta/awesome-metric'
+            '/nearest',
+            content_type='application/json',
+            data=json.dumps({'sample_ids': ['s1', 's4'], 'k': 3})
+        )
+        self.assertStatusCode(200, response)
+        self.assertDictEqual({'s1': ['s2', 's3', 's4'],
+                              's4': ['s5', 's3', 's1']},
+                             json.loads(response.data))
+
+    def test_k_nearest_group_unknown_id(self):
+        response = self.client.post(
+            '/results-api/dataset/16SAmplicon/diversity/beta/awesome-metric'
+            '/nearest',
+            content_type='application/json',
+            data=json.dumps({'sample_ids': ['s1', 'a']})
+        )
+        self.assertStatusCode(404, response)
+
+    def test_beta_distances(self):
+        response = self.client.post(
+            '/results-api/dataset/16SAmplicon/diversity/beta/awesome-metric'
+            '/distances?return_raw=true&percentiles=0,100',
+            content_type='application/json',
+            data=json.dumps({'sample_id': 's1',
+                             'sample_ids': ['s2', 's3', 's5']})
+        )
+        self.assertStatusCode(200, response)
+        obs = json.loads(response.data)
+        self.assertDictEqual({'s2': 1, 's3': 2, 's5': 9}, obs['distances'])
+        self.assertEqual(3, obs['group_summary']['group_size'])
+        self.assertEqual(4, obs['group_summary']['mean'])
+        self.assertListEqual([1, 9],
+                             obs['group_summary']['percentile_values'])
+
+    def test_beta_distances_unknown_id(self):
+        response = self.client.post(
+            '/results-api/dataset/16SAmplicon/diversity/beta/awesome-metric'
+            '/distances',
+            content_type='application/json',
+            data=json.dumps({'sample_id': 'a'})
+        )
+        self.assertStatusCode(404, response)
+
 
 class PlottingAltIntegrationTests(IntegrationTests):
 
@@ -1988,9 +2158,9 @@ class PCoAAltIntegrationTests(IntegrationTests):
         obs = json.loads(response.data)
 
         decomp = obs['decomposition']
-        np.testing.assert_array_equal(decomp["coordinates"],
-                                      self.pcoa1.samples.values
-                                      )
+        # coordinates are loaded as float32
+        np.testing.assert_allclose(decomp["coordinates"],
+                                   self.pcoa1.samples.values, rtol=1e-6)
         np.testing.assert_array_equal(decomp["percents_explained"],
                                       100
                                       * self.pcoa1.proportion_explained.values
@@ -2016,9 +2186,9 @@ class PCoAAltIntegrationTests(IntegrationTests):
         obs = json.loads(response.data)
 
         decomp = obs['decomposition']
-        np.testing.assert_array_equal(decomp["coordinates"],
-                                      self.pcoa2.samples.values
-                                      )
+        # coordinates are loaded as float32
+        np.testing.assert_allclose(decomp["coordinates"],
+                                   self.pcoa2.samples.values, rtol=1e-6)
         np.testing.assert_array_equal(decomp["percents_explained"],
                                       100
                                       * self.pcoa2.proportion_explained.values
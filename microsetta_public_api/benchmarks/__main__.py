@@ -0,0 +1,151 @@
+"""Benchmarks the API, repos and models over a synthetic dataset
+
+Examples
+--------
+Measure every operation over 100k samples, and compare with an earlier run:
+
+    python -m microsetta_public_api.benchmarks run --samples 100000
+    python -m microsetta_public_api.benchmarks compare \\
+        .benchmarks/results/abc1234-100000.json \\
+        .benchmarks/results/def5678-100000.json
+
+"""
+import argparse
+import json
+import os
+import sys
+
+from microsetta_public_api.benchmarks._synthetic import SyntheticDataset
+from microsetta_public_api.benchmarks import _runner
+
+
+def _dataset(args):
+    return SyntheticDataset(args.samples, n_features=args.features,
+                            max_distance_samples=args.distance_samples,
+                            seed=args.seed)
+
+
+def _write(dataset, directory):
+    """Writes a dataset, unless the directory already holds it"""
+    config_path = os.path.join(directory, 'config.json')
+    if os.path.exists(config_path):
+        with open(config_path) as fp:
+            return json.load(fp)
+    os.makedirs(directory, exist_ok=True)
+    config = dataset.write(directory)
+    with open(config_path, 'w') as fp:
+        json.dump(config, fp, indent=2)
+    return config
+
+
+def _data_directory(args):
+    return os.path.join(args.data_dir, f'{args.samples}-{args.features}-'
+                                       f'{args.distance_samples}-{args.seed}')
+
+
+def generate(args):
+    _write(_dataset(args), _data_directory(args))
+
+
+def run(args):
+    dataset = _dataset(args)
+    config = _write(dataset, _data_directory(args))
+    app, load_seconds = _runner.load(config)
+    print(f'loaded {args.samples} samples in {load_seconds:.2f} s')
+    name, = config['datasets']
+    benchmarks = []
+    if 'repo' in args.kinds or 'model' in args.kinds:
+        benchmarks.extend(
+            benchmark for benchmark in _runner.repo_benchmarks(
+                dataset, name, group_size=args.group_size)
+            if benchmark.kind in args.kinds)
+    if 'api' in args.kinds:
+        benchmarks.extend(_runner.api_benchmarks(
+            app.app.test_client(), dataset, name,
+            group_size=args.group_size))
+    results = _runner.run_benchmarks(benchmarks, repeat=args.repeat,
+                                     select=args.select, log=print)
+    environment = _runner.environment()
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir,
+                        f"{environment['commit'] or 'unknown'}-"
+                        f"{args.samples}.json")
+    _runner.save({
+        'environment': environment,
+        'parameters': {
+            'samples': args.samples,
+            'features': args.features,
+            'distance_samples': args.distance_samples,
+            'seed': args.seed,
+            'group_size': args.group_size,
+            'repeat': args.repeat,
+        },
+        'load_seconds': load_seconds,
+        'results': results,
+    }, path)
+    print(f'saved results to {path}')
+
+
+def compare(args):
+    rows = _runner.compare(_runner.read(args.old), _runner.read(args.new),
+                           threshold=args.threshold)
+    for row in rows:
+        flag = 'REGRESSED' if row['regressed'] else ''
+        print(f"{row['name']:<40} {row['old'] * 1000:10.2f} ms "
+              f"{row['new'] * 1000:10.2f} ms {row['ratio']:6.2f}x {flag}")
+    return 1 if any(row['regressed'] for row in rows) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m microsetta_public_api.benchmarks',
+        description=__doc__.split('\n')[0])
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    dataset_parser = argparse.ArgumentParser(add_help=False)
+    dataset_parser.add_argument('--samples', type=int, default=1000)
+    dataset_parser.add_argument('--features', type=int, default=2000)
+    dataset_parser.add_argument('--distance-samples', type=int,
+                                default=5000,
+                                help='The number of samples in the distance '
+                                     'matrix.')
+    dataset_parser.add_argument('--seed', type=int, default=0)
+    dataset_parser.add_argument('--data-dir', default='.benchmarks/data',
+                                help='Where datasets are written, and reused '
+                                     'from by later runs.')
+
+    generate_parser = subparsers.add_parser(
+        'generate', parents=[dataset_parser],
+        help='Write a synthetic dataset and its resource configuration.')
+    generate_parser.set_defaults(func=generate)
+
+    run_parser = subparsers.add_parser(
+        'run', parents=[dataset_parser],
+        help='Measure operations over a synthetic dataset.')
+    run_parser.add_argument('--output-dir', default='.benchmarks/results')
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--group-size', type=int, default=1000)
+    run_parser.add_argument('--kinds', nargs='+',
+                            default=['repo', 'model', 'api'],
+                            choices=['repo', 'model', 'api'])
+    run_parser.add_argument('--select',
+                            help='Only measure operations whose name '
+                                 'contains this.')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser(
+        'compare', help='Compare the latencies of two runs.')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=1.2,
+                                help='The ratio of new to old latency above '
+                                     'which an operation regressed.')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
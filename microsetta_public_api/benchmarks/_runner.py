@@ -0,0 +1,434 @@
+import copy
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import wait
+from time import perf_counter
+
+import numpy as np
+
+Benchmark = namedtuple('Benchmark', ['name', 'kind', 'func'])
+Benchmark.__doc__ = """An operation to measure
+
+name : str
+    Identifies the operation across runs, e.g., 'AlphaRepo.exists'.
+kind : str
+    'repo', 'model' or 'api'.
+func : callable
+    Runs the operation once, called without arguments.
+"""
+
+
+def measure(func, repeat=5):
+    """Measures the latency and memory of an operation
+
+    The operation runs once to measure its first, e.g., uncached, latency
+    and `repeat` more times to measure its latency once warm. The peak
+    memory that it allocates is measured in a final run, as tracing
+    allocations slows it down.
+
+    Parameters
+    ----------
+    func : callable
+        Runs the operation once.
+    repeat : int
+        The number of warm runs.
+
+    Returns
+    -------
+    dict
+        The first, min, median and max latency in seconds, and the peak
+        memory allocated in bytes.
+
+    """
+    start = perf_counter()
+    func()
+    first = perf_counter() - start
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'first': first,
+        'min': min(times),
+        'median': statistics.median(times),
+        'max': max(times),
+        'peak_memory': peak,
+    }
+
+
+def _max_rss():
+    # kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if platform.system() == 'Darwin' else rss * 1024
+
+
+def load(resource_config):
+    """Builds the app and loads resources into it
+
+    Parameters
+    ----------
+    resource_config : dict
+        The resource configuration, e.g., from `SyntheticDataset.write`.
+
+    Returns
+    -------
+    connexion.FlaskApp
+        The app, serving the resources.
+    float
+        The number of seconds it took to load the resources.
+
+    """
+    from microsetta_public_api import server
+    from microsetta_public_api.config import SERVER_CONFIG, schema
+
+    # the app is built without resources, which are then loaded in the
+    #  foreground so that the load can be timed and its errors raised
+    SERVER_CONFIG['resources'] = dict()
+    app = server.build_app()
+    wait(list(server.futures))
+    elements = schema.make_elements(copy.deepcopy(resource_config))
+    start = perf_counter()
+    server.atomic_update_resources(elements)
+    return app, perf_counter() - start
+
+
+def _sample_groups(sample_ids, group_size):
+    # spread over the dataset rather than the first samples
+    step = max(1, len(sample_ids) // group_size)
+    return list(sample_ids[::step][:group_size])
+
+
+def repo_benchmarks(dataset, name, group_size=1000, metric='euclidean',
+                    sample_set='all'):
+    """Benchmarks of the repos and models over a loaded dataset
+
+    Parameters
+    ----------
+    dataset : SyntheticDataset
+        The dataset, which must have been written and loaded as `name`.
+    name : str
+        The name of the loaded dataset.
+    group_size : int
+        The number of samples in group operations.
+    metric, sample_set : str
+        As passed to `SyntheticDataset.write`.
+
+    Returns
+    -------
+    list of Benchmark
+
+    """
+    from microsetta_public_api.config import schema
+    from microsetta_public_api.resources_alt import get_resources
+    from microsetta_public_api.utils._utils import stepwise_resource_getter
+    from microsetta_public_api.repo._alpha_repo import AlphaRepo
+    from microsetta_public_api.repo._beta_repo import BetaRepo, NeighborsRepo
+    from microsetta_public_api.repo._metadata_repo import MetadataRepo
+    from microsetta_public_api.repo._pcoa_repo import PCoARepo
+    from microsetta_public_api.repo._taxonomy_repo import TaxonomyRepo
+    from microsetta_public_api.models._alpha import Alpha
+    from microsetta_public_api.utils._downsample import downsample
+
+    def get(keyword, type_):
+        return stepwise_resource_getter(get_resources(), name, keyword,
+                                        type_).data
+
+    alpha_repo = AlphaRepo(get(schema.alpha_kw, 'alpha'))
+    metadata_repo = MetadataRepo(get(schema.metadata_kw, 'metadata'))
+    taxonomy_repo = TaxonomyRepo(get(schema.taxonomy_kw, 'taxonomy'))
+    pcoa_repo = PCoARepo(get(schema.pcoa_kw, 'pcoa'))
+    beta_repo = BetaRepo(get(schema.beta_kw, 'beta'))
+    neighbors_repo = NeighborsRepo(get(schema.neighbors_kw, 'neighbors'))
+
+    sample_id = dataset.sample_ids[0]
+    group = _sample_groups(dataset.sample_ids, group_size)
+    distance_ids = dataset.distance_matrix().ids
+    distance_group = list(distance_ids[1:group_size + 1])
+    model = taxonomy_repo.model('taxonomy')
+    alpha_model = Alpha(alpha_repo.get_alpha_diversity(group, 'shannon'))
+    query = {'condition': 'AND', 'rules': [
+        {'id': 'age_cat', 'field': 'age_cat', 'operator': 'equal',
+         'value': '30s'},
+        {'id': 'age_years', 'field': 'age_years', 'operator': 'less',
+         'value': 40},
+    ]}
+    samples = pcoa_repo.get_pcoa(sample_set, metric).samples
+    coordinates = samples.values
+    clusters = metadata_repo.get_metadata('cluster', sample_ids=samples.index)
+    origin = [0.] * 2
+    lower, upper = [-0.05] * 2, [0.05] * 2
+
+    return [
+        Benchmark('AlphaRepo.exists', 'repo',
+                  lambda: alpha_repo.exists(group, 'shannon')),
+        Benchmark('AlphaRepo.get_alpha_diversity', 'repo',
+                  lambda: alpha_repo.get_alpha_diversity(group, 'shannon')),
+        Benchmark('AlphaRepo.get_alpha_diversities', 'repo',
+                  lambda: alpha_repo.get_alpha_diversities(group)),
+        Benchmark('Alpha.get_group', 'model',
+                  lambda: alpha_model.get_group(name='')),
+        Benchmark('MetadataRepo.category_values', 'repo',
+                  lambda: metadata_repo.category_values('age_cat')),
+        Benchmark('MetadataRepo.category_statistics', 'repo',
+                  lambda: metadata_repo.category_statistics('age_cat')),
+        Benchmark('MetadataRepo.get_metadata_rows', 'repo',
+                  lambda: metadata_repo.get_metadata_rows(
+                      ['age_cat', 'bmi_cat'], sample_ids=group)),
+        Benchmark('MetadataRepo.sample_id_matches', 'repo',
+                  lambda: metadata_repo.sample_id_matches(query)),
+        Benchmark('TaxonomyRepo.exists', 'repo',
+                  lambda: taxonomy_repo.exists(group, 'taxonomy')),
+        Benchmark('Taxonomy.get_group', 'model',
+                  lambda: model.get_group(group, '')),
+        Benchmark('Taxonomy.get_counts', 'model',
+                  lambda: model.get_counts('Genus', group)),
+        Benchmark('Taxonomy.presence_data_table', 'model',
+                  lambda: model.presence_data_table(group)),
+        Benchmark('Taxonomy.ranks_specific', 'model',
+                  lambda: model.ranks_specific(sample_id)),
+        Benchmark('Taxonomy.ranks_order', 'model', model.ranks_order),
+        Benchmark('PCoARepo.k_nearest', 'repo',
+                  lambda: pcoa_repo.k_nearest(sample_set, metric,
+                                              [sample_id], k=10)),
+        Benchmark('PCoARepo.samples_in_box', 'repo',
+                  lambda: pcoa_repo.samples_in_box(sample_set, metric,
+                                                   lower, upper)),
+        Benchmark('PCoARepo.samples_in_radius', 'repo',
+                  lambda: pcoa_repo.samples_in_radius(sample_set, metric,
+                                                      origin, 0.05)),
+        Benchmark('PCoARepo.closest_samples', 'repo',
+                  lambda: pcoa_repo.closest_samples(sample_set, metric,
+                                                    origin, k=10)),
+        Benchmark('BetaRepo.k_nearest', 'repo',
+                  lambda: beta_repo.k_nearest([sample_id], metric, k=10)),
+        Benchmark('BetaRepo.distances', 'repo',
+                  lambda: beta_repo.distances(sample_id, metric)),
+        Benchmark('BetaRepo.distance_summary', 'repo',
+                  lambda: beta_repo.distance_summary(
+                      sample_id, metric, sample_ids=distance_group)),
+        Benchmark('NeighborsRepo.k_nearest', 'repo',
+                  lambda: neighbors_repo.k_nearest(sample_id, metric,
+                                                   k=10)),
+        Benchmark('downsample.grid', 'model',
+                  lambda: downsample(coordinates, 10000, mode='grid')),
+        Benchmark('downsample.stratified', 'model',
+                  lambda: downsample(coordinates, 10000, mode='stratified',
+                                     groups=clusters.values)),
+    ]
+
+
+def api_benchmarks(client, dataset, name, group_size=1000,
+                   metric='euclidean', sample_set='all'):
+    """Benchmarks of the API endpoints over a loaded dataset
+
+    Parameters
+    ----------
+    client : flask.testing.FlaskClient
+        A client of the app serving the dataset.
+    dataset : SyntheticDataset
+        The dataset, which must have been written and loaded as `name`.
+    name : str
+        The name of the loaded dataset.
+    group_size : int
+        The number of samples in group requests.
+    metric, sample_set : str
+        As passed to `SyntheticDataset.write`.
+
+    Returns
+    -------
+    list of Benchmark
+
+    """
+    prefix = f'/results-api/dataset/{name}'
+    sample_id = dataset.sample_ids[0]
+    group = _sample_groups(dataset.sample_ids, group_size)
+    distance_group = list(dataset.distance_matrix().ids[1:group_size + 1])
+    pcoa = f'diversity/beta/{metric}/pcoa/{sample_set}'
+    plot_pcoa = f'plotting/{pcoa}'
+    query = {'condition': 'AND', 'rules': [
+        {'id': 'age_cat', 'field': 'age_cat', 'operator': 'equal',
+         'value': '30s'},
+    ]}
+
+    def request(method, path, body=None):
+        def func():
+            response = client.open(f'{prefix}/{path}', method=method,
+                                   json=body)
+            if not 200 <= response.status_code < 300:
+                raise RuntimeError(f'{method} {path} responded with '
+                                   f'{response.status_code}: '
+                                   f'{response.get_data(as_text=True)}')
+        return func
+
+    def get(name_, path):
+        return Benchmark(name_, 'api', request('GET', path))
+
+    def post(name_, path, body):
+        return Benchmark(name_, 'api', request('POST', path, body))
+
+    return [
+        get('metadata.category_values', 'metadata/category/values/age_cat'),
+        get('metadata.category_statistics',
+            'metadata/category/statistics/age_cat'),
+        get('metadata.sample_ids', 'metadata/sample_ids?age_cat=30s'),
+        post('metadata.sample_ids_query', 'metadata/sample_ids', query),
+        post('metadata.values', 'metadata/values', group),
+        get('alpha.single', f'diversity/alpha/single/shannon/{sample_id}'),
+        get('alpha.sample', f'diversity/alpha/sample/{sample_id}'),
+        post('alpha.exists', 'diversity/alpha/exists/shannon', group),
+        post('alpha.values', 'diversity/alpha/values',
+             {'sample_ids': group}),
+        post('alpha.group', 'diversity/alpha/group/shannon',
+             {'sample_ids': group}),
+        get('plotting.alpha_percentiles',
+            f'plotting/diversity/alpha/shannon/percentiles-plot'
+            f'?sample_id={sample_id}'),
+        get('taxonomy.single', f'taxonomy/single/taxonomy/{sample_id}'),
+        post('taxonomy.group', 'taxonomy/group/taxonomy',
+             {'sample_ids': group}),
+        post('taxonomy.group_counts', 'taxonomy/group/taxonomy/counts'
+             '?level=Genus', {'sample_ids': group}),
+        post('taxonomy.present_group', 'taxonomy/present/group/taxonomy',
+             {'sample_ids': group}),
+        get('taxonomy.ranks', 'taxonomy/ranks/taxonomy'),
+        get('taxonomy.ranks_sample',
+            f'taxonomy/ranks/taxonomy/sample/{sample_id}'),
+        get('taxonomy.empress', 'taxonomy/empress/taxonomy'),
+        get('pcoa.contains', f'{pcoa}/contains?sample_id={sample_id}'),
+        post('pcoa.region', f'{pcoa}/region',
+             {'lower': [-0.05, -0.05], 'upper': [0.05, 0.05]}),
+        get('pcoa.closest', f'{pcoa}/closest?point=0,0&k=10'),
+        get('plotting.emperor',
+            f'{plot_pcoa}/emperor?metadata_categories=age_cat,bmi_cat'),
+        get('plotting.emperor_downsampled',
+            f'{plot_pcoa}/emperor?metadata_categories=age_cat,bmi_cat'
+            f'&downsample=stratified&max_samples=10000'),
+        get('plotting.png',
+            f'{plot_pcoa}/png?sample_id={sample_id}&category=age_cat'
+            f'&downsample=grid&max_samples=10000'),
+        get('beta.nearest',
+            f'diversity/beta/{metric}/nearest?sample_id={sample_id}&k=10'),
+        post('beta.distances', f'diversity/beta/{metric}/distances',
+             {'sample_id': sample_id, 'sample_ids': distance_group}),
+        post('batch', 'batch', {
+            'sample_id': sample_id,
+            'operations': [
+                {'op': 'alpha', 'params': {'alpha_metric': metric_}}
+                for metric_ in ('shannon', 'faith_pd')
+            ] + [
+                {'op': 'taxonomy_single', 'params': {'resource': 'taxonomy'}},
+                {'op': 'neighbors',
+                 'params': {'beta_metric': metric, 'k': 10}},
+            ],
+        }),
+    ]
+
+
+def run_benchmarks(benchmarks, repeat=5, select=None, log=None):
+    """Measures benchmarks
+
+    Parameters
+    ----------
+    benchmarks : iterable of Benchmark
+        The benchmarks.
+    repeat : int
+        As for `measure`.
+    select : str, optional
+        Only measures the benchmarks whose name contains it.
+    log : callable, optional
+        Called with a line describing each measurement.
+
+    Returns
+    -------
+    list of dict
+
+    """
+    results = []
+    for benchmark in benchmarks:
+        if select is not None and select not in benchmark.name:
+            continue
+        result = {'name': benchmark.name, 'kind': benchmark.kind}
+        result.update(measure(benchmark.func, repeat=repeat))
+        results.append(result)
+        if log is not None:
+            log(f"{benchmark.kind:>5} {benchmark.name:<40} "
+                f"{result['median'] * 1000:10.2f} ms "
+                f"{result['peak_memory'] / 1024 ** 2:10.2f} MiB")
+    return results
+
+
+def commit(directory=None):
+    """The commit of the working tree, or None outside of a repository"""
+    try:
+        output = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=directory,
+            stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode().strip()
+
+
+def environment():
+    return {
+        'commit': commit(os.path.dirname(__file__)),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'max_rss': _max_rss(),
+    }
+
+
+def save(results, path):
+    with open(path, 'w') as fp:
+        json.dump(results, fp, indent=2)
+
+
+def read(path):
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def compare(old, new, threshold=1.2):
+    """Compares the median latencies of two runs
+
+    Parameters
+    ----------
+    old, new : dict
+        The results of the runs, as saved by `save`.
+    threshold : float
+        The ratio of new to old latency above which a benchmark regressed.
+
+    Returns
+    -------
+    list of dict
+        The name, old and new median latency and their ratio of each
+        benchmark measured in both runs, and whether it regressed.
+
+    """
+    old_results = {result['name']: result for result in old['results']}
+    rows = []
+    for result in new['results']:
+        previous = old_results.get(result['name'])
+        if previous is None:
+            continue
+        ratio = result['median'] / previous['median'] \
+            if previous['median'] else float('inf')
+        rows.append({'name': result['name'], 'old': previous['median'],
+                     'new': result['median'], 'ratio': ratio,
+                     'regressed': ratio > threshold})
+    return rows
@@ -0,0 +1,332 @@
+import os
+
+import biom
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import pdist, squareform
+from skbio import DistanceMatrix, OrdinationResults
+
+AGE_CATEGORIES = np.array(['20s', '30s', '40s', '50s', '60s'], dtype=object)
+BMI_CATEGORIES = np.array(['Normal', 'Overweight', 'Underweight', 'Obese'],
+                          dtype=object)
+SEXES = np.array(['female', 'male', 'other'], dtype=object)
+COUNTRIES = np.array(['USA', 'United Kingdom', 'Australia', 'Mexico',
+                      'Japan', 'Germany'], dtype=object)
+ALPHA_METRICS = ('shannon', 'faith_pd', 'observed_features')
+
+# each component is drawn from its own random stream, so that it does not
+#  depend on which other components were generated, or in which order
+_STREAMS = {
+    'table': 1,
+    'metadata': 2,
+    'alpha': 3,
+    'clusters': 4,
+    'ordination': 5,
+}
+
+
+class SyntheticDataset:
+    """A deterministic dataset with the shape of a large Microsetta release
+
+    Samples belong to one of `n_clusters` clusters, which are separated in
+    the ordination and recorded in the metadata, so that queries, plots and
+    downsampling see structured rather than uniform data.
+
+    Parameters
+    ----------
+    n_samples : int
+        The number of samples.
+    n_features : int
+        The number of features of the table.
+    features_per_sample : int
+        The number of features drawn for each sample, some of which repeat.
+    n_axes : int
+        The number of axes of the ordination.
+    n_clusters : int
+        The number of clusters of samples.
+    n_neighbors : int
+        The number of precomputed neighbors of each sample.
+    max_distance_samples : int
+        The distance matrix holds the first `max_distance_samples` samples,
+        as a matrix over every sample would take n_samples ** 2 * 8 bytes.
+    seed : int
+        Seeds every random choice.
+    """
+
+    def __init__(self, n_samples, n_features=2000, features_per_sample=50,
+                 n_axes=10, n_clusters=8, n_neighbors=10,
+                 max_distance_samples=5000, seed=0):
+        self.n_samples = n_samples
+        self.n_features = n_features
+        self.features_per_sample = features_per_sample
+        self.n_axes = n_axes
+        self.n_clusters = n_clusters
+        self.n_neighbors = n_neighbors
+        self.max_distance_samples = max_distance_samples
+        self.seed = seed
+        self.sample_ids = np.array([f'sample-{i:07d}'
+                                    for i in range(n_samples)], dtype=object)
+        self.feature_ids = np.array([f'feature-{i:05d}'
+                                     for i in range(n_features)],
+                                    dtype=object)
+        self._cache = dict()
+
+    def _random_state(self, stream):
+        return np.random.RandomState([self.seed, _STREAMS[stream]])
+
+    def _cached(self, name, compute):
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+
+    @property
+    def clusters(self):
+        """The cluster of each sample"""
+        return self._cached('clusters', lambda: self._random_state(
+            'clusters').randint(self.n_clusters, size=self.n_samples))
+
+    def table(self):
+        """Counts of features per sample, skewed towards common features
+
+        Returns
+        -------
+        biom.Table
+
+        """
+        return self._cached('table', self._table)
+
+    def _table(self, chunk_size=50000):
+        rng = self._random_state('table')
+        weights = 1 / np.arange(1, self.n_features + 1) ** 1.1
+        weights /= weights.sum()
+        k = self.features_per_sample
+        blocks = []
+        # built in chunks of samples to bound the memory of the coordinates
+        for start in range(0, self.n_samples, chunk_size):
+            n = min(chunk_size, self.n_samples - start)
+            rows = rng.choice(self.n_features, size=n * k, p=weights)
+            cols = np.repeat(np.arange(n), k)
+            counts = rng.randint(1, 100, size=n * k)
+            blocks.append(sparse.coo_matrix(
+                (counts, (rows, cols)), shape=(self.n_features, n)).tocsr())
+        data = sparse.hstack(blocks, format='csr')
+        return biom.Table(data, list(self.feature_ids),
+                          list(self.sample_ids))
+
+    def taxonomy(self):
+        """Greengenes formatted lineages of the features
+
+        Features are grouped into genera, genera into families and so on,
+        so that each rank has fewer distinct taxa than the one below it.
+
+        Returns
+        -------
+        pd.DataFrame
+            Indexed by 'Feature ID', with 'Taxon' and 'Confidence' columns.
+
+        """
+        def compute():
+            genus = np.arange(self.n_features) // 10
+            ranks = [('s', np.arange(self.n_features)), ('g', genus)]
+            for prefix, size in [('f', 4), ('o', 3), ('c', 2), ('p', 2)]:
+                ranks.append((prefix, ranks[-1][1] // size))
+            lineages = [
+                'k__Bacteria; ' + '; '.join(
+                    f'{prefix}__{prefix}{taxa[i]}'
+                    for prefix, taxa in reversed(ranks))
+                for i in range(self.n_features)
+            ]
+            return pd.DataFrame(
+                {'Taxon': lineages,
+                 'Confidence': np.linspace(0.7, 1, self.n_features)},
+                index=pd.Index(self.feature_ids, name='Feature ID'),
+            )
+        return self._cached('taxonomy', compute)
+
+    def metadata(self):
+        """Sample metadata, with some missing values
+
+        Returns
+        -------
+        pd.DataFrame
+            Indexed by '#SampleID'.
+
+        """
+        def compute():
+            rng = self._random_state('metadata')
+            n = self.n_samples
+            age_years = rng.uniform(18, 70, size=n).round(1)
+            age_years[rng.uniform(size=n) < 0.05] = np.nan
+            sex = rng.choice(SEXES, size=n, p=[0.5, 0.45, 0.05])
+            sex[rng.uniform(size=n) < 0.02] = np.nan
+            return pd.DataFrame(
+                {
+                    'age_cat': rng.choice(AGE_CATEGORIES, size=n),
+                    'bmi_cat': rng.choice(BMI_CATEGORIES, size=n),
+                    'sex': sex,
+                    'country': rng.choice(COUNTRIES, size=n),
+                    'age_years': age_years,
+                    'cluster': np.array([f'cluster-{cluster}'
+                                         for cluster in self.clusters],
+                                        dtype=object),
+                },
+                index=pd.Index(self.sample_ids, name='#SampleID'),
+            )
+        return self._cached('metadata', compute)
+
+    def alpha(self):
+        """Alpha diversity of each sample by metric
+
+        Returns
+        -------
+        dict of str to pd.Series
+
+        """
+        def compute():
+            rng = self._random_state('alpha')
+            n = self.n_samples
+            index = pd.Index(self.sample_ids)
+            observed = np.diff(self.table().matrix_data.tocsc().indptr)
+            return {
+                'shannon': pd.Series(
+                    np.clip(rng.normal(6, 1.2, size=n), 0, None),
+                    index=index, name='shannon'),
+                'faith_pd': pd.Series(rng.gamma(9, 2, size=n), index=index,
+                                      name='faith_pd'),
+                'observed_features': pd.Series(
+                    observed.astype(float), index=index,
+                    name='observed_features'),
+            }
+        return self._cached('alpha', compute)
+
+    def ordination(self):
+        """A PCoA in which samples of a cluster are close together
+
+        Returns
+        -------
+        skbio.OrdinationResults
+
+        """
+        def compute():
+            rng = self._random_state('ordination')
+            eigvals = 0.6 ** np.arange(self.n_axes)
+            scales = np.sqrt(eigvals)
+            centers = rng.normal(scale=0.3,
+                                 size=(self.n_clusters, self.n_axes))
+            coordinates = (centers[self.clusters] +
+                           rng.normal(scale=0.1,
+                                      size=(self.n_samples, self.n_axes)))
+            coordinates *= scales
+            axis_labels = [f'PC{i + 1}' for i in range(self.n_axes)]
+            # the leading axes explain most, not all, of the variation
+            proportion_explained = 0.8 * eigvals / eigvals.sum()
+            return OrdinationResults(
+                'PCoA', 'Principal Coordinate Analysis',
+                eigvals=pd.Series(eigvals, index=axis_labels),
+                samples=pd.DataFrame(coordinates, index=self.sample_ids,
+                                     columns=axis_labels),
+                proportion_explained=pd.Series(proportion_explained,
+                                               index=axis_labels),
+            )
+        return self._cached('ordination', compute)
+
+    def distance_matrix(self):
+        """Euclidean distances between the first samples in the ordination
+
+        Returns
+        -------
+        skbio.DistanceMatrix
+
+        """
+        def compute():
+            n = min(self.n_samples, self.max_distance_samples)
+            coordinates = self.ordination().samples.values[:n]
+            return DistanceMatrix(squareform(pdist(coordinates)),
+                                  ids=list(self.sample_ids[:n]))
+        return self._cached('distance_matrix', compute)
+
+    def neighbors(self):
+        """The nearest neighbors of each sample in the ordination
+
+        Returns
+        -------
+        pd.DataFrame
+            Indexed by 'sample_id', with the ID of the i-th nearest neighbor
+            in the i-th column.
+
+        """
+        def compute():
+            coordinates = self.ordination().samples.values
+            k = min(self.n_neighbors, self.n_samples - 1)
+            _, positions = cKDTree(coordinates).query(coordinates, k=k + 1)
+            # the closest sample to each sample is itself
+            neighbors = self.sample_ids[positions[:, 1:]]
+            return pd.DataFrame(
+                neighbors,
+                index=pd.Index(self.sample_ids, name='sample_id'),
+                columns=[f'k{i + 1}' for i in range(k)],
+            )
+        return self._cached('neighbors', compute)
+
+    def write(self, directory, name='synthetic', metric='euclidean',
+              sample_set='all'):
+        """Writes the dataset as artifacts and its resource configuration
+
+        Parameters
+        ----------
+        directory : str
+            The directory to write to, which must exist.
+        name : str
+            The name of the dataset.
+        metric : str
+            The name of the beta metric of the distances, ordination and
+            neighbors.
+        sample_set : str
+            The name of the sample set of the ordination.
+
+        Returns
+        -------
+        dict
+            The resource configuration of the dataset, e.g., the value of
+            ``SERVER_CONFIG['resources']``.
+
+        """
+        # qiime2 is only needed to write, not to generate, a dataset
+        from qiime2 import Artifact, Metadata
+
+        def path(filename):
+            return os.path.join(directory, filename)
+
+        def save(semantic_type, data, filename):
+            Artifact.import_data(semantic_type, data).save(path(filename))
+            return path(filename)
+
+        Metadata(self.metadata()).save(path('metadata.tsv'))
+        alpha = {metric_: save('SampleData[AlphaDiversity]', series,
+                               f'alpha-{metric_}.qza')
+                 for metric_, series in self.alpha().items()}
+        taxonomy = {
+            'table': save('FeatureTable[Frequency]', self.table(),
+                          'table.qza'),
+            'feature-data-taxonomy': save('FeatureData[Taxonomy]',
+                                          self.taxonomy(), 'taxonomy.qza'),
+        }
+        pcoa = save('PCoAResults', self.ordination(), f'pcoa-{metric}.qza')
+        beta = save('DistanceMatrix', self.distance_matrix(),
+                    f'beta-{metric}.qza')
+        self.neighbors().to_csv(path(f'neighbors-{metric}.tsv'), sep='\t')
+        dataset = {
+            '__dataset_detail__': {
+                'title': f'Synthetic dataset of {self.n_samples} samples',
+                'datatype': '16S',
+            },
+            '__metadata__': path('metadata.tsv'),
+            '__alpha__': alpha,
+            '__taxonomy__': {'taxonomy': taxonomy},
+            '__pcoa__': {sample_set: {metric: pcoa}},
+            '__beta__': {metric: beta},
+            '__neighbors__': {metric: path(f'neighbors-{metric}.tsv')},
+        }
+        return {'datasets': {name: dataset}}
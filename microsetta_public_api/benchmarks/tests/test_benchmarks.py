@@ -0,0 +1,36 @@
+import tempfile
+from microsetta_public_api.benchmarks._synthetic import SyntheticDataset
+from microsetta_public_api.benchmarks import _runner
+from microsetta_public_api.config import SERVER_CONFIG
+from microsetta_public_api.utils.testing import ConfigTestCase
+
+
+class BenchmarkTests(ConfigTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._server_resources = SERVER_CONFIG.get('resources')
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        SERVER_CONFIG['resources'] = self._server_resources
+        super().tearDown()
+
+    def test_every_operation_runs(self):
+        dataset = SyntheticDataset(200, n_features=50,
+                                   features_per_sample=10,
+                                   max_distance_samples=100)
+        config = dataset.write(self.directory.name)
+        app, load_seconds = _runner.load(config)
+        self.assertGreater(load_seconds, 0)
+
+        benchmarks = _runner.repo_benchmarks(dataset, 'synthetic',
+                                             group_size=20)
+        benchmarks += _runner.api_benchmarks(app.app.test_client(), dataset,
+                                             'synthetic', group_size=20)
+        # api benchmarks raise if a request does not succeed
+        results = _runner.run_benchmarks(benchmarks, repeat=1)
+        self.assertEqual(len(benchmarks), len(results))
+        self.assertSetEqual({'repo', 'model', 'api'},
+                            {result['kind'] for result in results})
@@ -0,0 +1,44 @@
+from unittest import TestCase
+from microsetta_public_api.benchmarks._runner import (
+    measure, compare, run_benchmarks, Benchmark, _sample_groups,
+)
+
+
+class RunnerTests(TestCase):
+
+    def test_measure(self):
+        calls = []
+        obs = measure(lambda: calls.append(bytearray(1024 ** 2)), repeat=3)
+        # a first run, the repeats and a run that traces memory
+        self.assertEqual(5, len(calls))
+        self.assertLessEqual(obs['min'], obs['median'])
+        self.assertLessEqual(obs['median'], obs['max'])
+        self.assertGreaterEqual(obs['peak_memory'], 1024 ** 2)
+
+    def test_run_benchmarks(self):
+        lines = []
+        obs = run_benchmarks([Benchmark('a.first', 'repo', lambda: None),
+                              Benchmark('b.second', 'api', lambda: None)],
+                             repeat=1, select='second', log=lines.append)
+        self.assertListEqual(['b.second'], [result['name']
+                                            for result in obs])
+        self.assertEqual('api', obs[0]['kind'])
+        self.assertEqual(1, len(lines))
+
+    def test_compare(self):
+        old = {'results': [{'name': 'a', 'median': 1.0},
+                           {'name': 'b', 'median': 1.0},
+                           {'name': 'c', 'median': 1.0}]}
+        new = {'results': [{'name': 'a', 'median': 1.1},
+                           {'name': 'b', 'median': 1.5},
+                           {'name': 'd', 'median': 1.0}]}
+        obs = compare(old, new, threshold=1.2)
+        self.assertListEqual(['a', 'b'], [row['name'] for row in obs])
+        self.assertListEqual([False, True],
+                             [row['regressed'] for row in obs])
+        self.assertAlmostEqual(1.5, obs[1]['ratio'])
+
+    def test_sample_groups(self):
+        self.assertListEqual([0, 25, 50, 75],
+                             _sample_groups(list(range(100)), 4))
+        self.assertListEqual([0, 1, 2], _sample_groups([0, 1, 2], 10))
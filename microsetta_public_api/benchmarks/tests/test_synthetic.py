@@ -0,0 +1,110 @@
+from unittest import TestCase
+import numpy as np
+import numpy.testing as npt
+import pandas.testing as pdt
+from microsetta_public_api.benchmarks._synthetic import SyntheticDataset
+from microsetta_public_api.models._beta import NeighborTable
+
+
+class SyntheticDatasetTests(TestCase):
+
+    def setUp(self):
+        self.dataset = SyntheticDataset(300, n_features=100,
+                                        features_per_sample=20,
+                                        n_neighbors=5,
+                                        max_distance_samples=50, seed=7)
+
+    def test_deterministic(self):
+        other = SyntheticDataset(300, n_features=100, features_per_sample=20,
+                                 n_neighbors=5, max_distance_samples=50,
+                                 seed=7)
+        # generated in a different order
+        pdt.assert_frame_equal(self.dataset.metadata(), other.metadata())
+        npt.assert_array_equal(other.ordination().samples.values,
+                               self.dataset.ordination().samples.values)
+        self.assertEqual(self.dataset.table(), other.table())
+        pdt.assert_series_equal(self.dataset.alpha()['shannon'],
+                                other.alpha()['shannon'])
+
+    def test_seed(self):
+        other = SyntheticDataset(300, n_features=100, features_per_sample=20,
+                                 seed=8)
+        self.assertFalse(np.array_equal(
+            other.ordination().samples.values,
+            self.dataset.ordination().samples.values))
+
+    def test_table(self):
+        table = self.dataset.table()
+        self.assertEqual((100, 300), table.shape)
+        self.assertListEqual(list(self.dataset.sample_ids),
+                             list(table.ids()))
+        # every sample has counts, at most one per draw
+        n_features = np.diff(table.matrix_data.tocsc().indptr)
+        self.assertTrue(np.all(n_features >= 1))
+        self.assertTrue(np.all(n_features <= 20))
+        # common features are in more samples than rare ones
+        presence = table.pa(inplace=False).sum(axis='observation')
+        self.assertGreater(presence[0], presence[-1])
+
+    def test_taxonomy(self):
+        taxonomy = self.dataset.taxonomy()
+        self.assertListEqual(list(self.dataset.feature_ids),
+                             list(taxonomy.index))
+        self.assertEqual('k__Bacteria; p__p0; c__c0; o__o0; f__f0; g__g1; '
+                         's__s12', taxonomy.loc['feature-00012', 'Taxon'])
+        # each genus is in a single family
+        ranks = taxonomy['Taxon'].str.split('; ', expand=True)
+        self.assertTrue(all(ranks.groupby(5)[4].nunique() == 1))
+
+    def test_metadata(self):
+        metadata = self.dataset.metadata()
+        self.assertEqual('#SampleID', metadata.index.name)
+        self.assertListEqual(['age_cat', 'bmi_cat', 'sex', 'country',
+                              'age_years', 'cluster'],
+                             list(metadata.columns))
+        self.assertTrue(metadata['age_years'].isnull().any())
+        self.assertFalse(metadata['age_cat'].isnull().any())
+
+    def test_alpha(self):
+        alpha = self.dataset.alpha()
+        self.assertListEqual(['shannon', 'faith_pd', 'observed_features'],
+                             list(alpha))
+        observed = self.dataset.table().pa(inplace=False).sum(axis='sample')
+        npt.assert_array_equal(observed,
+                               alpha['observed_features'].values)
+
+    def test_ordination(self):
+        ordination = self.dataset.ordination()
+        self.assertEqual((300, 10), ordination.samples.shape)
+        self.assertTrue(np.all(np.diff(ordination.eigvals) < 0))
+        # samples are closer to those of their cluster than to others
+        coordinates = ordination.samples.values
+        clusters = self.dataset.clusters
+        same = clusters == clusters[0]
+        distances = np.linalg.norm(coordinates - coordinates[0], axis=1)
+        self.assertLess(distances[same].mean(), distances[~same].mean())
+
+    def test_distance_matrix(self):
+        distance_matrix = self.dataset.distance_matrix()
+        self.assertEqual((50, 50), distance_matrix.shape)
+        coordinates = self.dataset.ordination().samples.values
+        self.assertAlmostEqual(
+            np.linalg.norm(coordinates[3] - coordinates[7]),
+            distance_matrix['sample-0000003', 'sample-0000007'])
+
+    def test_neighbors(self):
+        neighbors = self.dataset.neighbors()
+        self.assertEqual((300, 5), neighbors.shape)
+        self.assertEqual('sample_id', neighbors.index.name)
+        # a sample is not its own neighbor
+        self.assertFalse(any(sample_id in list(row) for sample_id, row
+                             in neighbors.iterrows()))
+        distance_matrix = self.dataset.distance_matrix()
+        closest = distance_matrix['sample-0000000'].copy()
+        closest[0] = np.inf
+        # the closest sample in the distance matrix is among the neighbors
+        self.assertIn(distance_matrix.ids[closest.argmin()],
+                      list(neighbors.loc['sample-0000000']))
+        table = NeighborTable.from_dataframe(neighbors)
+        self.assertListEqual(list(neighbors.iloc[1, :3]),
+                             table.k_nearest('sample-0000001', k=3))
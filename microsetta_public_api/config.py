@@ -1,7 +1,9 @@
 import os
 import json
+import threading
 import jsonschema
 from abc import abstractmethod
+from time import monotonic
 
 
 alpha_schema = {
@@ -124,11 +126,87 @@ def make_dataset_schema(schema):
 
 
 class Element:
+    # class level defaults, as not every subclass calls Element.__init__
+    _data = None
+    _loader = None
+    last_access = None
 
     # need args and kwargs for inheritance concerns
     def __init__(self, *args, **kwargs):
         super().__init__()
-        self.data = None
+        self._data = None
+
+    @property
+    def data(self):
+        """The data loaded for the element
+
+        For lazy elements (see `set_loader`) the first access loads the
+        data, and concurrent first accesses wait for a single load.
+        """
+        if self._loader is None:
+            return self._data
+        self.last_access = monotonic()
+        # read once, as the element can be evicted at any time by another
+        #  thread
+        data = self._data
+        if data is None:
+            with self._load_lock:
+                if self._data is None:
+                    self._loader(self)
+                data = self._data
+        return data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    @property
+    def reloadable(self):
+        """Whether the data can be evicted and loaded again"""
+        return self._loader is not None
+
+    def set_loader(self, loader):
+        """Defers loading the element's data until it is first accessed
+
+        Parameters
+        ----------
+        loader : callable
+            Called with the element to set its data, e.g., a visit method
+            of a ConfigElementVisitor.
+
+        """
+        # the lock is only created for lazy elements, as elements
+        # are deep copied when loading some resources
+        self._load_lock = threading.RLock()
+        self._loader = loader
+
+    def evict(self, max_idle=None):
+        """Drops the data of a lazy element, to be reloaded on next access
+
+        Parameters
+        ----------
+        max_idle : float, optional
+            Only evict if the data has not been accessed for this many
+            seconds.
+
+        Returns
+        -------
+        bool
+            Whether the data was evicted.
+
+        """
+        if self._loader is None or self._data is None:
+            return False
+        with self._load_lock:
+            if max_idle is not None and self.last_access is not None and \
+                    monotonic() - self.last_access < max_idle:
+                return False
+            self._data = None
+        return True
 
     @abstractmethod
     def accept(self, visitor):
@@ -368,6 +446,53 @@ class ConfigElementVisitor:
         raise NotImplementedError()
 
 
+class LazyVisitor:
+    """Wraps a visitor so that some element types are loaded on first access
+
+    Parameters
+    ----------
+    visitor : ConfigElementVisitor
+        The visitor that loads data.
+    lazy_types : iterable of type
+        The element types to defer loading for, e.g., BetaElement.
+    on_defer : callable, optional
+        Called with each element whose loading is deferred.
+    reloadable : bool
+        Whether elements of other types, which are loaded immediately, keep
+        their loader so that they can be evicted and loaded again.
+
+    Examples
+    --------
+    >>> lazy = LazyVisitor(Q2Visitor(), [BetaElement, PCOAElement])
+    >>> resources.accept(lazy)
+
+    """
+
+    def __init__(self, visitor, lazy_types, on_defer=None, reloadable=False):
+        self._visitor = visitor
+        self._lazy_types = tuple(lazy_types)
+        self._on_defer = on_defer
+        self._reloadable = reloadable
+
+    def __getattr__(self, name):
+        method = getattr(self._visitor, name)
+        if not name.startswith('visit_'):
+            return method
+
+        def visit(element):
+            if isinstance(element, self._lazy_types):
+                element.set_loader(method)
+                if self._on_defer is not None:
+                    self._on_defer(element)
+            elif self._reloadable:
+                element.set_loader(method)
+                # loads the data now
+                element.data
+            else:
+                return method(element)
+        return visit
+
+
 class SchemaBase:
     def __init__(self):
         self.alpha_kw = '__alpha__'
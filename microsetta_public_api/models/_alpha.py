@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 from microsetta_public_api.models._base import ModelBase
 from microsetta_public_api.exceptions import UnknownID
+from microsetta_public_api._tracing import traced
 from typing import Dict, List
 
 _gar_named = namedtuple('GroupAlphaRaw', ['name', 'alpha_metric',
@@ -126,6 +127,7 @@ class Alpha(ModelBase):
     def _get_feature_ids(self) -> np.ndarray:
         return np.array([])
 
+    @traced()
     def get_group_raw(self, ids: List[str] = None,
                       name: str = None) -> GroupAlphaRaw:
         """Get raw values for a set of IDs
@@ -165,6 +167,7 @@ class Alpha(ModelBase):
                              alpha_metric=self._series.name,
                              alpha_diversity=vals.to_dict())
 
+    @traced()
     def get_group(self, ids: List[str] = None, name: str = None) -> GroupAlpha:
         """Get group values
 
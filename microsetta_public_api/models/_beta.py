@@ -0,0 +1,481 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import cdist
+from microsetta_public_api.exceptions import UnknownID, InvalidParameter
+
+
+def _nearest_in_rows(distances, k):
+    """Finds the positions of the k smallest values of each row
+
+    Parameters
+    ----------
+    distances : np.ndarray
+        A 2D array.
+    k : int
+        The number of positions to find, at most the number of columns.
+
+    Returns
+    -------
+    np.ndarray of int
+        The positions for each row, closest first.
+
+    """
+    part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(distances, part, axis=1), axis=1,
+                       kind='stable')
+    return np.take_along_axis(part, order, axis=1)
+
+
+class _Neighbors:
+    """Answers k nearest neighbor queries over a set of samples
+
+    Subclasses set `ids` and implement `_distances`.
+    """
+    # the number of samples queried at once, which bounds the size of the
+    #  distances held in memory to chunk_size x n_samples
+    chunk_size = 256
+
+    ids = None
+
+    def _distances(self, positions, columns):
+        """The distances from the samples at positions to those at columns
+        """
+        raise NotImplementedError
+
+    def positions(self, sample_ids):
+        positions = self.ids.get_indexer(sample_ids)
+        unknown = [id_ for id_, position in zip(sample_ids, positions)
+                   if position < 0]
+        if unknown:
+            raise UnknownID(f"Unknown ids: {unknown}")
+        return positions
+
+    def k_nearest(self, sample_ids, k=1, candidates=None):
+        """Finds the nearest samples to each of several samples
+
+        Parameters
+        ----------
+        sample_ids : list of str
+            The samples to find neighbors for.
+        k : int
+            The number of neighbors to find for each sample.
+        candidates : list of str, optional
+            Limits the neighbors to these samples, e.g., those matching a
+            metadata query. Candidates that are not in the index are
+            ignored, and fewer than k neighbors are returned if there are
+            not enough candidates.
+
+        Returns
+        -------
+        dict of str to list of str
+            The neighbors of each sample, closest first. A sample is never
+            its own neighbor.
+
+        Raises
+        ------
+        UnknownID
+            If any of `sample_ids` is not in the index
+        InvalidParameter
+            If k is less than 1, or, without candidates, greater than the
+            number of other samples
+
+        """
+        max_k = len(self.ids) - 1
+        if k < 1:
+            raise InvalidParameter(f"k={k} must be at least 1.")
+        if candidates is None and k > max_k:
+            raise InvalidParameter(
+                f"k={k} is greater than the maximum ({max_k})."
+            )
+        positions = self.positions(sample_ids)
+        if candidates is None:
+            columns = None
+        else:
+            columns = self.ids.get_indexer(candidates)
+            columns = np.unique(columns[columns >= 0])
+        nearest = self._k_nearest(positions, k, columns)
+        return {id_: list(self.ids[neighbors])
+                for id_, neighbors in zip(sample_ids, nearest)}
+
+    def _k_nearest(self, positions, k, columns):
+        if columns is None:
+            columns = np.arange(len(self.ids))
+        k = min(k, len(columns))
+        nearest = []
+        for start in range(0, len(positions), self.chunk_size):
+            chunk = positions[start:start + self.chunk_size]
+            if k == 0:
+                nearest.extend([] for _ in chunk)
+                continue
+            distances = self._distances(chunk, columns)
+            # a sample is not its own neighbor
+            distances[columns[np.newaxis, :] == chunk[:, np.newaxis]] = \
+                np.inf
+            for row, found in zip(distances,
+                                  _nearest_in_rows(distances, k)):
+                found = found[np.isfinite(row[found])]
+                nearest.append(columns[found])
+        return nearest
+
+
+class DistanceNeighbors(_Neighbors):
+    """Nearest neighbors by the distances of a distance matrix
+
+    Parameters
+    ----------
+    distance_matrix : skbio.DistanceMatrix
+        The distances between samples.
+    """
+
+    def __init__(self, distance_matrix):
+        self.ids = pd.Index(distance_matrix.ids)
+        self.data = distance_matrix.data
+
+    def _distances(self, positions, columns):
+        # fancy indexing copies, so the matrix itself is never modified
+        if len(columns) == len(self.ids):
+            return self.data[positions]
+        return self.data[np.ix_(positions, columns)]
+
+
+class OrdinationNeighbors(_Neighbors):
+    """Nearest neighbors and region queries in an ordination
+
+    Unfiltered neighbor queries are answered from a KD-tree built over the
+    leading axes of the ordination. Region and closest point queries, which
+    are over the axes being viewed (e.g., the first two or three), use
+    KD-trees and sorted orders over those axes. KD-trees hold a float64 copy
+    of the coordinates they are built over, so all of them are built on
+    first use, while the coordinates themselves are used as they are, e.g.,
+    the float32 coordinates of a compact ordination are not copied.
+
+    Parameters
+    ----------
+    ordination : skbio.OrdinationResults
+        The ordination, with a coordinate per sample on each axis.
+    dimensions : int, optional
+        The number of leading axes to use. KD-trees lose their advantage
+        over a scan beyond a few tens of dimensions.
+    """
+    # region and closest point queries are over at most this many distinct
+    #  axes, as viewed
+    max_query_axes = 3
+    # the number of KD-trees over queried axes that are kept, least
+    #  recently used first out
+    max_axes_trees = 8
+
+    def __init__(self, ordination, dimensions=10):
+        samples = ordination.samples
+        self.ids = pd.Index(samples.index)
+        self.coordinates = np.ascontiguousarray(
+            samples.values[:, :dimensions])
+        self._tree = None
+        # by the tuple of axes or the axis that they index
+        self._axes_trees = OrderedDict()
+        self._sorted = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def tree(self):
+        """The KD-tree over the leading axes, built on first use"""
+        tree = self._tree
+        if tree is None:
+            tree = cKDTree(self.coordinates)
+            with self._lock:
+                if self._tree is None:
+                    self._tree = tree
+                tree = self._tree
+        return tree
+
+    def _distances(self, positions, columns):
+        return cdist(self.coordinates[positions], self.coordinates[columns])
+
+    def _k_nearest(self, positions, k, columns):
+        if columns is not None:
+            return super()._k_nearest(positions, k, columns)
+        # one extra, as each sample is found as its own nearest neighbor
+        _, found = self.tree.query(self.coordinates[positions], k=k + 1)
+        found = found.reshape(len(positions), k + 1)
+        return [row[row != position][:k]
+                for row, position in zip(found, positions)]
+
+    def resolve_axes(self, axes, n_values):
+        """The axes of a query with a value for each of n_values axes"""
+        if axes is None:
+            axes = range(n_values)
+        axes = tuple(int(axis) for axis in axes)
+        if len(axes) != n_values:
+            raise InvalidParameter(f"Got {n_values} value(s) for "
+                                   f"{len(axes)} axes.")
+        if len(axes) > self.max_query_axes:
+            raise InvalidParameter(f"Got {len(axes)} axes, at most "
+                                   f"{self.max_query_axes} can be queried.")
+        if len(set(axes)) != len(axes):
+            raise InvalidParameter(f"Axes must be distinct, got "
+                                   f"{list(axes)}.")
+        n_axes = self.coordinates.shape[1]
+        invalid = [axis for axis in axes if not 0 <= axis < n_axes]
+        if invalid:
+            raise InvalidParameter(f"Invalid axes: {invalid}. Axes must be "
+                                   f"less than {n_axes}.")
+        return axes
+
+    def _axes_tree(self, axes):
+        with self._lock:
+            tree = self._axes_trees.get(axes)
+            if tree is not None:
+                self._axes_trees.move_to_end(axes)
+                return tree
+        # built outside of the lock so that queries over other axes are not
+        #  blocked
+        tree = cKDTree(self.coordinates[:, axes])
+        with self._lock:
+            tree = self._axes_trees.setdefault(axes, tree)
+            self._axes_trees.move_to_end(axes)
+            while len(self._axes_trees) > self.max_axes_trees:
+                self._axes_trees.popitem(last=False)
+        return tree
+
+    def _sorted_axis(self, axis):
+        sorted_axis = self._sorted.get(axis)
+        if sorted_axis is None:
+            order = np.argsort(self.coordinates[:, axis], kind='stable')
+            sorted_axis = self._sorted.setdefault(
+                axis, (order, self.coordinates[order, axis]))
+        return sorted_axis
+
+    def in_box(self, lower, upper, axes=None):
+        """Finds the samples within a box
+
+        Parameters
+        ----------
+        lower, upper : list of float
+            The bounds of the box on each axis, inclusive.
+        axes : list of int, optional
+            The axes that are bounded, defaults to the leading axes.
+
+        Returns
+        -------
+        np.ndarray of int
+            The positions of the samples in the box, ascending.
+
+        Raises
+        ------
+        InvalidParameter
+            If the bounds do not match the axes, or an axis is not indexed
+
+        """
+        if len(lower) != len(upper):
+            raise InvalidParameter("lower and upper must have the same "
+                                   "length.")
+        axes = self.resolve_axes(axes, len(lower))
+        lower = np.asarray(lower, dtype=float)
+        upper = np.asarray(upper, dtype=float)
+        # only samples within the bounds of the most selective axis are
+        #  checked against the bounds of the others
+        narrowest = None
+        for axis, low, high in zip(axes, lower, upper):
+            order, values = self._sorted_axis(axis)
+            start = np.searchsorted(values, low, side='left')
+            stop = np.searchsorted(values, high, side='right')
+            if narrowest is None or stop - start < len(narrowest):
+                narrowest = order[start:stop]
+        if narrowest is None:
+            return np.arange(len(self.ids))
+        found = self.coordinates[np.ix_(narrowest, axes)]
+        inside = np.all((found >= lower) & (found <= upper), axis=1)
+        return np.sort(narrowest[inside])
+
+    def in_radius(self, center, radius, axes=None):
+        """Finds the samples within a distance of a point
+
+        Parameters
+        ----------
+        center : list of float
+            The point, on each axis.
+        radius : float
+            The Euclidean distance from the point, inclusive.
+        axes : list of int, optional
+            The axes of the point, defaults to the leading axes.
+
+        Returns
+        -------
+        np.ndarray of int
+            The positions of the samples within the radius, ascending.
+
+        """
+        axes = self.resolve_axes(axes, len(center))
+        found = self._axes_tree(axes).query_ball_point(center, radius)
+        return np.sort(np.asarray(found, dtype=int))
+
+    def closest(self, point, k=1, axes=None):
+        """Finds the samples closest to a point, e.g., a cursor
+
+        Parameters
+        ----------
+        point : list of float
+            The point, on each axis.
+        k : int
+            The number of samples to find.
+        axes : list of int, optional
+            The axes of the point, defaults to the leading axes.
+
+        Returns
+        -------
+        np.ndarray of int
+            The positions of the samples, closest first.
+        np.ndarray of float
+            The distance of each sample from the point.
+
+        """
+        if k < 1:
+            raise InvalidParameter(f"k={k} must be at least 1.")
+        axes = self.resolve_axes(axes, len(point))
+        k = min(k, len(self.ids))
+        distances, found = self._axes_tree(axes).query(point, k=k)
+        return np.atleast_1d(found), np.atleast_1d(distances)
+
+
+class NeighborTable:
+    """Precomputed nearest neighbors, stored as positions into a vocabulary
+
+    Each sample ID is held once, in `vocabulary`, and the neighbors of each
+    sample are int32 positions into it, so a table of k neighbors per
+    sample takes 4k bytes per sample rather than k Python strings.
+
+    Parameters
+    ----------
+    ids : pd.Index
+        The samples that have neighbors, one per row of `positions`.
+    vocabulary : np.ndarray of object
+        The sample IDs that positions refer to.
+    positions : np.ndarray of int32
+        The positions of the neighbors of each sample, closest first. -1
+        marks a missing neighbor, for samples with fewer neighbors than
+        the table has columns.
+    """
+
+    def __init__(self, ids, vocabulary, positions):
+        self.ids = ids
+        self.vocabulary = vocabulary
+        self.positions = positions
+
+    @classmethod
+    def from_dataframe(cls, neighbors, vocabulary=None):
+        """Encodes a table of neighbor IDs
+
+        Parameters
+        ----------
+        neighbors : pd.DataFrame
+            Indexed by sample ID, with the ID of the i-th nearest neighbor
+            of each sample in the i-th column.
+        vocabulary : np.ndarray of object, optional
+            The vocabulary of another table, e.g., of another metric over
+            the same samples. IDs in it are encoded as their position in it
+            and others are appended to it, so the vocabulary of the new
+            table extends it and can replace that of the other table.
+
+        Returns
+        -------
+        NeighborTable
+
+        """
+        n_samples, n_neighbors = neighbors.shape
+        # the row IDs are encoded with the neighbors, so each ID is held
+        #  once whether it is a row, a neighbor or both
+        values = np.concatenate([
+            np.asarray(neighbors.index, dtype=object),
+            np.asarray(neighbors.values, dtype=object).ravel(),
+        ])
+        if vocabulary is None:
+            codes, vocabulary = pd.factorize(values)
+            vocabulary = np.asarray(vocabulary, dtype=object)
+        else:
+            codes = pd.Index(vocabulary).get_indexer(values)
+            new = (codes < 0) & pd.notnull(values)
+            new_codes, new_ids = pd.factorize(values[new])
+            codes[new] = len(vocabulary) + new_codes
+            vocabulary = np.concatenate([
+                vocabulary, np.asarray(new_ids, dtype=object)])
+        ids = pd.Index(vocabulary[codes[:n_samples]],
+                       name=neighbors.index.name)
+        positions = codes[n_samples:].reshape(n_samples, n_neighbors)
+        return cls(ids, vocabulary, positions.astype(np.int32))
+
+    @classmethod
+    def read(cls, path, vocabulary=None):
+        """Reads a tab separated neighbors file with a sample_id column
+
+        See `from_dataframe` for `vocabulary`.
+        """
+        neighbors = pd.read_csv(path, sep='\t', dtype=str)
+        return cls.from_dataframe(neighbors.set_index('sample_id'),
+                                  vocabulary=vocabulary)
+
+    @classmethod
+    def read_many(cls, paths):
+        """Reads several neighbors files that share one vocabulary
+
+        Parameters
+        ----------
+        paths : dict
+            Paths to tab separated neighbors files, e.g., by metric.
+
+        Returns
+        -------
+        dict
+            A NeighborTable for each path, with the same keys. A sample ID
+            in several tables is held once.
+
+        """
+        tables = dict()
+        vocabulary = None
+        for key, path in paths.items():
+            tables[key] = table = cls.read(path, vocabulary=vocabulary)
+            vocabulary = table.vocabulary
+        # each vocabulary is a prefix of the last one
+        for table in tables.values():
+            table.vocabulary = vocabulary
+        return tables
+
+    @property
+    def n_neighbors(self):
+        return self.positions.shape[1]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, sample_id):
+        return sample_id in self.ids
+
+    def k_nearest(self, sample_id, k=1):
+        """The k nearest neighbors of a sample
+
+        Parameters
+        ----------
+        sample_id : str
+            The sample to get neighbors for.
+        k : int
+            The number of neighbors, at most `n_neighbors`.
+
+        Returns
+        -------
+        list of str
+            The neighbors, closest first.
+
+        Raises
+        ------
+        UnknownID
+            If the sample has no neighbors in the table
+
+        """
+        try:
+            row = self.ids.get_loc(sample_id)
+        except KeyError:
+            raise UnknownID(sample_id)
+        nearest = self.positions[row, :k]
+        return self.vocabulary[nearest[nearest >= 0]].tolist()
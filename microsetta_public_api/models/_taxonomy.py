@@ -12,6 +12,7 @@ from bp import parse_newick
 from microsetta_public_api.exceptions import (DisjointError, UnknownID,
                                               SubsetError)
 from microsetta_public_api.utils import DataTable
+from microsetta_public_api._tracing import span, traced
 from ._base import ModelBase
 
 _gt_named = namedtuple('GroupTaxonomy', ['name', 'taxonomy', 'features',
@@ -278,6 +279,7 @@ class Taxonomy(ModelBase):
         n_rows = len(self._ranked)
         return self._ranked.sample(min(sample_size, n_rows), replace=False)
 
+    @traced()
     def ranks_specific(self, sample_id: str) -> pd.DataFrame:
         """Obtain the taxonomy rank information for a specific sample
 
@@ -346,6 +348,7 @@ class Taxonomy(ModelBase):
         # NOTE: not sure if needed for Taxonomy
         raise NotImplementedError
 
+    @traced()
     def get_group(self, ids: Iterable[str], name: str = None) -> GroupTaxonomy:
         """Get taxonomic detail for a given group
 
@@ -398,10 +401,12 @@ class Taxonomy(ModelBase):
             feature_variances = feature_variances[group_vec.indices]
 
         # construct the group specific taxonomy
-        taxonomy = self._taxonomy_tree_from_features(features)
+        with span('newick', n_features=len(features)):
+            taxonomy = self._taxonomy_tree_from_features(features)
+            newick = str(taxonomy).strip()
 
         return GroupTaxonomy(name=name,
-                             taxonomy=str(taxonomy).strip(),
+                             taxonomy=newick,
                              features=list(features),
                              feature_values=list(feature_values),
                              feature_variances=list(feature_variances),
@@ -414,6 +419,7 @@ class Taxonomy(ModelBase):
                      for i, lineage in feature_taxons['Taxon'].items())
         return skbio.TreeNode.from_taxonomy(tree_data)
 
+    @traced()
     def get_counts(self, level, samples=None) -> dict:
         """Obtain the number of unique maximal specificity features
 
@@ -450,6 +456,7 @@ class Taxonomy(ModelBase):
                             for i in feature_taxons.index])
         return observed
 
+    @traced()
     def presence_data_table(self, ids: Iterable[str]) -> DataTable:
         table = self._table.filter(set(ids), inplace=False).remove_empty()
         features = table.ids(axis='observation')
@@ -0,0 +1,281 @@
+import tempfile
+import unittest
+import numpy as np
+import numpy.testing as npt
+import pandas as pd
+from skbio import DistanceMatrix, OrdinationResults
+
+from microsetta_public_api.exceptions import UnknownID, InvalidParameter
+from microsetta_public_api.models._beta import (DistanceNeighbors,
+                                                OrdinationNeighbors,
+                                                NeighborTable)
+
+
+class DistanceNeighborsTests(unittest.TestCase):
+    def setUp(self):
+        self.dm = DistanceMatrix([[0, 1, 4, 5, 9],
+                                  [1, 0, 2, 6, 8],
+                                  [4, 2, 0, 3, 7],
+                                  [5, 6, 3, 0, 10],
+                                  [9, 8, 7, 10, 0]],
+                                 ids=['a', 'b', 'c', 'd', 'e'])
+        self.neighbors = DistanceNeighbors(self.dm)
+
+    def test_k_nearest(self):
+        obs = self.neighbors.k_nearest(['a', 'c', 'e'], k=2)
+        self.assertDictEqual({'a': ['b', 'c'],
+                              'c': ['b', 'd'],
+                              'e': ['c', 'b']},
+                             obs)
+
+    def test_k_nearest_all(self):
+        obs = self.neighbors.k_nearest(['d'], k=4)
+        self.assertDictEqual({'d': ['c', 'a', 'b', 'e']}, obs)
+
+    def test_k_nearest_chunked(self):
+        self.neighbors.chunk_size = 2
+        obs = self.neighbors.k_nearest(['a', 'b', 'c', 'd', 'e'], k=1)
+        self.assertDictEqual({'a': ['b'], 'b': ['a'], 'c': ['b'],
+                              'd': ['c'], 'e': ['c']},
+                             obs)
+
+    def test_k_nearest_candidates(self):
+        obs = self.neighbors.k_nearest(['a', 'c'], k=2,
+                                       candidates=['a', 'd', 'e', 'dne'])
+        self.assertDictEqual({'a': ['d', 'e'], 'c': ['d', 'a']}, obs)
+
+    def test_k_nearest_fewer_candidates_than_k(self):
+        obs = self.neighbors.k_nearest(['a'], k=3, candidates=['a', 'e'])
+        self.assertDictEqual({'a': ['e']}, obs)
+
+    def test_k_nearest_does_not_modify_matrix(self):
+        data = self.dm.data.copy()
+        self.neighbors.k_nearest(['a', 'b'], k=2)
+        self.neighbors.k_nearest(['a', 'b'], k=2, candidates=['a', 'c'])
+        np.testing.assert_array_equal(data, self.dm.data)
+
+    def test_k_nearest_invalid_k(self):
+        with self.assertRaises(InvalidParameter):
+            self.neighbors.k_nearest(['a'], k=5)
+        with self.assertRaises(InvalidParameter):
+            self.neighbors.k_nearest(['a'], k=0)
+
+    def test_k_nearest_unknown_id(self):
+        with self.assertRaisesRegex(UnknownID, 'dne'):
+            self.neighbors.k_nearest(['a', 'dne'], k=1)
+
+
+class OrdinationNeighborsTests(unittest.TestCase):
+    def setUp(self):
+        axis_labels = ['PC1', 'PC2', 'PC3']
+        samples = pd.DataFrame([[0, 0, 0],
+                                [1, 0, 0],
+                                [3, 0, 0],
+                                [3, 4, 0],
+                                [0, 0, 10]],
+                               index=['a', 'b', 'c', 'd', 'e'],
+                               columns=axis_labels)
+        self.ordination = OrdinationResults(
+            'pcoa', 'pcoa',
+            eigvals=pd.Series([7, 2, 1], index=axis_labels),
+            samples=samples,
+            proportion_explained=pd.Series([0.7, 0.2, 0.1],
+                                           index=axis_labels),
+        )
+        self.neighbors = OrdinationNeighbors(self.ordination)
+
+    def test_k_nearest(self):
+        obs = self.neighbors.k_nearest(['a', 'c', 'e'], k=2)
+        self.assertDictEqual({'a': ['b', 'c'],
+                              'c': ['b', 'a'],
+                              'e': ['a', 'b']},
+                             obs)
+
+    def test_k_nearest_matches_scan(self):
+        tree = self.neighbors.k_nearest(['a', 'b', 'c', 'd', 'e'], k=3)
+        scan = self.neighbors.k_nearest(['a', 'b', 'c', 'd', 'e'], k=3,
+                                        candidates=['a', 'b', 'c', 'd', 'e'])
+        self.assertDictEqual(tree, scan)
+
+    def test_k_nearest_dimensions(self):
+        neighbors = OrdinationNeighbors(self.ordination, dimensions=2)
+        obs = neighbors.k_nearest(['e'], k=1)
+        self.assertDictEqual({'e': ['a']}, obs)
+        obs = neighbors.k_nearest(['a'], k=1)
+        # e is at the same position as a in the first two axes
+        self.assertDictEqual({'a': ['e']}, obs)
+
+    def test_k_nearest_candidates(self):
+        obs = self.neighbors.k_nearest(['a'], k=2, candidates=['d', 'e'])
+        self.assertDictEqual({'a': ['d', 'e']}, obs)
+
+    def test_k_nearest_invalid_k(self):
+        with self.assertRaises(InvalidParameter):
+            self.neighbors.k_nearest(['a'], k=5)
+
+    def test_in_box(self):
+        obs = self.neighbors.in_box([0, 0], [3, 1])
+        npt.assert_array_equal([0, 1, 2, 4], obs)
+        # a bound on an axis other than the first
+        obs = self.neighbors.in_box([5], [20], axes=[2])
+        npt.assert_array_equal([4], obs)
+        obs = self.neighbors.in_box([2, 3], [4, 5], axes=[0, 1])
+        npt.assert_array_equal([3], obs)
+
+    def test_in_box_empty(self):
+        obs = self.neighbors.in_box([10, 10], [20, 20])
+        self.assertEqual(0, len(obs))
+
+    def test_in_box_matches_scan(self):
+        rng = np.random.RandomState(0)
+        coordinates = rng.normal(size=(500, 3))
+        ordination = OrdinationResults(
+            'pcoa', 'pcoa',
+            eigvals=pd.Series([3, 2, 1]),
+            samples=pd.DataFrame(coordinates,
+                                 index=[f's{i}' for i in range(500)]),
+            proportion_explained=pd.Series([0.5, 0.3, 0.2]),
+        )
+        neighbors = OrdinationNeighbors(ordination)
+        lower, upper = [-0.5, -1, 0], [1, 0.5, 2]
+        exp = np.flatnonzero(np.all((coordinates >= lower)
+                                    & (coordinates <= upper), axis=1))
+        npt.assert_array_equal(exp, neighbors.in_box(lower, upper))
+
+    def test_in_box_invalid(self):
+        with self.assertRaises(InvalidParameter):
+            self.neighbors.in_box([0, 0], [1])
+        with self.assertRaises(InvalidParameter):
+            self.neighbors.in_box([0], [1], axes=[3])
+        with self.assertRaises(InvalidParameter):
+            self.neighbors.in_box([0, 0], [1, 1], axes=[0])
+
+    def test_in_radius(self):
+        obs = self.neighbors.in_radius([3, 0], 1)
+        npt.assert_array_equal([2], obs)
+        obs = self.neighbors.in_radius([0, 0], 3)
+        npt.assert_array_equal([0, 1, 2, 4], obs)
+        obs = self.neighbors.in_radius([0, 0, 0], 3)
+        npt.assert_array_equal([0, 1, 2], obs)
+
+    def test_closest(self):
+        positions, distances = self.neighbors.closest([2.9, 3.9], k=2)
+        npt.assert_array_equal([3, 2], positions)
+        npt.assert_allclose([np.sqrt(0.02), np.sqrt(0.01 + 3.9 ** 2)],
+                            distances)
+        positions, distances = self.neighbors.closest([9], axes=[2])
+        npt.assert_array_equal([4], positions)
+        npt.assert_allclose([1], distances)
+
+    def test_closest_k_too_high(self):
+        positions, _ = self.neighbors.closest([0, 0], k=10)
+        self.assertEqual(5, len(positions))
+
+    def test_closest_invalid_k(self):
+        with self.assertRaises(InvalidParameter):
+            self.neighbors.closest([0, 0], k=0)
+
+    def test_query_axes_invalid(self):
+        with self.assertRaisesRegex(InvalidParameter, 'distinct'):
+            self.neighbors.closest([0, 0], axes=[1, 1])
+        with self.assertRaisesRegex(InvalidParameter, 'at most 3'):
+            self.neighbors.in_radius([0, 0, 0, 0], 1, axes=[0, 1, 2, 0])
+        with self.assertRaisesRegex(InvalidParameter, 'at most 3'):
+            self.neighbors.in_box([0] * 4, [1] * 4)
+        self.assertEqual(0, len(self.neighbors._axes_trees))
+
+    def test_axes_trees_bounded(self):
+        self.neighbors.max_axes_trees = 2
+        self.neighbors.closest([0], axes=[0])
+        self.neighbors.closest([0], axes=[1])
+        self.neighbors.closest([0], axes=[0])
+        self.neighbors.closest([0], axes=[2])
+        # the least recently used tree is dropped
+        self.assertListEqual([(0,), (2,)],
+                             list(self.neighbors._axes_trees))
+        positions, _ = self.neighbors.closest([4], axes=[1])
+        npt.assert_array_equal([3], positions)
+        self.assertEqual(2, len(self.neighbors._axes_trees))
+
+
+class NeighborTableTests(unittest.TestCase):
+    def setUp(self):
+        self.neighbors = pd.DataFrame([['s2', 's3', 's4'],
+                                       ['s1', 's3', 's4'],
+                                       ['s4', 's1', np.nan],
+                                       ['s3', 's5', 's1']],
+                                      index=['s1', 's2', 's3', 's4'])
+        self.neighbors.index.name = 'sample_id'
+        self.table = NeighborTable.from_dataframe(self.neighbors)
+
+    def test_from_dataframe(self):
+        self.assertEqual(self.table.positions.dtype, np.int32)
+        self.assertEqual(self.table.positions.shape, (4, 3))
+        self.assertEqual(self.table.n_neighbors, 3)
+        self.assertEqual(len(self.table), 4)
+        self.assertListEqual(['s1', 's2', 's3', 's4'],
+                             list(self.table.ids))
+        self.assertEqual('sample_id', self.table.ids.name)
+        # each ID is held once
+        self.assertListEqual(['s1', 's2', 's3', 's4', 's5'],
+                             sorted(self.table.vocabulary))
+
+    def test_contains(self):
+        self.assertIn('s1', self.table)
+        self.assertNotIn('s5', self.table)
+
+    def test_k_nearest(self):
+        self.assertListEqual(['s3', 's5'], self.table.k_nearest('s4', k=2))
+        self.assertListEqual(['s2', 's3', 's4'],
+                             self.table.k_nearest('s1', k=3))
+
+    def test_k_nearest_missing_neighbors(self):
+        self.assertListEqual(['s4', 's1'], self.table.k_nearest('s3', k=3))
+
+    def test_k_nearest_unknown_id(self):
+        with self.assertRaises(UnknownID):
+            self.table.k_nearest('s5')
+
+    def test_read(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv') as fp:
+            self.neighbors.to_csv(fp.name, sep='\t')
+            table = NeighborTable.read(fp.name)
+        self.assertListEqual(list(self.table.ids), list(table.ids))
+        for id_ in self.table.ids:
+            self.assertListEqual(self.table.k_nearest(id_, k=3),
+                                 table.k_nearest(id_, k=3))
+
+    def test_from_dataframe_vocabulary(self):
+        other = pd.DataFrame([['s6', 's1'], ['s2', np.nan]],
+                             index=['s2', 's6'])
+        table = NeighborTable.from_dataframe(
+            other, vocabulary=self.table.vocabulary)
+        # extends the vocabulary, which is held once
+        self.assertListEqual(list(self.table.vocabulary),
+                             list(table.vocabulary[:5]))
+        self.assertListEqual(['s6'], list(table.vocabulary[5:]))
+        self.assertIs(self.table.vocabulary[0], table.vocabulary[0])
+        self.assertListEqual(['s6', 's1'], table.k_nearest('s2', k=2))
+        self.assertListEqual(['s2'], table.k_nearest('s6', k=2))
+        self.assertListEqual(['s2', 's6'], list(table.ids))
+
+    def test_read_many(self):
+        other = pd.DataFrame([['s6', 's1'], ['s2', 's1']],
+                             index=pd.Index(['s2', 's6'], name='sample_id'))
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv') as fp1, \
+                tempfile.NamedTemporaryFile('w', suffix='.tsv') as fp2:
+            self.neighbors.to_csv(fp1.name, sep='\t')
+            other.to_csv(fp2.name, sep='\t')
+            tables = NeighborTable.read_many({'unifrac': fp1.name,
+                                              'jaccard': fp2.name})
+        unifrac, jaccard = tables['unifrac'], tables['jaccard']
+        self.assertIs(unifrac.vocabulary, jaccard.vocabulary)
+        self.assertEqual(6, len(unifrac.vocabulary))
+        self.assertIs(unifrac.ids[1], jaccard.ids[0])
+        self.assertListEqual(['s2', 's3', 's4'],
+                             unifrac.k_nearest('s1', k=3))
+        self.assertListEqual(['s6', 's1'], jaccard.k_nearest('s2', k=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,59 @@
+import numpy as np
 import pandas as pd
-from microsetta_public_api.exceptions import UnknownID
+from microsetta_public_api.exceptions import UnknownID, UnknownMetric
 from microsetta_public_api.repo._base import DiversityRepo
 from microsetta_public_api.resources import resources as RESOURCES
+from microsetta_public_api._tracing import traced
+from microsetta_public_api.utils._memo import derived
+
+
+class AlphaMatrix:
+    """The alpha diversity of every metric, aligned by sample
+
+    Attributes
+    ----------
+    samples : pd.Index
+        The samples with a value for at least one metric.
+    metrics : list of str
+        The metrics, in the order of the columns of `values`.
+    values : np.ndarray
+        A samples x metrics array of floats, NaN where a sample has no
+        value for a metric.
+    """
+
+    def __init__(self, resources):
+        self.metrics = list(resources)
+        series = [resources[metric] for metric in self.metrics]
+        samples = pd.Index([], dtype=object)
+        for alpha_series in series:
+            samples = samples.union(alpha_series.index, sort=False)
+        self.samples = samples
+        self.values = np.full((len(samples), len(self.metrics)), np.nan)
+        for i, alpha_series in enumerate(series):
+            rows = samples.get_indexer(alpha_series.index)
+            self.values[rows, i] = alpha_series.to_numpy(dtype=float)
+        self._columns = {metric: i for i, metric in enumerate(self.metrics)}
+
+    def get(self, sample_ids, metrics):
+        """Gets the values of metrics for samples
+
+        Parameters
+        ----------
+        sample_ids : list of str
+            Samples, which must be in `samples`.
+        metrics : list of str
+            Metrics, which must be in `metrics`.
+
+        Returns
+        -------
+        pd.DataFrame
+            Indexed by sample ID, with a column per metric.
+
+        """
+        rows = self.samples.get_indexer(sample_ids)
+        columns = [self._columns[metric] for metric in metrics]
+        return pd.DataFrame(self.values[np.ix_(rows, columns)],
+                            index=pd.Index(sample_ids), columns=metrics)
 
 
 class AlphaRepo(DiversityRepo):
@@ -10,6 +62,62 @@ class AlphaRepo(DiversityRepo):
             resources = RESOURCES.get('alpha_resources', dict())
         super().__init__(resources)
 
+    @property
+    def matrix(self):
+        """Every metric as one array, built once per set of resources
+
+        Returns
+        -------
+        AlphaMatrix
+
+        """
+        return derived.get(self.resources, 'alpha_matrix', AlphaMatrix)
+
+    @traced()
+    def get_alpha_diversities(self, sample_ids, metrics=None):
+        """Obtains alpha diversity of several metrics for a list of samples.
+
+        Parameters
+        ----------
+        sample_ids : str or list of str
+            Ids for which to obtain alpha diversity measures.
+
+        metrics : list of str, optional
+            Alpha diversity metrics, defaults to every available metric.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by the ids in `sample_ids`, with a column for each
+            metric in `metrics`. NaN where a sample does not have a value
+            for a metric.
+
+        Raises
+        ------
+
+        UnknownMetric
+            If any metric is not in the repo's resources
+        UnknownID
+            If any id does not have a value for any metric
+
+        """
+        available = self.available_metrics()
+        if metrics is None:
+            metrics = available
+        unknown_metrics = [metric for metric in metrics
+                           if metric not in available]
+        if unknown_metrics:
+            raise UnknownMetric(f"No resource available for metric(s)="
+                                f"{unknown_metrics}")
+        if isinstance(sample_ids, str):
+            sample_ids = [sample_ids]
+        matrix = self.matrix
+        unknown = [id_ for id_ in sample_ids if id_ not in matrix.samples]
+        if unknown:
+            raise UnknownID(f"Unknown ids: {unknown}")
+        return matrix.get(list(sample_ids), list(metrics))
+
+    @traced()
     def get_alpha_diversity(self, sample_ids, metric):
         """Obtains alpha diversity of a given metric for a list of samples.
 
@@ -49,6 +157,7 @@ class AlphaRepo(DiversityRepo):
                             f"{ids.loc[unknown]}")
         return alpha_series.loc[ids]
 
+    @traced()
     def exists(self, sample_ids, metric):
         """Checks if sample_ids exist for the given metric.
 
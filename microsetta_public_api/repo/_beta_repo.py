@@ -1,28 +1,194 @@
+import numpy as np
+import pandas as pd
 from microsetta_public_api.repo._base import DiversityRepo
 from microsetta_public_api.exceptions import UnknownID, InvalidParameter
+from microsetta_public_api.models._beta import (
+    DistanceNeighbors, NeighborTable,
+)
+from microsetta_public_api.utils._memo import derived
+from microsetta_public_api._tracing import traced
+
+
+class BetaRepo(DiversityRepo):
+    """Beta diversity distance matrices, by metric"""
+
+    def __init__(self, resources):
+        super().__init__(resources)
+
+    def exists(self, sample_ids, metric):
+        distance_matrix = self._get_resource(metric)
+        if isinstance(sample_ids, str):
+            return sample_ids in distance_matrix
+        else:
+            existing_ids = set(distance_matrix.ids)
+            return [(id_ in existing_ids) for id_ in sample_ids]
+
+    def neighbors(self, metric):
+        """The neighbor index over a metric, built once per distance matrix
+
+        Returns
+        -------
+        DistanceNeighbors
+
+        """
+        return derived.get(self._get_resource(metric), 'neighbors',
+                           DistanceNeighbors)
+
+    @traced()
+    def k_nearest(self, sample_ids, metric, k=1, candidates=None):
+        """Finds the samples with the smallest distances to each sample
+
+        Parameters
+        ----------
+        sample_ids : list of str
+            The samples to find neighbors for.
+        metric : str
+            Beta diversity metric.
+        k : int
+            The number of neighbors to find for each sample.
+        candidates : list of str, optional
+            Limits the neighbors to these samples.
+
+        Returns
+        -------
+        dict of str to list of str
+            The neighbors of each sample, closest first.
+
+        """
+        return self.neighbors(metric).k_nearest(sample_ids, k=k,
+                                                candidates=candidates)
+
+    @traced()
+    def distances(self, sample_id, metric, sample_ids=None):
+        """The distances from a sample to other samples
+
+        Parameters
+        ----------
+        sample_id : str
+            The sample to measure distances from.
+        metric : str
+            Beta diversity metric.
+        sample_ids : list of str, optional
+            The samples to measure distances to. Defaults to every other
+            sample in the distance matrix.
+
+        Returns
+        -------
+        pd.Series
+            The distances, indexed by sample ID. The distance from
+            `sample_id` to itself is not included.
+
+        Raises
+        ------
+        UnknownID
+            If `sample_id` or any of `sample_ids` is not in the distance
+            matrix
+
+        """
+        neighbors = self.neighbors(metric)
+        row, columns = self._positions(neighbors, sample_id, sample_ids)
+        # the row is a view, so only the requested distances are copied
+        return pd.Series(neighbors.data[row][columns],
+                         index=neighbors.ids[columns], name=sample_id)
+
+    @traced()
+    def distance_summary(self, sample_id, metric, sample_ids=None,
+                         percentiles=None):
+        """Summarizes the distances from a sample to other samples
+
+        Parameters
+        ----------
+        sample_id : str
+            The sample to measure distances from.
+        metric : str
+            Beta diversity metric.
+        sample_ids : list of str, optional
+            The samples to measure distances to. Defaults to every other
+            sample in the distance matrix.
+        percentiles : list of int, optional
+            The percentiles to compute. Defaults to the deciles.
+
+        Returns
+        -------
+        dict
+            The group_size, mean, median and std of the distances, and the
+            values of the percentiles, which are None for an empty group.
+
+        Raises
+        ------
+        UnknownID
+            If `sample_id` or any of `sample_ids` is not in the distance
+            matrix
+
+        """
+        if percentiles is None:
+            percentiles = [10, 20, 30, 40, 50, 60, 70, 80, 90]
+        neighbors = self.neighbors(metric)
+        row, columns = self._positions(neighbors, sample_id, sample_ids)
+        values = neighbors.data[row][columns]
+        summary = {'group_size': len(values), 'percentile': percentiles}
+        if len(values) == 0:
+            summary.update(mean=None, median=None, std=None,
+                           percentile_values=None)
+            return summary
+        summary.update(
+            mean=float(values.mean()),
+            median=float(np.median(values)),
+            std=float(values.std()),
+            percentile_values=np.percentile(values, percentiles).tolist(),
+        )
+        return summary
+
+    @staticmethod
+    def _positions(neighbors, sample_id, sample_ids):
+        row = neighbors.positions([sample_id])[0]
+        if sample_ids is None:
+            columns = np.arange(len(neighbors.ids))
+        else:
+            columns = neighbors.positions(sample_ids)
+        return row, columns[columns != row]
 
 
 class NeighborsRepo(DiversityRepo):
+    """Precomputed nearest neighbors, by metric
+
+    The neighbors of a metric are a `NeighborTable`, or a DataFrame of
+    neighbor IDs indexed by sample ID, which is encoded as a table on first
+    use.
+    """
 
     def __init__(self, resources):
         super().__init__(resources)
 
+    def table(self, metric):
+        """The neighbor table of a metric
+
+        Returns
+        -------
+        NeighborTable
+
+        """
+        neighbors = self._get_resource(metric)
+        if isinstance(neighbors, NeighborTable):
+            return neighbors
+        return derived.get(neighbors, 'neighbor_table',
+                           NeighborTable.from_dataframe)
+
     def exists(self, sample_ids, metric):
-        nearest_ids = self._get_resource(metric)
+        table = self.table(metric)
         if isinstance(sample_ids, str):
-            return sample_ids in nearest_ids.index
+            return sample_ids in table
         else:
-            return [(id_ in nearest_ids.index) for id_ in sample_ids]
+            return (table.ids.get_indexer(sample_ids) >= 0).tolist()
 
+    @traced()
     def k_nearest(self, sample_id, metric, k=1):
-        nearest_ids = self._get_resource(metric)
-        if not self.exists(sample_id, metric):
+        table = self.table(metric)
+        if sample_id not in table:
             raise UnknownID(sample_id)
-        n_neighbors = len(nearest_ids.columns)
+        n_neighbors = table.n_neighbors
         if k > n_neighbors:
             raise InvalidParameter(
                 f"k={k} is greater than the maximum ({n_neighbors})."
             )
-
-        nearest = nearest_ids.loc[sample_id]
-        return nearest[:k].to_list()
+        return table.k_nearest(sample_id, k=k)
@@ -1,19 +1,115 @@
-from operator import eq, ge
-from functools import partial
+from operator import eq, ge, gt, le, lt
+import numpy as np
 import pandas as pd
 from microsetta_public_api.resources import resources
+from microsetta_public_api._tracing import traced
+from microsetta_public_api.utils._memo import derived
 
+
+def _as_list(value):
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def _comparison(op):
+    def compare(values, value):
+        return np.asarray(op(values, value), dtype=bool)
+    return compare
+
+
+def _not_equal(values, value):
+    return np.asarray(pd.notna(values) & (values != value), dtype=bool)
+
+
+def _in(values, value):
+    return np.asarray(values.isin(_as_list(value)), dtype=bool)
+
+
+def _not_in(values, value):
+    return np.asarray(pd.notna(values), dtype=bool) & ~_in(values, value)
+
+
+def _between(values, value):
+    bounds = _as_list(value)
+    if len(bounds) != 2:
+        raise ValueError(f"`between` expects a value of [low, high]. Got "
+                         f"{value}.")
+    low, high = bounds
+    return np.asarray((values >= low) & (values <= high), dtype=bool)
+
+
+def _is_null(values, value):
+    return np.asarray(pd.isna(values), dtype=bool)
+
+
+def _is_not_null(values, value):
+    return np.asarray(pd.notna(values), dtype=bool)
+
+
+def _begins_with(values, value):
+    matches = values.astype(str).str.startswith(str(value), na=False)
+    return np.asarray(matches, dtype=bool) & \
+        np.asarray(pd.notna(values), dtype=bool)
+
+
+# each operator takes the values of a category (a pd.Series, or the
+#  categories of a categorical as a pd.Index) and the value of a rule, and
+#  returns a boolean array. Missing values only match is_null.
 ops = {
-    'equal': eq,
-    'greater_or_equal': ge,
+    'equal': _comparison(eq),
+    'not_equal': _not_equal,
+    'in': _in,
+    'not_in': _not_in,
+    'less': _comparison(lt),
+    'less_or_equal': _comparison(le),
+    'greater': _comparison(gt),
+    'greater_or_equal': _comparison(ge),
+    'between': _between,
+    'begins_with': _begins_with,
+    'is_null': _is_null,
+    'is_not_null': _is_not_null,
 }
 
+# the operators that match missing values
+_null_ops = {'is_null'}
+
 conditions = {
-    "AND": partial(pd.DataFrame.all, axis=1),
-    "OR": partial(pd.DataFrame.any, axis=1)
+    "AND": np.logical_and.reduce,
+    "OR": np.logical_or.reduce,
 }
 
 
+def _evaluate_rule(column, op, value):
+    """Evaluates a rule against a column
+
+    Parameters
+    ----------
+    column : pd.Series
+        The values of the category the rule is on.
+    op : str
+        A key of `ops`.
+    value : object
+        The value of the rule.
+
+    Returns
+    -------
+    np.ndarray of bool
+        Whether each sample matches the rule.
+
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # evaluate the rule once per category, and then look up the result
+        #  of each sample by its code, with the last entry of the lookup
+        #  standing in for missing values
+        categories = column.cat.categories
+        lookup = np.empty(len(categories) + 1, dtype=bool)
+        lookup[:-1] = ops[op](categories, value)
+        lookup[-1] = op in _null_ops
+        return lookup[column.cat.codes.to_numpy()]
+    return ops[op](column, value)
+
+
 def _is_rule(node):
     rule_fields = ["id", "operator", "value"]
     for field in rule_fields:
@@ -22,12 +118,83 @@ def _is_rule(node):
 
     op = node["operator"]
     if op not in ops:
-        raise ValueError(f"Only operators in {ops} are supported. "
+        raise ValueError(f"Only operators in {list(ops)} are supported. "
                          f"Got {op}")
 
     return True
 
 
+class CategorySummary:
+    """The distinct values of a metadata category and how often they occur
+
+    Attributes
+    ----------
+    values : list
+        The distinct values in order of first appearance, including a
+        missing value if there is one.
+    counts : list of int
+        The number of samples with each of the non-missing values.
+    null_count : int
+        The number of samples with a missing value.
+    """
+
+    def __init__(self, column):
+        self.values = list(column.unique())
+        counts = column.value_counts(dropna=True)
+        self.counts = [int(counts[value]) for value in self.values
+                       if not pd.isnull(value)]
+        self.null_count = int(column.isnull().sum())
+
+    def non_null_values(self):
+        return [value for value in self.values if not pd.isnull(value)]
+
+
+def _gather_column(column, positions, fillna):
+    """Takes the values of a column at positions, filling in missing values
+
+    Parameters
+    ----------
+    column : pd.Series
+        The column to take values from.
+    positions : np.ndarray of int or None
+        The row of each value, -1 for rows that are not in the column. None
+        to take every row.
+    fillna : object
+        Replaces missing values and the values of missing rows.
+
+    Returns
+    -------
+    np.ndarray of object
+
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # gather the codes, and look up each in the categories once, with
+        #  the last entry of the lookup standing in for missing values
+        categories = column.cat.categories
+        lookup = np.empty(len(categories) + 1, dtype=object)
+        lookup[:-1] = categories.to_numpy(dtype=object)
+        lookup[-1] = fillna
+        codes = column.cat.codes.to_numpy()
+        if positions is not None:
+            codes = np.where(positions >= 0, codes[positions], -1)
+        return lookup[codes]
+
+    values = column.to_numpy(dtype=object)
+    if positions is None:
+        values = values.copy()
+        missing = pd.isna(values)
+    else:
+        values = values[positions]
+        missing = pd.isna(values) | (positions < 0)
+    values[missing] = fillna
+    return values
+
+
+def _build_index(metadata):
+    return {category: CategorySummary(column)
+            for category, column in metadata.items()}
+
+
 class MetadataRepo:
 
     def __init__(self, metadata=None):
@@ -44,6 +211,17 @@ class MetadataRepo:
     def categories(self):
         return list(self._metadata.columns)
 
+    @property
+    def index(self):
+        """Summaries of every category, computed once per metadata frame
+
+        Returns
+        -------
+        dict of str to CategorySummary
+
+        """
+        return derived.get(self._metadata, 'metadata_index', _build_index)
+
     @property
     def samples(self):
         return list(self._metadata.index)
@@ -72,10 +250,57 @@ class MetadataRepo:
         """
         if category not in self._metadata.columns:
             raise ValueError(f'No category with name `{category}`')
-        category_values = self._metadata[category].unique()
+        summary = self.index[category]
         if exclude_na:
-            category_values = category_values[~pd.isnull(category_values)]
-        return list(category_values)
+            return summary.non_null_values()
+        return list(summary.values)
+
+    def all_category_values(self, exclude_na=True):
+        """
+        Parameters
+        ----------
+        exclude_na : bool
+            If True, not a number (na) values will be dropped from the
+            category values
+
+        Returns
+        -------
+        dict of str to list
+            The unique values of every metadata category
+
+        """
+        return {category: self.category_values(category, exclude_na)
+                for category in self.categories}
+
+    def category_statistics(self, category):
+        """
+        Parameters
+        ----------
+        category : str
+            Metadata category to summarize
+
+        Returns
+        -------
+        dict
+            The number of samples, the number of samples with a missing
+            value, and the count of each unique value in the category
+
+        Raises
+        ------
+        ValueError
+            If `category` is not an existing category in the metadata
+
+        """
+        if category not in self._metadata.columns:
+            raise ValueError(f'No category with name `{category}`')
+        summary = self.index[category]
+        return {
+            'category': category,
+            'n_samples': len(self._metadata),
+            'null_count': summary.null_count,
+            'values': [{'value': value, 'count': count} for value, count in
+                       zip(summary.non_null_values(), summary.counts)],
+        }
 
     def has_category(self, category):
         if isinstance(category, str):
@@ -91,14 +316,82 @@ class MetadataRepo:
             index = set(self._metadata.index)
             return [id_ in index for id_ in sample_id]
 
+    def _gather(self, categories, sample_ids, fillna):
+        if sample_ids is None:
+            positions = None
+        else:
+            positions = self._metadata.index.get_indexer(sample_ids)
+        return [_gather_column(self._metadata[category], positions, fillna)
+                for category in categories]
+
+    @traced()
     def get_metadata(self, categories, sample_ids=None, fillna=None):
-        md = self._metadata[categories]
-        if sample_ids is not None:
-            md = md.reindex(sample_ids, fill_value=None)
-        md = md.astype('object')
-        md[pd.isna(md)] = fillna
-        return md
+        """
+        Parameters
+        ----------
+        categories : str or list of str
+            The metadata categories to get
+        sample_ids : list of str, optional
+            The samples to get metadata for, defaults to all samples.
+            Samples that are not in the metadata get `fillna` for every
+            category.
+        fillna : object
+            Replaces missing values
+
+        Returns
+        -------
+        pd.Series or pd.DataFrame
+            A series if `categories` is a str, otherwise a frame, of object
+            dtype and indexed by sample ID
+
+        """
+        single = isinstance(categories, str)
+        if single:
+            categories = [categories]
+        columns = self._gather(categories, sample_ids, fillna)
+        if sample_ids is None:
+            index = self._metadata.index
+        else:
+            index = pd.Index(sample_ids, name=self._metadata.index.name)
+        if single:
+            return pd.Series(columns[0], index=index, name=categories[0],
+                             dtype=object)
+        return pd.DataFrame(dict(zip(categories, columns)), index=index,
+                            columns=categories, dtype=object)
+
+    @traced()
+    def get_metadata_rows(self, categories, sample_ids=None, fillna=None):
+        """Gets metadata as one list of values per sample
+
+        Skips building a frame, so is cheaper than `get_metadata` when the
+        values are going to be serialized, e.g., for every sample in an
+        ordination.
+
+        Parameters
+        ----------
+        categories : list of str
+            The metadata categories to get
+        sample_ids : list of str, optional
+            The samples to get metadata for, defaults to all samples.
+            Samples that are not in the metadata get `fillna` for every
+            category.
+        fillna : object
+            Replaces missing values
 
+        Returns
+        -------
+        list of list
+            The values of `categories` for each sample, in order
+
+        """
+        columns = self._gather(categories, sample_ids, fillna)
+        if not columns:
+            n_samples = len(self._metadata) if sample_ids is None else \
+                len(sample_ids)
+            return [[] for _ in range(n_samples)]
+        return [list(row) for row in zip(*columns)]
+
+    @traced()
     def sample_id_matches(self, query):
         """
 
@@ -122,23 +415,19 @@ class MetadataRepo:
         if _is_rule(query):
             category, op, value = query['id'], query['operator'], \
                                   query['value']
-            return ops[op](self._metadata[category], value)
+            return _evaluate_rule(self._metadata[category], op, value)
         else:
             for field in group_fields:
                 if field not in query:
                     raise ValueError(f"query=`{query}` does not appear to be "
                                      f"a rule or a group.")
             if query['condition'] not in conditions:
-                raise ValueError(f"Only conditions in {conditions} are "
+                raise ValueError(f"Only conditions in {list(conditions)} are "
                                  f"supported. Got {query['condition']}.")
             else:
                 condition = conditions[query['condition']]
 
-            return condition(self._safe_concat([self._process_query(rule) for
-                                                rule in query['rules']],
-                                               axis=1))
-
-    def _safe_concat(self, list_of_df, **concat_kwargs):
-        if len(list_of_df) > 0:
-            return pd.concat(list_of_df, **concat_kwargs)
-        return pd.DataFrame(pd.Series(True, index=self._metadata.index))
+            masks = [self._process_query(rule) for rule in query['rules']]
+            if len(masks) == 0:
+                return np.ones(len(self._metadata), dtype=bool)
+            return condition(masks)
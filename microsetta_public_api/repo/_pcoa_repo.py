@@ -1,5 +1,10 @@
+import numpy as np
+import pandas as pd
 from skbio.stats.ordination import OrdinationResults
 from microsetta_public_api.resources import resources
+from microsetta_public_api.models._beta import OrdinationNeighbors
+from microsetta_public_api.utils._memo import derived
+from microsetta_public_api._tracing import traced
 
 
 class PCoARepo:
@@ -17,3 +22,133 @@ class PCoARepo:
             return False
         else:
             return metric in self._sample_sets[sample_set]
+
+    def neighbors(self, sample_set, metric):
+        """The neighbor index of an ordination, built once per ordination
+
+        Returns
+        -------
+        OrdinationNeighbors
+
+        """
+        return derived.get(self.get_pcoa(sample_set, metric), 'neighbors',
+                           OrdinationNeighbors)
+
+    @traced()
+    def k_nearest(self, sample_set, metric, sample_ids, k=1,
+                  candidates=None):
+        """Finds the closest samples to each sample in an ordination
+
+        Parameters
+        ----------
+        sample_set : str
+            The named sample set of the ordination.
+        metric : str
+            The beta diversity metric of the ordination.
+        sample_ids : list of str
+            The samples to find neighbors for.
+        k : int
+            The number of neighbors to find for each sample.
+        candidates : list of str, optional
+            Limits the neighbors to these samples.
+
+        Returns
+        -------
+        dict of str to list of str
+            The neighbors of each sample, closest first.
+
+        """
+        return self.neighbors(sample_set, metric).k_nearest(
+            sample_ids, k=k, candidates=candidates)
+
+    def _coordinates(self, index, positions, axes):
+        return pd.DataFrame(index.coordinates[np.ix_(positions, axes)],
+                            index=index.ids[positions], columns=list(axes))
+
+    @traced()
+    def samples_in_box(self, sample_set, metric, lower, upper, axes=None):
+        """Finds the samples within a box, e.g., the visible part of a plot
+
+        Parameters
+        ----------
+        sample_set : str
+            The named sample set of the ordination.
+        metric : str
+            The beta diversity metric of the ordination.
+        lower, upper : list of float
+            The bounds of the box on each axis, inclusive.
+        axes : list of int, optional
+            The axes that are bounded, defaults to the leading axes.
+
+        Returns
+        -------
+        pd.DataFrame
+            The coordinates of the samples on the axes, indexed by sample
+            ID, with a column per axis.
+
+        """
+        index = self.neighbors(sample_set, metric)
+        axes = index.resolve_axes(axes, len(lower))
+        return self._coordinates(index, index.in_box(lower, upper, axes),
+                                 axes)
+
+    @traced()
+    def samples_in_radius(self, sample_set, metric, center, radius,
+                          axes=None):
+        """Finds the samples within a distance of a point
+
+        Parameters
+        ----------
+        sample_set : str
+            The named sample set of the ordination.
+        metric : str
+            The beta diversity metric of the ordination.
+        center : list of float
+            The point, on each axis.
+        radius : float
+            The Euclidean distance from the point, inclusive.
+        axes : list of int, optional
+            The axes of the point, defaults to the leading axes.
+
+        Returns
+        -------
+        pd.DataFrame
+            The coordinates of the samples on the axes, indexed by sample
+            ID, with a column per axis.
+
+        """
+        index = self.neighbors(sample_set, metric)
+        axes = index.resolve_axes(axes, len(center))
+        return self._coordinates(index,
+                                 index.in_radius(center, radius, axes), axes)
+
+    @traced()
+    def closest_samples(self, sample_set, metric, point, k=1, axes=None):
+        """Finds the samples closest to a point, e.g., a cursor
+
+        Parameters
+        ----------
+        sample_set : str
+            The named sample set of the ordination.
+        metric : str
+            The beta diversity metric of the ordination.
+        point : list of float
+            The point, on each axis.
+        k : int
+            The number of samples to find.
+        axes : list of int, optional
+            The axes of the point, defaults to the leading axes.
+
+        Returns
+        -------
+        pd.DataFrame
+            The coordinates of the samples on the axes, closest first,
+            indexed by sample ID, with a column per axis.
+        np.ndarray of float
+            The distance of each sample from the point.
+
+        """
+        index = self.neighbors(sample_set, metric)
+        axes = index.resolve_axes(axes, len(point))
+        positions, distances = index.closest(point, k=k, axes=axes)
+        return self._coordinates(index, positions, axes), distances
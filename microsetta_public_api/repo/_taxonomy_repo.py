@@ -1,6 +1,7 @@
 from microsetta_public_api.resources import resources
 from microsetta_public_api.models._taxonomy import Taxonomy as TaxonomyModel
 from microsetta_public_api.exceptions import UnknownResource
+from microsetta_public_api._tracing import traced
 
 
 class TaxonomyRepo:
@@ -63,6 +64,7 @@ class TaxonomyRepo:
     def variances(self, table_name):
         return self._get_resource(table_name, component='variances')
 
+    @traced()
     def model(self, table_name):
         model = self._get_resource(table_name, component='model')
         if model is None:
@@ -72,6 +74,7 @@ class TaxonomyRepo:
             model = TaxonomyModel(table, features, variances)
         return model
 
+    @traced()
     def exists(self, sample_ids, table_name):
         """Checks if sample_ids exist for the given table.
 
@@ -1,8 +1,9 @@
 import unittest
 from unittest.mock import patch
+import numpy as np
 import pandas as pd
 from qiime2 import Artifact
-from pandas.testing import assert_series_equal
+from pandas.testing import assert_series_equal, assert_frame_equal
 
 from microsetta_public_api import config
 from microsetta_public_api.resources import resources
@@ -93,6 +94,32 @@ class TestAlphaRepoWithResources(TempfileTestCase, ConfigTestCase):
             self.repo.get_alpha_diversity(['sample-dne', 'sample2'],
                                           'chao1')
 
+    def test_get_alpha_diversities(self):
+        obs = self.repo.get_alpha_diversities(['sample2', 'sample4'])
+        exp = pd.DataFrame([[9.04, 9.04], [np.nan, 8.25]],
+                           index=['sample2', 'sample4'],
+                           columns=['chao1', 'faith_pd'])
+        assert_frame_equal(obs, exp)
+
+    def test_get_alpha_diversities_metrics(self):
+        obs = self.repo.get_alpha_diversities('sample1', ['faith_pd',
+                                                          'chao1'])
+        exp = pd.DataFrame([[np.nan, 7.15]], index=['sample1'],
+                           columns=['faith_pd', 'chao1'])
+        assert_frame_equal(obs, exp)
+
+    def test_get_alpha_diversities_unknown_metric(self):
+        with self.assertRaisesRegex(UnknownMetric, 'metric-dne'):
+            self.repo.get_alpha_diversities('sample2', ['chao1',
+                                                        'metric-dne'])
+
+    def test_get_alpha_diversities_unknown_ids(self):
+        with self.assertRaisesRegex(UnknownID, 'sample-dne'):
+            self.repo.get_alpha_diversities(['sample2', 'sample-dne'])
+
+    def test_matrix_built_once(self):
+        self.assertIs(self.repo.matrix, AlphaRepo().matrix)
+
     def test_exists(self):
         # group tests
         sample_list = ['sample2', 'sample1', 'sample2', 'blah', 'sample4']
@@ -3,7 +3,9 @@ from microsetta_public_api.exceptions import (
     UnknownID, InvalidParameter, UnknownMetric,
 )
 import pandas as pd
-from microsetta_public_api.repo._beta_repo import NeighborsRepo
+from skbio import DistanceMatrix
+from microsetta_public_api.repo._beta_repo import NeighborsRepo, BetaRepo
+from microsetta_public_api.models._beta import NeighborTable
 
 
 class NeighborsRepoTestCase(TestCase):
@@ -51,3 +53,96 @@ class NeighborsRepoTestCase(TestCase):
     def test_k_nearest_invalid_metric(self):
         with self.assertRaises(UnknownMetric):
             self.repo.k_nearest('dne', 'dne-metric', k=3)
+
+    def test_table_cached(self):
+        table = self.repo.table('unifrac')
+        self.assertIsInstance(table, NeighborTable)
+        self.assertIs(table, NeighborsRepo({'unifrac': self.neighbors}
+                                           ).table('unifrac'))
+
+    def test_k_nearest_from_table(self):
+        repo = NeighborsRepo({'unifrac': NeighborTable.from_dataframe(
+            self.neighbors)})
+        self.assertListEqual(['s3', 's4', 's6'],
+                             repo.k_nearest('s5', 'unifrac', k=3))
+        self.assertListEqual([True, False],
+                             repo.exists(['s1', 'dne'], 'unifrac'))
+
+
+class BetaRepoTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.dm = DistanceMatrix([[0, 1, 4, 5],
+                                  [1, 0, 2, 6],
+                                  [4, 2, 0, 3],
+                                  [5, 6, 3, 0]],
+                                 ids=['s1', 's2', 's3', 's4'])
+        self.repo = BetaRepo({'unifrac': self.dm})
+
+    def test_exists(self):
+        exp = [True, False, True]
+        obs = self.repo.exists(['s1', 'dne', 's3'], 'unifrac')
+        self.assertListEqual(exp, obs)
+        self.assertTrue(self.repo.exists('s1', 'unifrac'))
+        self.assertFalse(self.repo.exists('dne', 'unifrac'))
+
+    def test_k_nearest(self):
+        obs = self.repo.k_nearest(['s1', 's4'], 'unifrac', k=2)
+        self.assertDictEqual({'s1': ['s2', 's3'], 's4': ['s3', 's1']}, obs)
+
+    def test_k_nearest_candidates(self):
+        obs = self.repo.k_nearest(['s1'], 'unifrac', k=1,
+                                  candidates=['s3', 's4'])
+        self.assertDictEqual({'s1': ['s3']}, obs)
+
+    def test_k_nearest_neighbors_cached(self):
+        self.assertIs(self.repo.neighbors('unifrac'),
+                      BetaRepo({'unifrac': self.dm}).neighbors('unifrac'))
+
+    def test_k_nearest_k_too_high(self):
+        with self.assertRaises(InvalidParameter):
+            self.repo.k_nearest(['s1'], 'unifrac', k=4)
+
+    def test_k_nearest_invalid_id(self):
+        with self.assertRaises(UnknownID):
+            self.repo.k_nearest(['dne'], 'unifrac', k=1)
+
+    def test_k_nearest_invalid_metric(self):
+        with self.assertRaises(UnknownMetric):
+            self.repo.k_nearest(['s1'], 'dne-metric', k=1)
+
+    def test_distances(self):
+        obs = self.repo.distances('s2', 'unifrac')
+        pd.testing.assert_series_equal(
+            pd.Series([1., 2., 6.], index=['s1', 's3', 's4'], name='s2'),
+            obs, check_index_type=False, check_dtype=False)
+
+    def test_distances_sample_ids(self):
+        obs = self.repo.distances('s2', 'unifrac', ['s4', 's2', 's1'])
+        pd.testing.assert_series_equal(
+            pd.Series([6., 1.], index=['s4', 's1'], name='s2'),
+            obs, check_index_type=False, check_dtype=False)
+
+    def test_distances_unknown_id(self):
+        with self.assertRaises(UnknownID):
+            self.repo.distances('dne', 'unifrac')
+        with self.assertRaises(UnknownID):
+            self.repo.distances('s1', 'unifrac', ['s2', 'dne'])
+
+    def test_distance_summary(self):
+        obs = self.repo.distance_summary('s1', 'unifrac',
+                                         percentiles=[0, 50, 100])
+        self.assertDictEqual({'group_size': 3,
+                              'mean': 10 / 3,
+                              'median': 4.,
+                              'std': obs['std'],
+                              'percentile': [0, 50, 100],
+                              'percentile_values': [1., 4., 5.]},
+                             obs)
+        self.assertAlmostEqual(obs['std'], 1.699673, places=5)
+
+    def test_distance_summary_empty(self):
+        obs = self.repo.distance_summary('s1', 'unifrac', ['s1'])
+        self.assertEqual(0, obs['group_size'])
+        self.assertIsNone(obs['mean'])
+        self.assertIsNone(obs['percentile_values'])
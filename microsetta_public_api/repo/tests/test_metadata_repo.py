@@ -6,6 +6,7 @@ from microsetta_public_api.resources import resources
 from microsetta_public_api.utils.testing import (TempfileTestCase,
                                                  ConfigTestCase)
 from microsetta_public_api.repo._metadata_repo import MetadataRepo
+from microsetta_public_api.utils._metadata import compact_metadata
 
 
 class TestMetadataRepo(TempfileTestCase, ConfigTestCase):
@@ -60,6 +61,30 @@ class TestMetadataRepo(TempfileTestCase, ConfigTestCase):
         obs = self.repo.category_values('num_cat')
         self.assertCountEqual(exp, obs)
 
+    def test_all_category_values(self):
+        obs = self.repo.all_category_values()
+        self.assertCountEqual(['age_cat', 'num_cat', 'other'], obs.keys())
+        self.assertCountEqual(['30s', '40s', '50s'], obs['age_cat'])
+        self.assertCountEqual([7.24, 8.25], obs['num_cat'])
+
+    def test_category_statistics(self):
+        obs = self.repo.category_statistics('age_cat')
+        exp = {'category': 'age_cat',
+               'n_samples': 5,
+               'null_count': 1,
+               'values': [{'value': '30s', 'count': 2},
+                          {'value': '40s', 'count': 1},
+                          {'value': '50s', 'count': 1}],
+               }
+        self.assertDictEqual(exp, obs)
+
+    def test_category_statistics_dne(self):
+        with self.assertRaises(ValueError):
+            self.repo.category_statistics('foo')
+
+    def test_index_memoized(self):
+        self.assertIs(self.repo.index, MetadataRepo(self.repo.metadata).index)
+
     def test_samples(self):
         obs = self.repo.samples
         exp = self.test_metadata.index
@@ -125,6 +150,28 @@ class TestMetadataRepo(TempfileTestCase, ConfigTestCase):
         }
         self.assertDictEqual(obs.to_dict(), exp)
 
+    def test_get_metadata_rows(self):
+        obs = self.repo.get_metadata_rows(['num_cat', 'other'])
+        exp = [[7.24, 1.0], [7.24, 2.0], [8.25, 3.0], [7.24, 4.0],
+               [None, None]]
+        self.assertListEqual(exp, obs)
+
+        obs = self.repo.get_metadata_rows(['age_cat', 'num_cat'],
+                                          sample_ids=['e', 'one', 'a'],
+                                          fillna='nan',
+                                          )
+        exp = [['nan', 'nan'], ['nan', 'nan'], ['30s', 7.24]]
+        self.assertListEqual(exp, obs)
+
+    def test_get_metadata_rows_matches_get_metadata(self):
+        sample_ids = ['c', 'z', 'e', 'a']
+        categories = ['other', 'age_cat']
+        exp = self.repo.get_metadata(categories, sample_ids=sample_ids,
+                                     fillna='missing').values.tolist()
+        obs = self.repo.get_metadata_rows(categories, sample_ids=sample_ids,
+                                          fillna='missing')
+        self.assertListEqual(exp, obs)
+
     def test_category_sample_id_matches_query_multiple_category(self):
         exp = ['a', 'd']
         query = {
@@ -229,6 +276,54 @@ class TestMetadataRepo(TempfileTestCase, ConfigTestCase):
                                                 r'rule or a group'):
             self.repo.sample_id_matches(query)
 
+    def _matches(self, category, operator, value):
+        query = {
+            "condition": "AND",
+            "rules": [
+                {
+                    "id": category,
+                    "operator": operator,
+                    "value": value,
+                },
+            ]
+        }
+        return self.repo.sample_id_matches(query)
+
+    def test_category_sample_id_matches_operators(self):
+        cases = [
+            ('age_cat', 'in', ['30s', '50s'], ['a', 'c', 'd']),
+            ('age_cat', 'in', '40s', ['b']),
+            ('age_cat', 'not_in', ['30s'], ['b', 'c']),
+            ('age_cat', 'not_equal', '30s', ['b', 'c']),
+            ('age_cat', 'less', '40s', ['a', 'd']),
+            ('age_cat', 'between', ['35', '45'], ['b']),
+            ('age_cat', 'begins_with', '4', ['b']),
+            ('age_cat', 'is_null', None, ['e']),
+            ('age_cat', 'is_not_null', None, ['a', 'b', 'c', 'd']),
+            ('num_cat', 'less_or_equal', 7.24, ['a', 'b', 'd']),
+            ('num_cat', 'greater', 7.24, ['c']),
+            ('num_cat', 'between', [7, 8], ['a', 'b', 'd']),
+            ('other', 'in', [1, 3], ['a', 'c']),
+            ('other', 'not_equal', 2, ['a', 'c', 'd']),
+            ('other', 'is_null', None, ['e']),
+        ]
+        for category, operator, value, exp in cases:
+            with self.subTest(category=category, operator=operator):
+                self.assertCountEqual(exp, self._matches(category, operator,
+                                                         value))
+
+    def test_category_sample_id_matches_between_ill_formed(self):
+        with self.assertRaisesRegex(ValueError, 'between'):
+            self._matches('num_cat', 'between', [7])
+
+    def test_category_sample_id_matches_empty_group(self):
+        query = {
+            "condition": "OR",
+            "rules": [],
+        }
+        self.assertCountEqual(['a', 'b', 'c', 'd', 'e'],
+                              self.repo.sample_id_matches(query))
+
     def test_category_sample_id_ill_formed_query_unsupported_condition(self):
         query = {
             "condition": "XOR",
@@ -258,3 +353,41 @@ class TestMetadataRepo(TempfileTestCase, ConfigTestCase):
         with self.assertRaisesRegex(ValueError, r'Only operators in (.*) '
                                                 r'are supported. Got '):
             self.repo.sample_id_matches(query)
+
+
+class TestCompactMetadataRepo(TestMetadataRepo):
+    """Runs the MetadataRepo tests against compacted metadata"""
+
+    def setUp(self):
+        super().setUp()
+        # every text column as a categorical
+        self.repo = MetadataRepo(compact_metadata(self.repo.metadata,
+                                                  max_unique_fraction=1))
+
+    def test_compacted(self):
+        self.assertIsInstance(self.repo.metadata['age_cat'].dtype,
+                              pd.CategoricalDtype)
+
+    def test_get_metadata_categorical(self):
+        obs = self.repo.get_metadata('age_cat', sample_ids=['a', 'e', 'z'],
+                                     fillna='nan')
+        self.assertDictEqual({'a': '30s', 'e': 'nan', 'z': 'nan'},
+                             obs.to_dict())
+
+    def test_ordered_comparison_categorical(self):
+        query = {
+            "condition": "AND",
+            "rules": [
+                {
+                    "id": "age_cat",
+                    "operator": "greater_or_equal",
+                    "value": "40s",
+                },
+            ]
+        }
+        metadata = self.repo.metadata.astype({'age_cat': object})
+        metadata = metadata.dropna(subset=['age_cat'])
+        self.assertCountEqual(['b', 'c'],
+                              MetadataRepo(compact_metadata(
+                                  metadata, max_unique_fraction=1)
+                              ).sample_id_matches(query))
@@ -1,4 +1,6 @@
 from unittest import TestCase
+import pandas as pd
+from skbio import OrdinationResults
 from microsetta_public_api.resources import resources
 from microsetta_public_api.repo._pcoa_repo import PCoARepo
 
@@ -48,3 +50,48 @@ class PCoARepoTestCase(TestCase):
 
         obs = repo.has_pcoa('dne_sample_set', 'unifrac')
         self.assertFalse(obs)
+
+    def test_k_nearest(self):
+        axis_labels = ['PC1', 'PC2']
+        ordination = OrdinationResults(
+            'pcoa', 'pcoa',
+            eigvals=pd.Series([7, 2], index=axis_labels),
+            samples=pd.DataFrame([[0, 0], [1, 0], [3, 1]],
+                                 index=['s1', 's2', 's3'],
+                                 columns=axis_labels),
+            proportion_explained=pd.Series([0.7, 0.3], index=axis_labels),
+        )
+        repo = PCoARepo({'some_sample_set': {'unifrac': ordination}})
+        obs = repo.k_nearest('some_sample_set', 'unifrac', ['s1', 's3'],
+                             k=2)
+        self.assertDictEqual({'s1': ['s2', 's3'], 's3': ['s2', 's1']}, obs)
+        self.assertIs(repo.neighbors('some_sample_set', 'unifrac'),
+                      repo.neighbors('some_sample_set', 'unifrac'))
+
+    def test_region_queries(self):
+        axis_labels = ['PC1', 'PC2']
+        ordination = OrdinationResults(
+            'pcoa', 'pcoa',
+            eigvals=pd.Series([7, 2], index=axis_labels),
+            samples=pd.DataFrame([[0, 0], [1, 0], [3, 1]],
+                                 index=['s1', 's2', 's3'],
+                                 columns=axis_labels),
+            proportion_explained=pd.Series([0.7, 0.3], index=axis_labels),
+        )
+        repo = PCoARepo({'some_sample_set': {'unifrac': ordination}})
+        obs = repo.samples_in_box('some_sample_set', 'unifrac', [0.5, -1],
+                                  [4, 2])
+        pd.testing.assert_frame_equal(
+            pd.DataFrame([[1., 0.], [3., 1.]], index=['s2', 's3'],
+                         columns=[0, 1]),
+            obs, check_index_type=False)
+
+        obs = repo.samples_in_radius('some_sample_set', 'unifrac', [0], 1.5,
+                                     axes=[0])
+        self.assertListEqual(['s1', 's2'], list(obs.index))
+        self.assertListEqual([0], list(obs.columns))
+
+        obs, distances = repo.closest_samples('some_sample_set', 'unifrac',
+                                              [2.5, 1], k=2)
+        self.assertListEqual(['s3', 's2'], list(obs.index))
+        self.assertAlmostEqual(0.5, distances[0])
@@ -14,6 +14,7 @@ from q2_types.ordination import PCoAResults
 
 from microsetta_public_api._logging import timeit
 from microsetta_public_api.models._taxonomy import Taxonomy as TaxonomyModel
+from microsetta_public_api.models._beta import NeighborTable
 
 
 @timeit('_dict_of_literals_to_dict')
@@ -203,9 +204,18 @@ def _validate_dict_of_paths(dict_of_paths, name, allow_none=False,
                              'extension. Got: {}'.format(exp_ext, value))
 
 
+class ResourceDict(dict):
+    """A dict of loaded resources, e.g., alpha diversity by metric
+
+    Unlike a dict, it can be weakly referenced, so values derived from the
+    resources can be cached for as long as they are served.
+    """
+    pass
+
+
 @timeit('_replace_paths_with_qza')
 def _replace_paths_with_qza(dict_of_qza_paths, semantic_type, view_type=None):
-    new_resource = dict()
+    new_resource = ResourceDict()
     for key, value in dict_of_qza_paths.items():
         new_resource[key] = _parse_q2_data(value,
                                            semantic_type,
@@ -228,11 +238,9 @@ def _load_q2_metadata(metadata_path, name):
 
 @timeit('_load_neighbors_tsv')
 def _load_neighbors_tsv(dict_of_paths, name):
-    new_resource = dict()
-    for key, value in dict_of_paths.items():
-        new_resource[key] = pd.read_csv(value, sep='\t',
-                                        dtype=str).set_index('sample_id')
-    return new_resource
+    # the metrics of a dataset are over the same samples, so their tables
+    #  share one vocabulary of sample IDs
+    return ResourceDict(NeighborTable.read_many(dict_of_paths))
 
 
 class ResourceManager(dict):
@@ -2,6 +2,7 @@ from microsetta_public_api.config import (
     ConfigElementVisitor,
     DictElement,
     SchemaBase,
+    SERVER_CONFIG,
 )
 from microsetta_public_api.resources import (
     _dict_of_paths_to_alpha_data,
@@ -15,6 +16,11 @@ from microsetta_public_api._io import (
     _dict_of_paths_to_beta_data,
 )
 from microsetta_public_api._logging import timeit
+from microsetta_public_api.utils._metadata import compact_metadata
+from microsetta_public_api.utils._ordination import compact_ordination
+from microsetta_public_api.repo._metadata_repo import MetadataRepo
+from microsetta_public_api.repo._alpha_repo import AlphaRepo
+from microsetta_public_api.repo._pcoa_repo import PCoARepo
 
 
 class Q2Visitor(ConfigElementVisitor):
@@ -28,6 +34,8 @@ class Q2Visitor(ConfigElementVisitor):
     def visit_alpha(self, element):
         element.data = _dict_of_paths_to_alpha_data(element,
                                                     self.schema.alpha_kw)
+        # warms the matrix used to look up several metrics at once
+        AlphaRepo(element.data).matrix
 
     @timeit('vist_taxonomy')
     def visit_taxonomy(self, element):
@@ -38,10 +46,28 @@ class Q2Visitor(ConfigElementVisitor):
     def visit_pcoa(self, element):
         element.data = _dict_of_dict_of_paths_to_pcoa(element,
                                                       self.schema.pcoa_kw)
+        pcoa_config = SERVER_CONFIG.get('pcoa', {})
+        if not pcoa_config.get('full', False):
+            # keeps the leading axes as float32, unless the full ordinations
+            #  are required
+            n_axes = pcoa_config.get('axes', 10)
+            for ordinations in element.data.values():
+                for metric, ordination in ordinations.items():
+                    ordinations[metric] = compact_ordination(ordination,
+                                                             n_axes=n_axes)
+        # indexes each ordination, which shares its coordinates. The
+        #  KD-trees used to find neighbors are built on first use
+        pcoa_repo = PCoARepo(element.data)
+        for sample_set, ordinations in element.data.items():
+            for metric in ordinations:
+                pcoa_repo.neighbors(sample_set, metric)
 
     @timeit('visit_metadata')
     def visit_metadata(self, element):
-        element.data = _load_q2_metadata(element, self.schema.metadata_kw)
+        element.data = compact_metadata(
+            _load_q2_metadata(element, self.schema.metadata_kw))
+        # warms the category index used for category values and statistics
+        MetadataRepo(element.data).index
 
     @timeit('visit_beta')
     def visit_beta(self, element):
@@ -5,10 +5,25 @@ from microsetta_public_api.config import (
     resources as config_resources,
     schema,
     DictElement,
+    LazyVisitor,
 )
 from microsetta_public_api.resources import resources
 from microsetta_public_api.resources_alt import resources_alt
 from microsetta_public_api.resources_alt import Q2Visitor
+from microsetta_public_api._loading import (
+    tracker,
+    resource_units,
+    TrackingVisitor,
+    IdleEvictor,
+)
+from microsetta_public_api._budget import MemoryBudget
+from microsetta_public_api._reload import ResourceReloader, unit_fingerprints
+from microsetta_public_api._watcher import ResourceWatcher
+from microsetta_public_api._compression import ResponseCompression
+from microsetta_public_api._metrics import metrics, RequestMetrics
+from microsetta_public_api._tracing import Tracer
+from microsetta_public_api._asgi import ASGIAdapter
+from microsetta_public_api._admission import AdmissionControl
 from microsetta_public_api.exceptions import (UnknownMetric,
                                               UnknownResource,
                                               UnknownID,
@@ -47,24 +62,60 @@ handle_404 = ErrorHandlerFactory.get_method(404)
 
 _pool = ThreadPoolExecutor()
 futures = set()
+reloader = ResourceReloader(resources_alt, schema, Q2Visitor, tracker,
+                            executor=_pool)
+
+
+def begin_update(resource):
+    """Registers the resources that an update will load as pending"""
+    return tracker.begin(resource_units(resource,
+                                        schema.element_map().values()))
 
 
-def atomic_update_resources(resource):
+def atomic_update_resources(resource, paths=None):
     # create a new element to store the data in
     element = DictElement()
     element.update(resource)
-    visitor = Q2Visitor()
-    element.accept(visitor)
-    # after data has been loaded by the q2 visitor, update resources_alt
-    #  so that it is accessible.
-    # Updating resources_alt from another element means the server will
-    #  not show the skeleton of any unloaded data to the client
-    resources_alt.update(element)
+    if paths is None:
+        paths = begin_update(element)
+    units = resource_units(element, schema.element_map().values())
+    # the fingerprints let later reloads skip resources that are unchanged
+    fingerprints = unit_fingerprints(units)
+    visitor = TrackingVisitor(Q2Visitor(), tracker, units)
+    if reloader.lazy_types or reloader.reloadable:
+        visitor = LazyVisitor(visitor, reloader.lazy_types,
+                              on_defer=visitor.defer,
+                              reloadable=reloader.reloadable)
+    published = False
+    try:
+        element.accept(visitor)
+        # after data has been loaded by the q2 visitor, update resources_alt
+        #  so that it is accessible.
+        # Updating resources_alt from another element means the server will
+        #  not show the skeleton of any unloaded data to the client
+        resources_alt.update(element)
+        published = True
+    finally:
+        tracker.end(paths, published)
+    reloader.record(fingerprints)
+
+
+def lazy_element_types(keys):
+    """Maps the resource keys configured to load lazily to element types"""
+    element_map = schema.element_map()
+    unknown = [key for key in keys if key not in element_map]
+    if unknown:
+        raise ValueError(f"Unknown lazy resource(s): {unknown}. Expected "
+                         f"one of {list(element_map)}.")
+    return [element_map[key] for key in keys]
 
 
 def build_app():
     app = connexion.FlaskApp(__name__)
     app.app.json_encoder = NumPySafeJSONEncoder
+    app.app.extensions['reloader'] = reloader
+
+    metrics.enabled = SERVER_CONFIG.get('metrics', {}).get('enabled', True)
 
     resource_config = SERVER_CONFIG.get('resources', {})
 
@@ -75,10 +126,47 @@ def build_app():
     resources.update(config_resources)
     resource = copy.deepcopy(config_resources)
     resource = schema.make_elements(resource)
-    load_data = _pool.submit(atomic_update_resources, resource)
+    tracker.estimate_memory = SERVER_CONFIG.get('health', {}).get(
+        'estimate_memory', True)
+    lazy_config = SERVER_CONFIG.get('lazy', {})
+    reloader.lazy_types = tuple(lazy_element_types(
+        lazy_config.get('resources', [])))
+    memory_config = SERVER_CONFIG.get('memory', {})
+    budget = memory_config.get('budget_bytes')
+    # resources must keep their loaders to be evicted under a budget
+    reloader.reloadable = budget is not None
+    # registered before submitting so that the server does not report
+    #  ready before the load has started
+    paths = begin_update(resource)
+    load_data = _pool.submit(atomic_update_resources, resource, paths)
     futures.add(load_data)
     load_data.add_done_callback(lambda fut: futures.remove(load_data))
 
+    if reloader.lazy_types and lazy_config.get('max_idle') is not None:
+        IdleEvictor(resources_alt, schema.element_map().values(), tracker,
+                    lazy_config['max_idle'],
+                    interval=lazy_config.get('interval', 60)).start()
+
+    if budget is not None:
+        memory_budget = MemoryBudget(resources_alt,
+                                     schema.element_map().values(), tracker,
+                                     budget,
+                                     interval=memory_config.get('interval',
+                                                                30),
+                                     min_idle=memory_config.get('min_idle',
+                                                                60))
+        app.app.extensions['memory_budget'] = memory_budget
+        load_data.add_done_callback(lambda fut: memory_budget.start())
+
+    watch_config = SERVER_CONFIG.get('watch', {})
+    if watch_config.get('enabled', False):
+        # a shallow copy, which is atomic, as a reload replaces the
+        #  top level values of the configuration once it has loaded
+        watcher = ResourceWatcher(reloader, lambda: dict(config_resources),
+                                  watch_config)
+        # changes are only diffed against resources that have loaded
+        load_data.add_done_callback(lambda fut: watcher.start())
+
     app_file = resource_filename('microsetta_public_api.api',
                                  'microsetta_public_api.yml')
 
@@ -95,10 +183,39 @@ def build_app():
     app.app.register_error_handler(InvalidParameter, handle_400)
 
     CORS(app.app)
+    Tracer(SERVER_CONFIG.get('tracing')).init_app(app.app)
+    # registered before compression so that the (reverse ordered)
+    # after_request hooks record the size of the compressed body
+    RequestMetrics().init_app(app.app)
+    ResponseCompression(SERVER_CONFIG.get('compression')).init_app(app.app)
+    # registered last so that the requests it rejects are still traced and
+    # recorded by the metrics
+    AdmissionControl(SERVER_CONFIG.get('admission')).init_app(app.app)
 
     return app
 
 
+def build_asgi_app(app=None):
+    """Builds the app to serve with an ASGI server
+
+    Parameters
+    ----------
+    app : connexion.FlaskApp, optional
+        The app to serve, defaults to `build_app()`.
+
+    Returns
+    -------
+    ASGIAdapter
+
+    """
+    if app is None:
+        app = build_app()
+    asgi_config = SERVER_CONFIG.get('asgi', {})
+    return ASGIAdapter(app.app, heavy=asgi_config.get('heavy'),
+                       heavy_workers=asgi_config.get('heavy_workers', 4),
+                       cheap_workers=asgi_config.get('cheap_workers', 32))
+
+
 def run(app):
     app.run(
         port=SERVER_CONFIG['port'],
@@ -0,0 +1,251 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from flask import Flask, jsonify
+from microsetta_public_api._admission import AdmissionControl, Limit
+from microsetta_public_api._metrics import metrics
+
+
+class LimitTests(TestCase):
+
+    def setUp(self):
+        self.limit = Limit('plots', r'/plotting/', 3, max_queue=1,
+                           queue_timeout=0.05)
+
+    def test_matches(self):
+        self.assertTrue(self.limit.matches(
+            '/results-api/dataset/16S/plotting/diversity/beta/unifrac/pcoa/'
+            'all/png'))
+        self.assertFalse(self.limit.matches('/results-api/available/dataset'))
+
+    def test_acquire_release(self):
+        self.assertIsNone(self.limit.acquire(2))
+        self.assertIsNone(self.limit.acquire(1))
+        self.assertEqual(3, self.limit.in_use)
+        self.assertEqual('timeout', self.limit.acquire(1))
+        self.limit.release(2)
+        self.assertIsNone(self.limit.acquire(2))
+        self.assertEqual(3, self.limit.in_use)
+
+    def test_costly_request_runs_alone(self):
+        self.assertIsNone(self.limit.acquire(100))
+        self.assertEqual(3, self.limit.in_use)
+        self.limit.release(100)
+        self.assertEqual(0, self.limit.in_use)
+
+    def test_queue_full(self):
+        limit = Limit('plots', r'/plotting/', 3, max_queue=1,
+                      queue_timeout=5)
+        limit.acquire(3)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            waiting = executor.submit(limit.acquire, 1)
+            while limit.waiting == 0:
+                time.sleep(0.01)
+            self.assertEqual('queue_full', limit.acquire(1))
+            limit.release(3)
+            self.assertIsNone(waiting.result(timeout=5))
+
+    def test_from_config(self):
+        limit = Limit.from_config({'name': 'group', 'pattern': '/group/',
+                                   'max_concurrent': 2, 'cost': 'sample_ids',
+                                   'samples_per_unit': 10})
+        self.assertEqual(2, limit.max_concurrent)
+        self.assertEqual(0, limit.max_queue)
+        with self.assertRaisesRegex(ValueError, 'Unknown admission cost'):
+            Limit.from_config({'name': 'group', 'pattern': '/group/',
+                               'cost': 'dne'})
+
+
+class AdmissionControlTests(TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.admission = AdmissionControl({
+            'enabled': True,
+            'retry_after': 2,
+            'limits': [
+                {'name': 'plotting', 'pattern': r'/plotting/',
+                 'max_concurrent': 1, 'max_queue': 1,
+                 'queue_timeout': 0.5},
+                {'name': 'group', 'pattern': r'/group$',
+                 'max_concurrent': 3, 'cost': 'sample_ids',
+                 'samples_per_unit': 10},
+            ],
+        })
+        self.admission.init_app(self.app)
+
+        @self.app.route('/plotting/slow')
+        def slow():
+            self.started.set()
+            self.release.wait(5)
+            return jsonify('slow')
+
+        @self.app.route('/group', methods=['POST'])
+        def group():
+            return jsonify('group')
+
+        @self.app.route('/cheap')
+        def cheap():
+            return jsonify('cheap')
+
+        metrics.clear()
+
+    def tearDown(self):
+        self.release.set()
+        metrics.clear()
+
+    def get(self, path):
+        return self.app.test_client().get(path)
+
+    def test_disabled_by_default(self):
+        app = Flask(__name__)
+        AdmissionControl().init_app(app)
+        self.assertEqual([], app.before_request_funcs.get(None, []))
+
+    def test_admitted(self):
+        response = self.app.test_client().post('/group',
+                                               json={'sample_ids': ['a']})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(0, self.admission.limits[1].in_use)
+
+    def test_overloaded(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            running = executor.submit(self.get, '/plotting/slow')
+            self.started.wait(5)
+            queued = executor.submit(self.get, '/plotting/slow')
+            while self.admission.limits[0].waiting == 0:
+                time.sleep(0.01)
+            # cheap endpoints are not limited
+            self.assertEqual(200, self.get('/cheap').status_code)
+            full = self.get('/plotting/slow')
+            self.assertEqual(429, full.status_code)
+            self.assertEqual('2', full.headers['Retry-After'])
+            self.assertEqual(429, full.json['code'])
+            timed_out = queued.result(timeout=5)
+            self.assertEqual(503, timed_out.status_code)
+            self.assertEqual('2', timed_out.headers['Retry-After'])
+            self.release.set()
+            self.assertEqual(200, running.result(timeout=5).status_code)
+        self.assertEqual(0, self.admission.limits[0].in_use)
+        self.assertEqual(1, metrics.admission_rejections.get('plotting',
+                                                             'queue_full'))
+        self.assertEqual(1, metrics.admission_rejections.get('plotting',
+                                                             'timeout'))
+
+    def test_released_on_error(self):
+        @self.app.route('/plotting/error')
+        def error():
+            raise ValueError('failed')
+
+        self.app.test_client().get('/plotting/error')
+        self.assertEqual(0, self.admission.limits[0].in_use)
+
+    def test_sample_ids_cost(self):
+        group = self.admission.limits[1]
+        costs = []
+        acquire = group.acquire
+
+        def record(cost, **kwargs):
+            costs.append(cost)
+            return acquire(cost, **kwargs)
+
+        group.acquire = record
+        client = self.app.test_client()
+        client.post('/group', json={'sample_ids': ['a'] * 25})
+        client.post('/group', json={'sample_ids': ['a'] * 5})
+        client.post('/group', json=['a'])
+        self.assertListEqual([3, 1, 1], costs)
+
+
+class WaitingTests(TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+
+        def slow():
+            self.started.release()
+            self.release.wait(5)
+            return jsonify('slow')
+
+        self.app.add_url_rule('/plotting/slow', 'plotting', slow)
+        self.app.add_url_rule('/empress/slow', 'empress', slow)
+
+        @self.app.route('/cheap')
+        def cheap():
+            return jsonify('cheap')
+
+        metrics.clear()
+
+    def tearDown(self):
+        self.release.set()
+        metrics.clear()
+
+    def admission(self, max_waiting):
+        admission = AdmissionControl({
+            'enabled': True,
+            'max_waiting': max_waiting,
+            'limits': [
+                {'name': name, 'pattern': f'/{name}/', 'max_concurrent': 1,
+                 'max_queue': 1, 'queue_timeout': 5}
+                for name in ['plotting', 'empress']
+            ],
+        })
+        admission.init_app(self.app)
+        return admission
+
+    def get(self, path):
+        return self.app.test_client().get(path)
+
+    def fill(self, executor, paths):
+        running = [executor.submit(self.get, path) for path in paths]
+        for _ in paths:
+            self.assertTrue(self.started.acquire(timeout=5))
+        return running
+
+    def wait_for_waiting(self, admission, n):
+        while sum(limit.waiting for limit in admission.limits) < n:
+            time.sleep(0.01)
+
+    def test_cheap_requests_while_queues_full(self):
+        admission = self.admission(max_waiting=2)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            running = self.fill(executor,
+                                ['/plotting/slow', '/empress/slow'])
+            queued = [executor.submit(self.get, path)
+                      for path in ['/plotting/slow', '/empress/slow']]
+            self.wait_for_waiting(admission, 2)
+            self.assertEqual(200, self.get('/cheap').status_code)
+            self.assertEqual(429, self.get('/plotting/slow').status_code)
+            self.assertEqual(429, self.get('/empress/slow').status_code)
+            self.release.set()
+            for future in running + queued:
+                self.assertEqual(200, future.result(timeout=5).status_code)
+
+    def test_waiting_bounded_across_limits(self):
+        admission = self.admission(max_waiting=1)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            running = self.fill(executor,
+                                ['/plotting/slow', '/empress/slow'])
+            queued = executor.submit(self.get, '/plotting/slow')
+            self.wait_for_waiting(admission, 1)
+            # the empress queue is empty, but no more requests can wait
+            self.assertEqual(429, self.get('/empress/slow').status_code)
+            self.assertEqual(0, admission.limits[1].waiting)
+            self.release.set()
+            for future in running + [queued]:
+                self.assertEqual(200, future.result(timeout=5).status_code)
+        self.assertEqual(1, metrics.admission_rejections.get('empress',
+                                                             'queue_full'))
+
+    def test_no_waiting(self):
+        self.admission(max_waiting=0)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            running, = self.fill(executor, ['/plotting/slow'])
+            self.assertEqual(429, self.get('/plotting/slow').status_code)
+            self.release.set()
+            self.assertEqual(200, running.result(timeout=5).status_code)
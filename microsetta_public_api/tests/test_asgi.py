@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+from unittest import TestCase
+from flask import Flask, Response, jsonify, request
+from microsetta_public_api._asgi import ASGIAdapter
+
+
+def _scope(path, method='GET', query_string=b'', headers=()):
+    return {'type': 'http', 'method': method, 'path': path,
+            'root_path': '', 'query_string': query_string,
+            'headers': list(headers), 'http_version': '1.1',
+            'scheme': 'http', 'server': ('testserver', 80),
+            'client': ('127.0.0.1', 5000)}
+
+
+async def _request(adapter, scope, body=b''):
+    chunks = body if isinstance(body, list) else [body]
+    messages = [{'type': 'http.request', 'body': chunk,
+                 'more_body': i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await adapter(scope, receive, send)
+    start, *body = sent
+    content = b''.join(message.get('body', b'') for message in body)
+    return start['status'], dict(start['headers']), content
+
+
+class ASGIAdapterTests(TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.closed = threading.Event()
+
+        @self.app.route('/cheap')
+        def cheap():
+            return jsonify(name=request.args.get('name'),
+                           agent=request.headers.get('User-Agent'))
+
+        @self.app.route('/echo', methods=['POST'])
+        def echo():
+            return jsonify(request.get_json())
+
+        @self.app.route('/thread')
+        @self.app.route('/plotting/thread')
+        def thread():
+            return jsonify(threading.current_thread().name)
+
+        @self.app.route('/stream')
+        def stream():
+            def generate():
+                try:
+                    yield 'a'
+                    yield ''
+                    yield 'b'
+                finally:
+                    self.closed.set()
+            return Response(generate(), mimetype='text/plain')
+
+        @self.app.route('/plotting/heavy')
+        def heavy():
+            self.started.set()
+            self.release.wait(5)
+            return jsonify('heavy')
+
+        self.adapter = ASGIAdapter(self.app, heavy_workers=1,
+                                   cheap_workers=2)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.release.set()
+        self.adapter.shutdown()
+        self.loop.close()
+
+    def run_request(self, *args, **kwargs):
+        return self.loop.run_until_complete(
+            _request(self.adapter, *args, **kwargs))
+
+    def test_get(self):
+        status, headers, body = self.run_request(_scope(
+            '/cheap', query_string=b'name=abc',
+            headers=[(b'user-agent', b'tests')]))
+        self.assertEqual(200, status)
+        self.assertEqual(b'application/json', headers[b'content-type'])
+        self.assertDictEqual({'name': 'abc', 'agent': 'tests'},
+                             json.loads(body))
+
+    def test_post(self):
+        status, _, body = self.run_request(
+            _scope('/echo', method='POST',
+                   headers=[(b'content-type', b'application/json')]),
+            body=b'{"a": [1, 2]}')
+        self.assertEqual(200, status)
+        self.assertDictEqual({'a': [1, 2]}, json.loads(body))
+
+    def test_post_chunked(self):
+        status, _, body = self.run_request(
+            _scope('/echo', method='POST',
+                   headers=[(b'content-type', b'application/json'),
+                            (b'transfer-encoding', b'chunked')]),
+            body=[b'{"a": ', b'[1, 2]}'])
+        self.assertEqual(200, status)
+        self.assertDictEqual({'a': [1, 2]}, json.loads(body))
+
+    def test_pools(self):
+        _, _, body = self.run_request(_scope('/plotting/thread'))
+        self.assertTrue(json.loads(body).startswith('asgi-heavy'))
+        _, _, body = self.run_request(_scope('/thread'))
+        self.assertTrue(json.loads(body).startswith('asgi-cheap'))
+
+    def test_not_found(self):
+        status, _, _ = self.run_request(_scope('/dne'))
+        self.assertEqual(404, status)
+
+    def test_is_heavy(self):
+        self.assertTrue(self.adapter.is_heavy(
+            '/results-api/dataset/16S/plotting/diversity/beta/unifrac/pcoa/'
+            'all/png'))
+        self.assertTrue(self.adapter.is_heavy(
+            '/results-api/dataset/16S/taxonomy/present/group/genus'))
+        self.assertTrue(self.adapter.is_heavy(
+            '/results-api/dataset/16S/batch'))
+        self.assertFalse(self.adapter.is_heavy(
+            '/results-api/dataset/16S/diversity/alpha/exists/shannon'))
+        self.assertFalse(self.adapter.is_heavy(
+            '/results-api/available/dataset'))
+
+    def test_configured_heavy(self):
+        adapter = ASGIAdapter(self.app, heavy=[r'/cheap$'])
+        self.assertTrue(adapter.is_heavy('/cheap'))
+        self.assertFalse(adapter.is_heavy('/plotting/heavy'))
+        adapter.shutdown()
+
+    def test_duplicate_headers_joined(self):
+        _, _, body = self.run_request(_scope(
+            '/cheap', headers=[(b'user-agent', b'a'), (b'user-agent', b'b')]))
+        self.assertEqual('a,b', json.loads(body)['agent'])
+
+    def test_streamed(self):
+        status, headers, body = self.run_request(_scope('/stream'))
+        self.assertEqual(200, status)
+        self.assertTrue(headers[b'content-type'].startswith(b'text/plain'))
+        self.assertEqual(b'ab', body)
+        # the response is closed once sent
+        self.assertTrue(self.closed.is_set())
+
+    def test_disconnected(self):
+        sent = []
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        self.loop.run_until_complete(
+            self.adapter(_scope('/echo', method='POST'), receive, send))
+        self.assertListEqual([], sent)
+
+    def test_cheap_requests_do_not_wait_for_heavy(self):
+        async def scenario():
+            heavy = asyncio.ensure_future(
+                _request(self.adapter, _scope('/plotting/heavy')))
+            await self.loop.run_in_executor(None, self.started.wait, 5)
+            # the only heavy worker is busy, cheap requests still complete
+            cheap = await asyncio.gather(*[
+                _request(self.adapter, _scope('/cheap'))
+                for _ in range(4)])
+            self.assertFalse(heavy.done())
+            self.release.set()
+            return cheap, await heavy
+
+        cheap, heavy = self.loop.run_until_complete(scenario())
+        self.assertListEqual([200] * 4, [status for status, _, _ in cheap])
+        self.assertEqual(b'"heavy"\n', heavy[2])
+
+    def test_lifespan(self):
+        messages = [{'type': 'lifespan.startup'},
+                    {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        self.loop.run_until_complete(
+            self.adapter({'type': 'lifespan'}, receive, send))
+        self.assertListEqual(['lifespan.startup.complete',
+                              'lifespan.shutdown.complete'], sent)
@@ -0,0 +1,100 @@
+from unittest import TestCase
+import numpy as np
+from microsetta_public_api.config import (
+    SchemaBase,
+    AlphaElement,
+    DictElement,
+    LazyVisitor,
+)
+from microsetta_public_api._budget import MemoryBudget
+from microsetta_public_api._loading import (
+    LoadTracker,
+    TrackingVisitor,
+    resource_units,
+)
+
+
+class ArrayVisitor:
+    """Loads an array with as many bytes as the configured value"""
+    def visit(self, element):
+        element.data = {key: np.zeros(int(value) // 8, dtype=np.float64)
+                        for key, value in element.items()}
+
+    visit_alpha = visit
+    visit_beta = visit
+
+
+class MemoryBudgetTests(TestCase):
+
+    def setUp(self):
+        self.element_types = SchemaBase().element_map().values()
+        self.resource = SchemaBase().make_elements({'datasets': {
+            '16S': {'__alpha__': {'faith_pd': 8000},
+                    '__beta__': {'unifrac': 80000}},
+            'WGS': {'__alpha__': {'faith_pd': 16000}},
+        }})
+        self.tracker = LoadTracker()
+        units = resource_units(self.resource, self.element_types)
+        paths = self.tracker.begin(units)
+        tracking = TrackingVisitor(ArrayVisitor(), self.tracker, units)
+        self.resource.accept(LazyVisitor(tracking, [], reloadable=True))
+        self.tracker.end(paths, True)
+
+    def get(self, *path):
+        return self.resource.gets('datasets', *path)
+
+    def test_sizes(self):
+        budget = MemoryBudget(self.resource, self.element_types,
+                              self.tracker, budget=10 ** 6)
+        sizes = {path: nbytes for path, _, nbytes in budget.sizes()}
+        self.assertEqual(3, len(sizes))
+        self.assertGreater(sizes[('datasets', '16S', '__beta__')], 80000)
+        summary = budget.summary()
+        self.assertEqual(sum(sizes.values()), summary['loaded_bytes'])
+        self.assertListEqual([], budget.enforce())
+
+    def test_evicts_least_recently_used(self):
+        # used in order: 16S beta, WGS alpha, 16S alpha
+        self.get('16S', '__beta__').data
+        self.get('WGS', '__alpha__').data
+        self.get('16S', '__alpha__').data
+        budget = MemoryBudget(self.resource, self.element_types,
+                              self.tracker, budget=50000, min_idle=0)
+        self.assertListEqual([('datasets', '16S', '__beta__')],
+                             budget.enforce())
+        self.assertFalse(self.get('16S', '__beta__').loaded)
+        self.assertTrue(self.get('WGS', '__alpha__').loaded)
+        self.assertEqual(1, budget.summary()['evictions'])
+        states = {unit['resource']: unit['state'] for unit in
+                  self.tracker.summary()['resources']}
+        self.assertEqual('deferred', states['datasets/16S/__beta__'])
+
+        # evicted resources are loaded again on use
+        self.assertEqual(10000,
+                         len(self.get('16S', '__beta__').data['unifrac']))
+
+    def test_evicts_until_within_budget(self):
+        self.get('16S', '__alpha__').data
+        budget = MemoryBudget(self.resource, self.element_types,
+                              self.tracker, budget=10000, min_idle=0)
+        self.assertEqual(2, len(budget.enforce()))
+        self.assertLessEqual(budget.summary()['loaded_bytes'], 10000)
+
+    def test_recently_used_not_evicted(self):
+        self.get('16S', '__beta__').data
+        budget = MemoryBudget(self.resource, self.element_types,
+                              self.tracker, budget=0, min_idle=3600)
+        with self.assertLogs('microsetta_public_api._budget', 'WARNING'):
+            self.assertListEqual([], budget.enforce())
+        self.assertTrue(self.get('16S', '__beta__').loaded)
+        self.assertEqual(0, budget.summary()['evictions'])
+
+    def test_unreloadable_not_evicted(self):
+        element = AlphaElement({'faith_pd': 8000})
+        element.accept(ArrayVisitor())
+        self.resource['datasets']['ITS'] = DictElement({'__alpha__': element})
+        budget = MemoryBudget(self.resource['datasets']['ITS'],
+                              self.element_types, self.tracker, budget=0)
+        with self.assertLogs('microsetta_public_api._budget', 'WARNING'):
+            self.assertListEqual([], budget.enforce())
+        self.assertTrue(element.loaded)
@@ -0,0 +1,111 @@
+import gzip
+import json
+from unittest import TestCase
+from flask import Flask, jsonify, Response, request
+from microsetta_public_api._compression import (
+    ResponseCompression,
+    CompressedBodyCache,
+)
+
+
+class ResponseCompressionTests(TestCase):
+
+    def setUp(self):
+        self.payload = {'values': list(range(2000))}
+        self.app = Flask(__name__)
+        self.compression = ResponseCompression({'min_size': 100,
+                                                'encodings': ['gzip'],
+                                                })
+        self.compression.init_app(self.app)
+
+        @self.app.route('/big')
+        def big():
+            return jsonify(self.payload)
+
+        @self.app.route('/small')
+        def small():
+            return jsonify([1])
+
+        @self.app.route('/png')
+        def png():
+            return Response(b'\x89PNG' * 1000, mimetype='image/png')
+
+        @self.app.route('/post', methods=['POST'])
+        def post():
+            return jsonify(self.payload)
+
+        self.client = self.app.test_client()
+
+    def test_gzip_negotiated(self):
+        response = self.client.get('/big',
+                                   headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('gzip', response.headers['Content-Encoding'])
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        obs = json.loads(gzip.decompress(response.data))
+        self.assertDictEqual(self.payload, obs)
+
+    def test_no_accept_encoding(self):
+        response = self.client.get('/big', headers={'Accept-Encoding': ''})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertDictEqual(self.payload, json.loads(response.data))
+
+    def test_encoding_refused(self):
+        response = self.client.get(
+            '/big', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_below_threshold(self):
+        response = self.client.get('/small',
+                                   headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertListEqual([1], json.loads(response.data))
+
+    def test_incompressible_mimetype(self):
+        response = self.client.get('/png',
+                                   headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_compressed_payload_is_cached(self):
+        for _ in range(3):
+            self.client.get('/big', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(1, len(self.compression.cache))
+        self.assertEqual(1, self.compression.cache.misses)
+        self.assertEqual(2, self.compression.cache.hits)
+
+    def test_post_not_cached(self):
+        response = self.client.post('/post',
+                                    headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual('gzip', response.headers['Content-Encoding'])
+        self.assertEqual(0, len(self.compression.cache))
+
+    def test_select_encoding_prefers_client_quality(self):
+        compression = ResponseCompression()
+        with self.app.test_request_context(
+                headers={'Accept-Encoding': 'gzip;q=1.0, br;q=0.5'}):
+            obs = compression.select_encoding(request.accept_encodings)
+        self.assertEqual('gzip', obs)
+
+    def test_disabled(self):
+        app = Flask(__name__)
+        ResponseCompression({'enabled': False}).init_app(app)
+        self.assertEqual(0, len(app.after_request_funcs.get(None, [])))
+
+
+class CompressedBodyCacheTests(TestCase):
+
+    def test_eviction(self):
+        cache = CompressedBodyCache(10)
+        cache.put('a', b'12345')
+        cache.put('b', b'12345')
+        self.assertEqual(b'12345', cache.get('a'))
+        cache.put('c', b'12345')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(b'12345', cache.get('a'))
+        self.assertEqual(b'12345', cache.get('c'))
+        self.assertEqual(10, cache.size)
+
+    def test_oversized_entry_ignored(self):
+        cache = CompressedBodyCache(4)
+        cache.put('a', b'12345')
+        self.assertEqual(0, len(cache))
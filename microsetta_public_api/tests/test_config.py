@@ -1,7 +1,10 @@
 from unittest import TestCase
 from unittest.mock import MagicMock
 import json
+import sys
 import copy
+import threading
+import time
 from jsonschema.exceptions import ValidationError
 from microsetta_public_api.config import (
     Element,
@@ -17,6 +20,7 @@ from microsetta_public_api.config import (
     SchemaBase,
     Schema,
     CompatibilitySchema,
+    LazyVisitor,
 )
 
 
@@ -471,3 +475,97 @@ class TestVisiting(TestCase):
                              {'a': 'b',
                               'c': 'cookie'}
                              )
+
+
+class CountingVisitor:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = []
+
+    def visit_alpha(self, element):
+        self.calls.append('alpha')
+        element.data = {'faith_pd': 'alpha data'}
+
+    def visit_beta(self, element):
+        self.calls.append('beta')
+        time.sleep(self.delay)
+        element.data = {'unifrac': 'beta data'}
+
+
+class LazyElementTests(TestCase):
+
+    def setUp(self):
+        self.element = SchemaBase().make_elements({
+            '__alpha__': {'faith_pd': '/path/to/faith.qza'},
+            '__beta__': {'unifrac': '/path/to/unifrac.qza'},
+        })
+        self.visitor = CountingVisitor()
+        self.deferred = []
+        self.element.accept(LazyVisitor(self.visitor, [BetaElement],
+                                        on_defer=self.deferred.append))
+
+    def test_deferred_until_access(self):
+        beta = self.element.gets('__beta__')
+        self.assertListEqual(['alpha'], self.visitor.calls)
+        self.assertListEqual([beta], self.deferred)
+        self.assertFalse(beta.loaded)
+        self.assertTrue(self.element.gets('__alpha__').loaded)
+
+        self.assertDictEqual({'unifrac': 'beta data'}, beta.data)
+        self.assertDictEqual({'unifrac': 'beta data'}, beta.data)
+        self.assertListEqual(['alpha', 'beta'], self.visitor.calls)
+
+    def test_concurrent_access_loads_once(self):
+        self.visitor.delay = 0.05
+        beta = self.element.gets('__beta__')
+        threads = [threading.Thread(target=lambda: beta.data)
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual(['alpha', 'beta'], self.visitor.calls)
+
+    def test_evict(self):
+        beta = self.element.gets('__beta__')
+        self.assertFalse(beta.evict())
+        beta.data
+        self.assertFalse(beta.evict(max_idle=60))
+        self.assertTrue(beta.evict(max_idle=0))
+        self.assertFalse(beta.loaded)
+        self.assertDictEqual({'unifrac': 'beta data'}, beta.data)
+        self.assertListEqual(['alpha', 'beta', 'beta'], self.visitor.calls)
+
+    def test_evict_while_reading(self):
+        beta = self.element.gets('__beta__')
+        stop = threading.Event()
+        read = []
+
+        def reader():
+            while not stop.is_set():
+                read.append(beta.data)
+
+        def evictor():
+            while not stop.is_set():
+                beta.evict()
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        threads.append(threading.Thread(target=evictor))
+        # switches threads often, so that evictions interleave with reads
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            time.sleep(0.5)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertGreater(self.visitor.calls.count('beta'), 1)
+        self.assertNotIn(None, read)
+
+    def test_eager_elements_not_evicted(self):
+        self.assertFalse(self.element.gets('__alpha__').evict())
+        self.assertTrue(self.element.gets('__alpha__').loaded)
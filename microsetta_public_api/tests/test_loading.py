@@ -0,0 +1,150 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+from microsetta_public_api.config import (
+    DictElement,
+    AlphaElement,
+    MetadataElement,
+    SchemaBase,
+    LazyVisitor,
+)
+from microsetta_public_api._loading import (
+    LoadTracker,
+    TrackingVisitor,
+    IdleEvictor,
+    resource_units,
+)
+from microsetta_public_api.utils._memory import estimate_size
+
+
+class FakeVisitor:
+    def visit_alpha(self, element):
+        element.data = pd.Series([1., 2., 3.])
+
+    def visit_metadata(self, element):
+        raise ValueError('bad metadata')
+
+
+class LoadTrackerTests(TestCase):
+
+    def setUp(self):
+        self.element_types = SchemaBase().element_map().values()
+        self.resource = DictElement({
+            'datasets': DictElement({
+                '16S': DictElement({
+                    '__alpha__': AlphaElement({'faith_pd': 'a.qza'}),
+                }),
+                'WGS': DictElement({
+                    '__metadata__': MetadataElement('m.txt'),
+                }),
+            }),
+        })
+        self.tracker = LoadTracker()
+
+    def test_resource_units(self):
+        obs = resource_units(self.resource, self.element_types)
+        self.assertCountEqual([('datasets', '16S', '__alpha__'),
+                               ('datasets', 'WGS', '__metadata__')],
+                              [path for path, _ in obs])
+
+    def test_not_started(self):
+        obs = self.tracker.summary()
+        self.assertEqual('not_started', obs['status'])
+        self.assertFalse(obs['ready'])
+        self.assertFalse(self.tracker.ready)
+
+    def test_pending(self):
+        units = resource_units(self.resource, self.element_types)
+        self.tracker.begin(units)
+        obs = self.tracker.summary()
+        self.assertEqual('loading', obs['status'])
+        self.assertFalse(obs['ready'])
+        self.assertEqual(2, obs['counts']['pending'])
+
+    def test_load(self):
+        units = resource_units(self.resource['datasets']['16S'],
+                               self.element_types)
+        paths = self.tracker.begin(units)
+        visitor = TrackingVisitor(FakeVisitor(), self.tracker, units)
+        self.resource['datasets']['16S'].accept(visitor)
+        self.assertFalse(self.tracker.ready)
+        self.tracker.end(paths, True)
+
+        self.assertTrue(self.tracker.ready)
+        obs = self.tracker.summary()
+        self.assertEqual('loaded', obs['status'])
+        unit, = obs['resources']
+        self.assertEqual('__alpha__', unit['resource'])
+        self.assertEqual('loaded', unit['state'])
+        self.assertGreaterEqual(unit['duration_s'], 0)
+        self.assertGreater(unit['nbytes'], 0)
+        self.assertEqual(unit['nbytes'], obs['nbytes'])
+
+    def test_failure(self):
+        units = resource_units(self.resource, self.element_types)
+        paths = self.tracker.begin(units)
+        visitor = TrackingVisitor(FakeVisitor(), self.tracker, units)
+        with self.assertRaisesRegex(ValueError, 'bad metadata'):
+            self.resource['datasets']['WGS'].accept(visitor)
+        self.tracker.end(paths, False)
+
+        obs = self.tracker.summary()
+        self.assertEqual('failed', obs['status'])
+        self.assertFalse(obs['ready'])
+        states = {unit['resource']: unit for unit in obs['resources']}
+        self.assertEqual('failed',
+                         states['datasets/WGS/__metadata__']['state'])
+        self.assertEqual('ValueError: bad metadata',
+                         states['datasets/WGS/__metadata__']['error'])
+        self.assertEqual('pending',
+                         states['datasets/16S/__alpha__']['state'])
+
+    def test_reload_stays_ready(self):
+        units = resource_units(self.resource, self.element_types)
+        self.tracker.end(self.tracker.begin(units), True)
+        self.tracker.begin(units)
+        self.assertTrue(self.tracker.ready)
+        self.assertEqual('loading', self.tracker.summary()['status'])
+
+    def test_lazy_load(self):
+        units = resource_units(self.resource['datasets']['16S'],
+                               self.element_types)
+        self.tracker.end(self.tracker.begin(units), True)
+        tracking = TrackingVisitor(FakeVisitor(), self.tracker, units)
+        alpha = self.resource['datasets']['16S']['__alpha__']
+        alpha.accept(LazyVisitor(tracking, [AlphaElement],
+                                 on_defer=tracking.defer))
+        obs = self.tracker.summary()
+        self.assertTrue(obs['ready'])
+        self.assertEqual('deferred', obs['resources'][0]['state'])
+
+        alpha.data
+        self.assertEqual('loaded',
+                         self.tracker.summary()['resources'][0]['state'])
+
+        evictor = IdleEvictor(self.resource['datasets']['16S'],
+                              self.element_types, self.tracker, max_idle=0)
+        self.assertListEqual([('__alpha__',)], evictor.evict())
+        self.assertFalse(alpha.loaded)
+        self.assertEqual('deferred',
+                         self.tracker.summary()['resources'][0]['state'])
+
+
+class EstimateSizeTests(TestCase):
+
+    def test_array(self):
+        self.assertEqual(800, estimate_size(np.zeros(100)))
+
+    def test_shared_references_counted_once(self):
+        df = pd.DataFrame({'a': np.arange(1000)})
+        single = estimate_size({'x': df})
+        double = estimate_size({'x': df, 'y': df})
+        self.assertGreater(single, df['a'].values.nbytes)
+        self.assertLess(double - single, 100)
+
+    def test_object_attributes(self):
+        class Model:
+            def __init__(self):
+                self.values = np.zeros(100)
+
+        self.assertGreater(estimate_size(Model()), 800)
@@ -0,0 +1,137 @@
+from unittest import TestCase
+from flask import Flask, jsonify
+from microsetta_public_api._metrics import (
+    MetricsRegistry,
+    RequestMetrics,
+    Counter,
+    Histogram,
+    metrics,
+    timeit,
+)
+
+
+class HistogramTests(TestCase):
+
+    def test_observe(self):
+        hist = Histogram('latency', 'help', ['fn'], buckets=(1, 5))
+        hist.observe(0.5, 'a')
+        hist.observe(1, 'a')
+        hist.observe(3, 'a')
+        hist.observe(10, 'a')
+        obs = hist.get('a')
+        self.assertEqual(4, obs['count'])
+        self.assertAlmostEqual(14.5, obs['sum'])
+        self.assertListEqual([(1, 2), (5, 3), (float('inf'), 4)],
+                             obs['buckets'])
+
+    def test_observe_wrong_labels(self):
+        hist = Histogram('latency', 'help', ['fn'])
+        with self.assertRaises(ValueError):
+            hist.observe(1)
+
+    def test_render(self):
+        hist = Histogram('latency', 'help', ['fn'], buckets=(1,))
+        hist.observe(0.5, 'a"b')
+        exp = ['# HELP latency help',
+               '# TYPE latency histogram',
+               'latency_bucket{fn="a\\"b",le="1"} 1',
+               'latency_bucket{fn="a\\"b",le="+Inf"} 1',
+               'latency_sum{fn="a\\"b"} 0.5',
+               'latency_count{fn="a\\"b"} 1',
+               ]
+        self.assertListEqual(exp, hist.render())
+
+
+class CounterTests(TestCase):
+
+    def test_inc_and_render(self):
+        counter = Counter('calls', 'help', ['fn'])
+        counter.inc('a')
+        counter.inc('a', amount=2)
+        self.assertEqual(3, counter.get('a'))
+        self.assertEqual(0, counter.get('b'))
+        self.assertListEqual(['# HELP calls help', '# TYPE calls counter',
+                              'calls{fn="a"} 3'],
+                             counter.render())
+
+
+class TimeitTests(TestCase):
+
+    def setUp(self):
+        self.enabled = metrics.enabled
+        metrics.enabled = True
+        metrics.clear()
+
+    def tearDown(self):
+        metrics.enabled = self.enabled
+        metrics.clear()
+
+    def test_timeit_records_calls(self):
+        @timeit('foo')
+        def foo(x):
+            return x + 1
+
+        self.assertEqual(2, foo(1))
+        self.assertEqual(3, foo(2))
+        self.assertEqual(2, metrics.function_duration.get('foo')['count'])
+        self.assertEqual(0, metrics.function_errors.get('foo'))
+
+    def test_timeit_records_errors(self):
+        @timeit('bar')
+        def bar():
+            raise KeyError('bar')
+
+        with self.assertRaises(KeyError):
+            bar()
+        self.assertEqual(1, metrics.function_errors.get('bar'))
+        self.assertEqual(1, metrics.function_duration.get('bar')['count'])
+
+    def test_timeit_disabled(self):
+        metrics.enabled = False
+
+        @timeit('baz')
+        def baz():
+            return 'baz'
+
+        self.assertEqual('baz', baz())
+        self.assertEqual(0, metrics.function_duration.get('baz')['count'])
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.app = Flask(__name__)
+        RequestMetrics(self.registry).init_app(self.app)
+
+        @self.app.route('/item/<name>')
+        def item(name):
+            return jsonify(name=name)
+
+        self.client = self.app.test_client()
+
+    def test_request_recorded_by_rule(self):
+        self.client.get('/item/foo')
+        self.client.get('/item/bar')
+        self.client.get('/dne')
+        self.assertEqual(2, self.registry.requests.get('GET', '/item/<name>',
+                                                       '200'))
+        self.assertEqual(1, self.registry.requests.get('GET', 'unmatched',
+                                                       '404'))
+        duration = self.registry.request_duration.get('GET', '/item/<name>')
+        self.assertEqual(2, duration['count'])
+        size = self.registry.response_size.get('GET', '/item/<name>')
+        self.assertEqual(2, size['count'])
+
+    def test_render_exposition(self):
+        self.client.get('/item/foo')
+        obs = self.registry.render()
+        self.assertIn('# TYPE mpubapi_request_duration_seconds histogram',
+                      obs)
+        self.assertIn('mpubapi_requests_total{method="GET",'
+                      'endpoint="/item/<name>",status="200"} 1', obs)
+
+    def test_disabled_registers_no_hooks(self):
+        app = Flask(__name__)
+        RequestMetrics(MetricsRegistry(enabled=False)).init_app(app)
+        self.assertEqual(0, len(app.before_request_funcs.get(None, [])))
@@ -0,0 +1,56 @@
+import threading
+from collections import Counter
+from unittest import TestCase
+from microsetta_public_api._profiler import (
+    StackSampler,
+    ProfilerBusy,
+)
+
+
+def _spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class StackSamplerTests(TestCase):
+
+    def setUp(self):
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=_spin, args=(self.stop,),
+                                       name='spinner')
+        self.thread.start()
+
+    def tearDown(self):
+        self.stop.set()
+        self.thread.join()
+
+    def test_profile(self):
+        counts = StackSampler().profile(0.2, interval=0.005)
+        spinner = [stack for stack in counts if stack[0] == 'spinner']
+        self.assertTrue(spinner)
+        self.assertTrue(any(frame.startswith('_spin (test_profiler.py')
+                            for frame in spinner[0]))
+
+    def test_collapse(self):
+        counts = {('main', 'a (x.py:1)', 'b (x.py:5)'): 3,
+                  ('main', 'a (x.py:1)'): 1}
+        obs = StackSampler.collapse(Counter(counts))
+        exp = 'main;a (x.py:1);b (x.py:5) 3\nmain;a (x.py:1) 1\n'
+        self.assertEqual(exp, obs)
+
+    def test_busy(self):
+        sampler = StackSampler()
+        errors = []
+
+        def run():
+            try:
+                sampler.profile(0.1)
+            except ProfilerBusy as e:
+                errors.append(e)
+
+        other = threading.Thread(target=run)
+        with sampler._lock:
+            other.start()
+            other.join()
+        self.assertEqual(1, len(errors))
+        self.assertFalse(sampler.busy)
@@ -0,0 +1,196 @@
+import os
+import tempfile
+from unittest import TestCase
+from microsetta_public_api.config import (
+    DictElement,
+    AlphaElement,
+    SchemaBase,
+)
+from microsetta_public_api._loading import LoadTracker, resource_units
+from microsetta_public_api._reload import (
+    ResourceReloader,
+    fingerprint,
+    unit_fingerprints,
+)
+
+
+class FileVisitor:
+    """Loads the contents of the files named in alpha and metadata elements
+    """
+    def __init__(self):
+        self.loaded = []
+
+    def visit_alpha(self, element):
+        self.loaded.extend(element.keys())
+        element.data = dict()
+        for key, path in element.items():
+            with open(path) as fp:
+                element.data[key] = fp.read()
+
+    def visit_metadata(self, element):
+        self.loaded.append(str(element))
+        with open(element) as fp:
+            element.data = fp.read()
+
+
+class ResourceReloaderTests(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.files = dict()
+        for name in ['faith', 'shannon', 'chao1', 'md1', 'md2']:
+            self.write(name, name)
+        self.config = {
+            'datasets': {
+                '16S': {
+                    '__alpha__': {'faith_pd': self.files['faith'],
+                                  'shannon': self.files['shannon']},
+                    '__metadata__': self.files['md1'],
+                },
+                'WGS': {
+                    '__metadata__': self.files['md2'],
+                },
+            },
+        }
+        self.schema = SchemaBase()
+        self.tracker = LoadTracker(estimate_memory=False)
+        self.visitor = FileVisitor()
+        self.root = DictElement()
+        self.reloader = ResourceReloader(self.root, self.schema,
+                                         lambda: self.visitor, self.tracker)
+        self.reloader.reload(self.reloader.plan(self.config))
+        self.visitor.loaded = []
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.dir.name, name + '.txt')
+        with open(path, 'w') as fp:
+            fp.write(content)
+        self.files[name] = path
+
+    def test_initial_load(self):
+        self.assertDictEqual({'faith_pd': 'faith', 'shannon': 'shannon'},
+                             self.root.gets('datasets', '16S',
+                                            '__alpha__').data)
+        self.assertEqual('md2', self.root.gets('datasets', 'WGS',
+                                               '__metadata__').data)
+        self.assertTrue(self.tracker.ready)
+
+    def test_unchanged(self):
+        self.assertListEqual([], self.reloader.plan(self.config))
+
+    def test_changed_file_reloads_only_that_key(self):
+        dataset = self.root['datasets']['16S']
+        wgs = self.root['datasets']['WGS']
+        self.write('shannon', 'shannon, version 2')
+        os.utime(self.files['shannon'], ns=(0, 1))
+
+        changes = self.reloader.plan(self.config)
+        change, = changes
+        self.assertEqual(('datasets', '16S', '__alpha__'), change.path)
+        self.assertListEqual(['shannon'], change.keys)
+
+        self.reloader.reload(changes)
+        self.assertListEqual(['shannon'], self.visitor.loaded)
+        self.assertDictEqual({'faith_pd': 'faith',
+                              'shannon': 'shannon, version 2'},
+                             self.root.gets('datasets', '16S',
+                                            '__alpha__').data)
+        # the dataset was swapped rather than modified in place
+        self.assertIsNot(dataset, self.root['datasets']['16S'])
+        self.assertIs(dataset['__metadata__'],
+                      self.root['datasets']['16S']['__metadata__'])
+        self.assertIs(wgs, self.root['datasets']['WGS'])
+        self.assertListEqual([], self.reloader.plan(self.config))
+
+    def test_added_and_removed_keys(self):
+        alpha = self.config['datasets']['16S']['__alpha__']
+        del alpha['faith_pd']
+        alpha['chao1'] = self.files['chao1']
+        change, = self.reloader.plan(self.config)
+        self.assertListEqual(['chao1'], change.keys)
+        self.assertListEqual(['faith_pd'], change.removed_keys)
+
+        self.reloader.reload([change])
+        self.assertDictEqual({'chao1': 'chao1', 'shannon': 'shannon'},
+                             self.root.gets('datasets', '16S',
+                                            '__alpha__').data)
+
+    def test_added_and_removed_units(self):
+        del self.config['datasets']['WGS']
+        self.config['datasets']['ITS'] = {'__metadata__': self.files['md2']}
+        changes = {change.path: change.kind
+                   for change in self.reloader.plan(self.config)}
+        self.assertDictEqual({('datasets', 'ITS', '__metadata__'): 'full',
+                              ('datasets', 'WGS', '__metadata__'): 'removed'},
+                             changes)
+
+        self.reloader.reload(self.reloader.plan(self.config))
+        self.assertEqual('md2', self.root.gets('datasets', 'ITS',
+                                               '__metadata__').data)
+        self.assertFalse(self.root.has('datasets', 'WGS', '__metadata__'))
+        self.assertNotIn('datasets/WGS/__metadata__',
+                         [unit['resource'] for unit in
+                          self.tracker.summary()['resources']])
+
+    def test_lazy_reload(self):
+        self.reloader.lazy_types = (AlphaElement,)
+        self.write('shannon', 'shannon, version 2')
+        os.utime(self.files['shannon'], ns=(0, 1))
+        change, = self.reloader.plan(self.config)
+        self.assertEqual('full', change.kind)
+
+        self.reloader.reload([change])
+        self.assertListEqual([], self.visitor.loaded)
+        alpha = self.root.gets('datasets', '16S', '__alpha__')
+        self.assertFalse(alpha.loaded)
+        self.assertEqual('shannon, version 2', alpha.data['shannon'])
+        self.assertCountEqual(['faith_pd', 'shannon'], self.visitor.loaded)
+
+    def test_on_publish(self):
+        published = []
+        self.write('md2', 'md2, version 2')
+        os.utime(self.files['md2'], ns=(0, 1))
+        self.reloader.reload(self.reloader.plan(self.config),
+                             on_publish=lambda: published.append(
+                                 self.root.gets('datasets', 'WGS',
+                                                '__metadata__').data))
+        self.assertListEqual(['md2, version 2'], published)
+
+    def test_plan_during_reload(self):
+        with self.reloader._lock:
+            # e.g., a reload in progress
+            self.assertListEqual([], self.reloader.plan(self.config))
+
+    def test_failed_reload_keeps_serving(self):
+        os.remove(self.files['md1'])
+        self.config['datasets']['16S']['__metadata__'] = \
+            os.path.join(self.dir.name, 'dne.txt')
+        published = []
+        with self.assertRaises(FileNotFoundError):
+            self.reloader.reload(self.reloader.plan(self.config),
+                                 on_publish=lambda: published.append(True))
+        self.assertListEqual([], published)
+        self.assertEqual('md1', self.root.gets('datasets', '16S',
+                                               '__metadata__').data)
+        self.assertTrue(self.tracker.ready)
+        self.assertEqual('failed', self.tracker.summary()['status'])
+
+
+class FingerprintTests(TestCase):
+
+    def test_fingerprint(self):
+        with tempfile.NamedTemporaryFile() as fh:
+            obs = fingerprint({'a': fh.name, 'b': [1, 'c']})
+            stat = os.stat(fh.name)
+        self.assertEqual((('a', (fh.name, stat.st_mtime_ns, 0)),
+                          ('b', (1, 'c'))), obs)
+
+    def test_unit_fingerprints(self):
+        resource = SchemaBase().make_elements(
+            {'__alpha__': {'faith_pd': 'a.qza'}})
+        units = resource_units(resource, SchemaBase().element_map().values())
+        self.assertDictEqual({('__alpha__',): {'faith_pd': 'a.qza'}},
+                             unit_fingerprints(units))
@@ -0,0 +1,173 @@
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from flask import Flask, jsonify
+from microsetta_public_api._tracing import (
+    Tracer,
+    TraceStore,
+    Trace,
+    span,
+    traced,
+    current_trace,
+    current_context,
+    continued,
+)
+
+
+@traced()
+def _inner():
+    with span('leaf', size=3):
+        pass
+    return 'inner'
+
+
+@traced('outer')
+def _outer():
+    return _inner()
+
+
+class TracerTests(TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.tracer = Tracer({'enabled': True, 'sample_rate': 1.0})
+        self.tracer.init_app(self.app)
+
+        @self.app.route('/work')
+        def work():
+            return jsonify(_outer())
+
+        @self.app.route('/pool')
+        def pool():
+            def work():
+                with continued(context):
+                    return _outer()
+
+            with span('pool'), ThreadPoolExecutor(2) as executor:
+                context = current_context()
+                results = list(executor.map(lambda _: work(), range(2)))
+            return jsonify(results)
+
+        @self.app.route('/fail')
+        def fail():
+            raise ValueError('fail')
+
+        self.client = self.app.test_client()
+
+    def test_request_id_assigned(self):
+        response = self.client.get('/work')
+        self.assertTrue(response.headers['X-Request-ID'])
+
+    def test_request_id_propagated(self):
+        response = self.client.get('/work',
+                                   headers={'X-Request-ID': 'abc123'})
+        self.assertEqual('abc123', response.headers['X-Request-ID'])
+        obs = self.tracer.store.get('abc123')
+        self.assertEqual('GET /work', obs['name'])
+        self.assertEqual(200, obs['attributes']['status'])
+        self.assertEqual('/work', obs['attributes']['endpoint'])
+
+    def test_invalid_request_id_replaced(self):
+        for request_id in ['a' * 65, 'a b', 'abc/def']:
+            response = self.client.get('/work',
+                                       headers={'X-Request-ID': request_id})
+            obs = response.headers['X-Request-ID']
+            self.assertNotEqual(request_id, obs)
+            self.assertRegex(obs, r'^[0-9a-f]{32}$')
+            self.assertIsNone(self.tracer.store.get(request_id))
+            self.assertIsNotNone(self.tracer.store.get(obs))
+
+    def test_nested_spans(self):
+        self.client.get('/work', headers={'X-Request-ID': 'nested'})
+        obs = self.tracer.store.get('nested')
+        spans = {span_['name']: span_ for span_ in obs['spans']}
+        self.assertCountEqual(['outer', '_inner', 'leaf'], spans.keys())
+        self.assertIsNone(spans['outer']['parent_id'])
+        self.assertEqual(spans['outer']['span_id'],
+                         spans['_inner']['parent_id'])
+        self.assertEqual(spans['_inner']['span_id'],
+                         spans['leaf']['parent_id'])
+        self.assertDictEqual({'size': 3}, spans['leaf']['attributes'])
+        self.assertGreaterEqual(obs['duration_ms'],
+                                spans['outer']['duration_ms'])
+
+    def test_continued_on_other_threads(self):
+        self.client.get('/pool', headers={'X-Request-ID': 'pool'})
+        obs = self.tracer.store.get('pool')
+        names = [span_['name'] for span_ in obs['spans']]
+        self.assertCountEqual(['pool'] + ['outer', '_inner', 'leaf'] * 2,
+                              names)
+        pool_id = next(span_['span_id'] for span_ in obs['spans']
+                       if span_['name'] == 'pool')
+        self.assertListEqual([pool_id] * 2,
+                             [span_['parent_id'] for span_ in obs['spans']
+                              if span_['name'] == 'outer'])
+
+    def test_continued_restores_context(self):
+        trace = Trace('continued', 'GET /continued')
+        with continued((trace, None)):
+            self.assertIs(trace, current_trace())
+            self.assertEqual('inner', _outer())
+        self.assertIsNone(current_trace())
+        self.assertEqual(3, len(trace.spans))
+
+    def test_unsampled(self):
+        self.tracer.sample_rate = 0
+        response = self.client.get('/work')
+        self.assertTrue(response.headers['X-Request-ID'])
+        self.assertListEqual([], self.tracer.store.list())
+
+    def test_forced_sample(self):
+        self.tracer.sample_rate = 0
+        self.client.get('/work', headers={'X-Trace': '1',
+                                          'X-Request-ID': 'forced'})
+        self.assertIsNotNone(self.tracer.store.get('forced'))
+
+    def test_disabled(self):
+        self.tracer.enabled = False
+        self.client.get('/work', headers={'X-Trace': '1'})
+        self.assertListEqual([], self.tracer.store.list())
+
+    def test_disabled_registers_no_hooks(self):
+        app = Flask(__name__)
+        Tracer({'enabled': False}).init_app(app)
+        self.assertListEqual([], app.before_request_funcs.get(None, []))
+        self.assertListEqual([], app.after_request_funcs.get(None, []))
+        self.assertListEqual([], app.teardown_request_funcs.get(None, []))
+        self.assertIn('tracer', app.extensions)
+
+    def test_error_recorded(self):
+        self.client.get('/fail', headers={'X-Request-ID': 'failed'})
+        obs = self.tracer.store.get('failed')
+        self.assertEqual(500, obs['attributes']['status'])
+
+    def test_no_trace_outside_request(self):
+        self.assertIsNone(current_trace())
+        self.assertEqual('inner', _outer())
+
+
+class TraceStoreTests(TestCase):
+
+    def test_ring_buffer(self):
+        store = TraceStore(maxlen=2)
+        for id_ in ['a', 'b', 'c']:
+            trace = Trace(id_, id_)
+            trace.finish()
+            store.add(trace)
+        obs = [trace['trace_id'] for trace in store.list()]
+        self.assertListEqual(['c', 'b'], obs)
+        self.assertIsNone(store.get('a'))
+        self.assertListEqual(['c'], [trace['trace_id'] for trace in
+                                     store.list(limit=1)])
+
+    def test_export_to_file(self):
+        with tempfile.NamedTemporaryFile(suffix='.jsonl') as fh:
+            store = TraceStore(path=fh.name)
+            trace = Trace('a', 'GET /foo')
+            trace.finish()
+            store.add(trace)
+            with open(fh.name) as fp:
+                lines = fp.readlines()
+        self.assertEqual(1, len(lines))
+        self.assertEqual('a', json.loads(lines[0])['trace_id'])
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock
+from microsetta_public_api.config import DictElement, SchemaBase
+from microsetta_public_api._loading import LoadTracker
+from microsetta_public_api._metrics import metrics
+from microsetta_public_api._reload import ResourceReloader
+from microsetta_public_api._watcher import (
+    PollingBackend,
+    ResourceWatcher,
+    referenced_files,
+)
+from microsetta_public_api.tests.test_reload import FileVisitor
+
+
+class WatcherTestCase(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'faith.txt')
+        self.write('faith')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, content):
+        with open(self.path, 'w') as fp:
+            fp.write(content)
+        # make sure the change is visible regardless of mtime resolution
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns,
+                                stat.st_mtime_ns + 1000000000))
+
+
+class ReferencedFilesTests(WatcherTestCase):
+
+    def test_referenced_files(self):
+        missing = os.path.join(self.dir.name, 'dne.qza')
+        config = {'datasets': {'16S': {
+            '__alpha__': {'faith_pd': self.path, 'shannon': missing},
+            '__dataset_detail__': {'title': '16S', 'qiita-study-ids': ['1']},
+        }}}
+        self.assertSetEqual({self.path, missing}, referenced_files(config))
+
+
+class PollingBackendTests(WatcherTestCase):
+
+    def test_wait(self):
+        backend = PollingBackend(interval=0)
+        backend.watch({self.path})
+        stop = threading.Event()
+        self.assertFalse(backend.wait(stop))
+        self.write('faith, version 2')
+        self.assertTrue(backend.wait(stop))
+        self.assertFalse(backend.wait(stop))
+        os.remove(self.path)
+        self.assertTrue(backend.wait(stop))
+
+
+class ResourceWatcherTests(WatcherTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.config = {'datasets': {'16S': {
+            '__alpha__': {'faith_pd': self.path},
+        }}}
+        self.root = DictElement()
+        self.reloader = ResourceReloader(self.root, SchemaBase(), FileVisitor,
+                                         LoadTracker(estimate_memory=False))
+        self.reloader.reload(self.reloader.plan(self.config))
+        self.watcher = ResourceWatcher(self.reloader, lambda: self.config,
+                                       {'debounce': 0.05, 'interval': 0.01,
+                                        'inotify': False})
+
+    def test_check_unchanged(self):
+        self.watcher.backend.watch(set())
+        self.assertListEqual([], self.watcher.check())
+
+    def test_check_logs_failure(self):
+        reloader = MagicMock()
+        reloader.plan.side_effect = ValueError('bad config')
+        watcher = ResourceWatcher(reloader, lambda: self.config,
+                                  {'inotify': False})
+        with self.assertLogs('microsetta_public_api._watcher', 'ERROR'):
+            self.assertListEqual([], watcher.check())
+
+    def test_reload_on_change(self):
+        enabled = metrics.enabled
+        metrics.enabled = True
+        metrics.clear()
+        self.watcher.start()
+        try:
+            self.write('faith, version 2')
+            deadline = time.time() + 5
+            while time.time() < deadline:
+                data = self.root.gets('datasets', '16S', '__alpha__').data
+                if data['faith_pd'] == 'faith, version 2':
+                    break
+                time.sleep(0.01)
+        finally:
+            self.watcher.stop()
+            duration = metrics.reload_duration.get('watch', 'success')
+            metrics.enabled = enabled
+            metrics.clear()
+        self.assertEqual('faith, version 2', data['faith_pd'])
+        self.assertEqual(1, duration['count'])
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+# the ways to choose the points of a downsampled plot
+modes = ('random', 'stratified', 'grid')
+
+
+def downsample(coordinates, max_samples, mode='stratified', groups=None,
+               keep=None, seed=0):
+    """Chooses a subset of the points of an ordination to plot
+
+    The choice only depends on the arguments, so the same points are chosen
+    for the same ordination and seed, and responses built from them can be
+    cached.
+
+    Parameters
+    ----------
+    coordinates : np.ndarray
+        A samples x axes array of coordinates.
+    max_samples : int
+        The maximum number of points to choose.
+    mode : {'random', 'stratified', 'grid'}
+        'random' chooses points uniformly at random. 'stratified' chooses
+        points at random from each group, in proportion to the size of the
+        group, and keeps at least one point of every group if there is
+        room. 'grid' bins the points into a grid over the leading (at most
+        three) axes and keeps one point per occupied cell, which keeps the
+        outline of sparse regions.
+    groups : array-like, optional
+        The group (e.g., metadata value) of each point, required for
+        'stratified'.
+    keep : array-like of int, optional
+        Positions of points that are always chosen, e.g., the sample of the
+        participant viewing the plot.
+    seed : int
+        Seeds the random choices.
+
+    Returns
+    -------
+    np.ndarray of int
+        The positions of the chosen points, in ascending order.
+
+    Raises
+    ------
+    ValueError
+        If the mode is unknown, or groups are missing for 'stratified'
+
+    """
+    if mode not in modes:
+        raise ValueError(f"Unknown downsampling mode: '{mode}'. Available "
+                         f"modes: {list(modes)}")
+    if mode == 'stratified' and groups is None:
+        raise ValueError("'stratified' downsampling requires groups")
+    n_samples = len(coordinates)
+    if n_samples <= max_samples:
+        return np.arange(n_samples)
+
+    keep = np.unique(np.asarray([] if keep is None else keep, dtype=int))
+    budget = max_samples - len(keep)
+    if budget <= 0:
+        return keep[:max_samples]
+    pool = np.setdiff1d(np.arange(n_samples), keep, assume_unique=True)
+
+    rng = np.random.RandomState(seed)
+    if mode == 'random':
+        chosen = rng.choice(pool, budget, replace=False)
+    elif mode == 'stratified':
+        codes, _ = pd.factorize(np.asarray(groups, dtype=object)[pool])
+        chosen = _stratified(pool, codes, budget, rng)
+    else:
+        chosen = _grid(coordinates[pool], pool, budget, rng)
+    return np.sort(np.concatenate([keep, chosen]))
+
+
+def _stratified(pool, codes, budget, rng):
+    # missing values are a group of their own
+    codes = np.where(codes < 0, codes.max() + 1, codes)
+    counts = np.bincount(codes)
+    quotas = _allocate(counts, budget)
+
+    # a random order within each group, so the first quota of each group
+    #  are a random sample of it
+    order = rng.permutation(len(pool))
+    order = order[np.argsort(codes[order], kind='stable')]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    ranks = np.arange(len(order)) - starts[codes[order]]
+    return pool[order[ranks < quotas[codes[order]]]]
+
+
+def _allocate(counts, budget):
+    """Splits a budget between groups in proportion to their size
+
+    Uses the largest remainder method, then moves points from the largest
+    quotas to groups that got none, so that small groups stay visible.
+    """
+    shares = counts * budget / counts.sum()
+    quotas = np.floor(shares).astype(int)
+    remainder = budget - quotas.sum()
+    quotas[np.argsort(quotas - shares, kind='stable')[:remainder]] += 1
+
+    missing = np.flatnonzero((quotas == 0) & (counts > 0))
+    if len(missing) <= budget - np.count_nonzero(quotas):
+        for group in missing:
+            quotas[np.argmax(quotas)] -= 1
+            quotas[group] = 1
+    return quotas
+
+
+def _grid(coordinates, pool, budget, rng):
+    coordinates = coordinates[:, :3]
+    n_dims = coordinates.shape[1]
+    # at most budget cells, so one point per cell fits the budget
+    n_bins = max(1, int(budget ** (1 / n_dims)))
+    low = coordinates.min(axis=0)
+    span = coordinates.max(axis=0) - low
+    span[span == 0] = 1
+    bins = np.minimum(((coordinates - low) / span * n_bins).astype(int),
+                      n_bins - 1)
+    cells = np.ravel_multi_index(bins.T, (n_bins,) * n_dims)
+
+    order = rng.permutation(len(pool))
+    _, first = np.unique(cells[order], return_index=True)
+    return pool[order[first]]
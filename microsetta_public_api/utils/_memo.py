@@ -0,0 +1,76 @@
+import threading
+import weakref
+
+
+class DerivedCache:
+    """Caches values derived from objects for as long as the objects live
+
+    Loaded resources are replaced rather than modified, so a value derived
+    from one (e.g., an index over a metadata frame) stays valid until the
+    resource is garbage collected, at which point it is dropped.
+
+    Examples
+    --------
+    >>> stats = derived.get(metadata, 'stats', lambda md: md.describe())
+
+    """
+
+    def __init__(self):
+        self._entries = dict()
+        self._lock = threading.Lock()
+
+    def get(self, obj, name, compute):
+        """Gets the value derived from obj, computing it if needed
+
+        Parameters
+        ----------
+        obj : object
+            The object the value is derived from. Values derived from objects
+            that do not support weak references (e.g., plain dicts) are
+            computed on every call.
+        name : str
+            Identifies the derived value.
+        compute : callable
+            Computes the value from obj.
+
+        Returns
+        -------
+        object
+            The derived value.
+
+        """
+        key = id(obj)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                try:
+                    weakref.finalize(obj, self._discard, key)
+                except TypeError:
+                    entry = None
+                else:
+                    entry = self._entries[key] = dict()
+            elif name in entry:
+                return entry[name]
+        if entry is None:
+            return compute(obj)
+        # computed outside of the lock so that slow computations for
+        # different objects do not block each other
+        value = compute(obj)
+        with self._lock:
+            return entry.setdefault(name, value)
+
+    def _discard(self, key):
+        # finalizers can run on any allocation, including in get while the
+        # lock is held by the same thread, so this does not take the lock.
+        #  A single dict pop is atomic.
+        self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+derived = DerivedCache()
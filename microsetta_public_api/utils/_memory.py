@@ -0,0 +1,103 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import scipy.sparse as ss
+
+_CONTAINERS = (dict, list, tuple, set, frozenset)
+
+
+def estimate_size(obj, seen=None):
+    """Estimates the number of bytes held by an object and its references
+
+    Handles the types that make up loaded resources (pandas objects, numpy
+    arrays, scipy sparse matrices, and objects composed of them such as
+    biom tables, skbio distance matrices and ordinations, and models) by
+    recursing into containers and instance attributes. Objects reachable
+    through several references are only counted once.
+
+    Parameters
+    ----------
+    obj : object
+        The object to size.
+    seen : set of int, optional
+        ids of objects that have already been counted.
+
+    Returns
+    -------
+    int
+        The estimated size in bytes.
+
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    # iterative rather than recursive as model objects (e.g., trees) can be
+    #  deeper than the recursion limit
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if obj is None or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += _shallow_size(obj, stack)
+    return size
+
+
+def _shallow_size(obj, stack):
+    """Sizes obj, pushing anything it references that needs sizing"""
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            stack.extend(obj.flat)
+        return obj.nbytes
+    if ss.issparse(obj):
+        return sum(getattr(obj, attr).nbytes for attr in
+                   ('data', 'indices', 'indptr', 'row', 'col')
+                   if hasattr(obj, attr))
+    if isinstance(obj, (str, bytes, int, float, bool)):
+        return sys.getsizeof(obj)
+
+    if isinstance(obj, dict):
+        stack.extend(obj.keys())
+        stack.extend(obj.values())
+    elif isinstance(obj, _CONTAINERS):
+        stack.extend(obj)
+
+    attributes = getattr(obj, '__dict__', None)
+    if attributes is not None:
+        stack.extend(attributes.values())
+    slots = getattr(type(obj), '__slots__', ())
+    if isinstance(slots, str):
+        slots = (slots,)
+    stack.extend(getattr(obj, slot, None) for slot in slots)
+    return sys.getsizeof(obj)
+
+
+def process_memory():
+    """Reports the resident set size of the current process
+
+    Returns
+    -------
+    dict
+        'rss_bytes' (current, None if unavailable) and 'peak_rss_bytes'.
+
+    """
+    rss = None
+    try:
+        with open('/proc/self/statm') as fp:
+            rss = int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on linux, bytes on macOS
+        if sys.platform != 'darwin':
+            peak *= 1024
+    except ImportError:
+        peak = None
+    return {'rss_bytes': rss, 'peak_rss_bytes': peak}
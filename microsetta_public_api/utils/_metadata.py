@@ -0,0 +1,51 @@
+import sys
+import pandas as pd
+
+
+def compact_metadata(metadata, max_unique_fraction=0.5):
+    """Reduces the memory held by the text columns of a metadata frame
+
+    Text columns with few distinct values relative to their length are
+    stored as categoricals, so each value is stored once and each sample
+    holds a small integer code. Other text columns have their strings
+    interned, so repeated values share a single object. Numeric columns
+    are left as they are.
+
+    Parameters
+    ----------
+    metadata : pd.DataFrame
+        Metadata, as returned by ``qiime2.Metadata.to_dataframe``.
+    max_unique_fraction : float
+        Text columns with at most this fraction of distinct values are
+        stored as categoricals.
+
+    Returns
+    -------
+    pd.DataFrame
+        The metadata with compacted columns. Values and missing values are
+        unchanged.
+
+    """
+    columns = dict()
+    for name, column in metadata.items():
+        if not _is_text(column):
+            columns[name] = column
+        elif column.nunique(dropna=True) <= max_unique_fraction * len(column):
+            columns[name] = column.astype('category')
+        else:
+            columns[name] = column.map(_intern)
+    compacted = pd.DataFrame(columns, index=metadata.index)
+    compacted.columns = metadata.columns
+    return compacted
+
+
+def _is_text(column):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return False
+    return column.dtype == object or pd.api.types.is_string_dtype(column)
+
+
+def _intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
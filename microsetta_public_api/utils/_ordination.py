@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+
+class CompactOrdination:
+    """The leading axes of an ordination, with float32 coordinates
+
+    Has the attributes of `skbio.OrdinationResults` that are used to plot
+    and query ordinations, so it can be served in place of one.
+
+    Parameters
+    ----------
+    short_method_name, long_method_name : str
+        As for `skbio.OrdinationResults`.
+    ids : pd.Index
+        The sample IDs, one per row of `coordinates`.
+    coordinates : np.ndarray
+        A C-contiguous samples x axes array of float32 coordinates.
+    axis_labels : pd.Index
+        The labels of the axes, e.g., the columns of the samples of the
+        original ordination.
+    eigvals : pd.Series
+        The eigenvalues of the axes.
+    proportion_explained : pd.Series
+        The proportion of variation explained by each axis.
+    """
+
+    features = None
+    biplot_scores = None
+    sample_constraints = None
+
+    def __init__(self, short_method_name, long_method_name, ids, coordinates,
+                 axis_labels, eigvals, proportion_explained):
+        self.short_method_name = short_method_name
+        self.long_method_name = long_method_name
+        self.ids = ids
+        self.coordinates = coordinates
+        self.axis_labels = axis_labels
+        self.eigvals = eigvals
+        self.proportion_explained = proportion_explained
+
+    @property
+    def samples(self):
+        """The coordinates as a frame, which shares their memory"""
+        return pd.DataFrame(self.coordinates, index=self.ids,
+                            columns=self.axis_labels, copy=False)
+
+
+def compact_ordination(ordination, n_axes=10):
+    """Keeps the leading axes of an ordination as float32
+
+    Ordinations from a principal coordinates analysis have as many axes as
+    samples, stored as float64, while plots and queries use at most the
+    first few axes.
+
+    Parameters
+    ----------
+    ordination : skbio.OrdinationResults
+        The ordination.
+    n_axes : int
+        The number of leading axes to keep.
+
+    Returns
+    -------
+    CompactOrdination
+
+    """
+    samples = ordination.samples
+    coordinates = np.ascontiguousarray(samples.values[:, :n_axes],
+                                       dtype=np.float32)
+    axis_labels = samples.columns[:n_axes]
+    eigvals = ordination.eigvals
+    if eigvals is not None:
+        eigvals = eigvals.iloc[:n_axes].copy()
+    proportion_explained = ordination.proportion_explained
+    if proportion_explained is not None:
+        proportion_explained = proportion_explained.iloc[:n_axes].copy()
+    return CompactOrdination(ordination.short_method_name,
+                             ordination.long_method_name,
+                             samples.index.copy(), coordinates, axis_labels,
+                             eigvals, proportion_explained)
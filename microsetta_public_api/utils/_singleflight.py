@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Shares one computation between concurrent identical calls
+
+    The first call for a key computes the value, while calls for the same
+    key that arrive before it finishes wait for, and return, that value (or
+    raise its exception). Nothing is kept once the computation finishes, so
+    a later call computes the value again.
+
+    Keys often include the `id` of the resources a value is computed from,
+    so that computations over reloaded resources are not shared with those
+    over the resources they replace. This is safe as long as `compute`
+    references the resources, which then outlive the key.
+
+    Examples
+    --------
+    >>> summary = flights.do(('group', id(table), tuple(ids)),
+    ...                      lambda: summarize(table, ids))
+
+    """
+
+    def __init__(self):
+        self._flights = dict()
+        self._lock = threading.Lock()
+
+    def do(self, key, compute):
+        """Computes a value, or waits for the identical computation
+
+        Parameters
+        ----------
+        key : hashable
+            Identifies the computation.
+        compute : callable
+            Computes the value, called without arguments.
+
+        Returns
+        -------
+        object
+            The value, which may be shared with concurrent callers and so
+            should not be modified.
+
+        """
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            value = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    def __len__(self):
+        return len(self._flights)
+
+
+flights = SingleFlight()
@@ -1,12 +1,15 @@
 from collections import namedtuple
 from flask import jsonify as flask_jsonify
 from microsetta_public_api.exceptions import UnknownResource, UnknownID
+from microsetta_public_api._tracing import span, traced
 
 
 def jsonify(*args, **kwargs):
-    return flask_jsonify(*args, **kwargs)
+    with span('jsonify'):
+        return flask_jsonify(*args, **kwargs)
 
 
+@traced()
 def stepwise_resource_getter(resources, dataset, keyword, type_):
     try:
         dataset_resource = resources.gets('datasets', dataset)
@@ -0,0 +1,95 @@
+from unittest import TestCase
+import numpy as np
+import numpy.testing as npt
+from microsetta_public_api.utils._downsample import downsample, _allocate
+
+
+class DownsampleTests(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.coordinates = rng.normal(size=(1000, 5))
+        # 90% a, 9% b, 1% c
+        self.groups = np.array(['a'] * 900 + ['b'] * 90 + ['c'] * 10,
+                               dtype=object)
+
+    def test_small_is_unchanged(self):
+        obs = downsample(self.coordinates[:10], 20, mode='random')
+        npt.assert_array_equal(np.arange(10), obs)
+
+    def test_random(self):
+        obs = downsample(self.coordinates, 100, mode='random')
+        self.assertEqual(100, len(obs))
+        self.assertEqual(100, len(np.unique(obs)))
+        self.assertTrue(np.all(np.diff(obs) > 0))
+
+    def test_deterministic(self):
+        for mode in ('random', 'stratified', 'grid'):
+            first = downsample(self.coordinates, 100, mode=mode,
+                               groups=self.groups, seed=3)
+            second = downsample(self.coordinates, 100, mode=mode,
+                                groups=self.groups, seed=3)
+            npt.assert_array_equal(first, second)
+        other = downsample(self.coordinates, 100, mode='random', seed=4)
+        self.assertFalse(np.array_equal(
+            downsample(self.coordinates, 100, mode='random', seed=3), other))
+
+    def test_stratified_proportions(self):
+        obs = downsample(self.coordinates, 100, mode='stratified',
+                         groups=self.groups)
+        self.assertEqual(100, len(obs))
+        values, counts = np.unique(self.groups[obs], return_counts=True)
+        self.assertDictEqual({'a': 90, 'b': 9, 'c': 1},
+                             dict(zip(values, counts)))
+
+    def test_stratified_keeps_small_groups(self):
+        groups = self.groups.copy()
+        groups[-1] = 'd'
+        obs = downsample(self.coordinates, 20, mode='stratified',
+                         groups=groups)
+        self.assertEqual(20, len(obs))
+        self.assertSetEqual({'a', 'b', 'c', 'd'}, set(groups[obs]))
+
+    def test_stratified_missing_values(self):
+        groups = self.groups.copy()
+        groups[:500] = None
+        obs = downsample(self.coordinates, 100, mode='stratified',
+                         groups=groups)
+        self.assertEqual(100, len(obs))
+        self.assertEqual(50, sum(group is None for group in groups[obs]))
+
+    def test_stratified_requires_groups(self):
+        with self.assertRaises(ValueError):
+            downsample(self.coordinates, 100, mode='stratified')
+
+    def test_grid(self):
+        rng = np.random.RandomState(0)
+        # a dense cluster, and a sparse ring of outliers around it
+        angles = np.linspace(0, 6, 10)
+        coordinates = np.vstack([
+            rng.normal(scale=0.01, size=(990, 2)),
+            np.column_stack([np.cos(angles), np.sin(angles)]) * 10,
+        ])
+        obs = downsample(coordinates, 64, mode='grid')
+        self.assertLessEqual(len(obs), 64)
+        # each outlier is in a cell of its own, unlike the cluster
+        npt.assert_array_equal(np.arange(990, 1000), obs[obs >= 990])
+        self.assertLess(np.sum(obs < 990), 10)
+
+    def test_keep(self):
+        for mode in ('random', 'stratified', 'grid'):
+            obs = downsample(self.coordinates, 50, mode=mode,
+                             groups=self.groups, keep=[7, 995])
+            self.assertIn(7, obs)
+            self.assertIn(995, obs)
+            self.assertLessEqual(len(obs), 50)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            downsample(self.coordinates, 100, mode='dne')
+
+    def test_allocate(self):
+        npt.assert_array_equal([5, 3, 2],
+                               _allocate(np.array([50, 30, 20]), 10))
+        npt.assert_array_equal([8, 1, 1],
+                               _allocate(np.array([97, 2, 1]), 10))
@@ -0,0 +1,61 @@
+import gc
+import threading
+from unittest import TestCase
+import pandas as pd
+from microsetta_public_api.utils._memo import DerivedCache
+
+
+class DerivedCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = DerivedCache()
+        self.calls = []
+
+    def compute(self, obj):
+        self.calls.append(len(obj))
+        return len(obj)
+
+    def test_computed_once_per_object(self):
+        df1 = pd.DataFrame({'a': [1, 2, 3]})
+        df2 = pd.DataFrame({'a': [1, 2]})
+        self.assertEqual(3, self.cache.get(df1, 'len', self.compute))
+        self.assertEqual(3, self.cache.get(df1, 'len', self.compute))
+        self.assertEqual(2, self.cache.get(df2, 'len', self.compute))
+        self.assertEqual(2, len(self.calls))
+
+    def test_names_are_separate(self):
+        df = pd.DataFrame({'a': [1, 2, 3]})
+        self.cache.get(df, 'len', self.compute)
+        self.assertEqual(['a'], self.cache.get(df, 'columns',
+                                               lambda x: list(x.columns)))
+
+    def test_dropped_with_object(self):
+        df = pd.DataFrame({'a': [1, 2, 3]})
+        self.cache.get(df, 'len', self.compute)
+        self.assertEqual(1, len(self.cache))
+        del df
+        gc.collect()
+        self.assertEqual(0, len(self.cache))
+
+    def test_finalized_while_locked(self):
+        df = pd.DataFrame({'a': [1, 2, 3]})
+        self.cache.get(df, 'len', self.compute)
+
+        def finalize_while_locked():
+            nonlocal df
+            # e.g., garbage collected during an allocation in get
+            with self.cache._lock:
+                del df
+
+        thread = threading.Thread(target=finalize_while_locked, daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(0, len(self.cache))
+
+    def test_not_weakly_referenceable(self):
+        obj = {'a': 1}
+        self.assertEqual(1, self.cache.get(obj, 'len', self.compute))
+        self.assertEqual(1, self.cache.get(obj, 'len', self.compute))
+        self.assertEqual(2, len(self.calls))
+        self.assertEqual(0, len(self.cache))
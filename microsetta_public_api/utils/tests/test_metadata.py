@@ -0,0 +1,44 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from microsetta_public_api.utils._metadata import compact_metadata
+
+
+class CompactMetadataTests(TestCase):
+
+    def setUp(self):
+        n = 100
+        self.metadata = pd.DataFrame({
+            'body_site': ['UBERON:feces', 'UBERON:skin'] * (n // 2),
+            'host_subject_id': [f'subject-{i}' for i in range(n)],
+            'age': np.arange(n, dtype=float),
+        }, index=pd.Index([f's{i}' for i in range(n)], name='#SampleID'))
+        self.metadata.loc['s3', 'body_site'] = np.nan
+
+    def test_compact_metadata(self):
+        obs = compact_metadata(self.metadata)
+        self.assertIsInstance(obs['body_site'].dtype, pd.CategoricalDtype)
+        self.assertNotIsInstance(obs['host_subject_id'].dtype,
+                                 pd.CategoricalDtype)
+        self.assertEqual(np.float64, obs['age'].dtype)
+        self.assertTrue(pd.isnull(obs.loc['s3', 'body_site']))
+        assert_frame_equal(self.metadata, obs.astype(
+            {'body_site': self.metadata['body_site'].dtype}))
+        self.assertListEqual(list(self.metadata.columns), list(obs.columns))
+        self.assertEqual('#SampleID', obs.index.name)
+
+    def test_memory_reduced(self):
+        obs = compact_metadata(self.metadata)
+        self.assertLess(obs['body_site'].memory_usage(deep=True),
+                        self.metadata['body_site'].memory_usage(deep=True))
+
+    def test_interned(self):
+        metadata = pd.DataFrame({'a': [''.join(['x', str(i % 2)])
+                                       for i in range(4)]}, dtype=object)
+        obs = compact_metadata(metadata, max_unique_fraction=0)
+        self.assertIs(obs['a'].iloc[0], obs['a'].iloc[2])
+
+    def test_empty(self):
+        obs = compact_metadata(pd.DataFrame())
+        self.assertEqual((0, 0), obs.shape)
@@ -0,0 +1,67 @@
+from unittest import TestCase
+import numpy as np
+import numpy.testing as npt
+import pandas as pd
+from skbio import OrdinationResults
+from microsetta_public_api.models._beta import OrdinationNeighbors
+from microsetta_public_api.utils._ordination import compact_ordination
+
+
+class CompactOrdinationTests(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        n_samples = 20
+        self.samples = pd.DataFrame(
+            rng.normal(size=(n_samples, n_samples)),
+            index=[f's{i}' for i in range(n_samples)],
+        )
+        eigvals = pd.Series(np.arange(n_samples, 0, -1, dtype=float))
+        self.ordination = OrdinationResults(
+            'PCoA', 'Principal Coordinate Analysis',
+            eigvals=eigvals,
+            samples=self.samples,
+            proportion_explained=eigvals / eigvals.sum(),
+        )
+
+    def test_compact_ordination(self):
+        obs = compact_ordination(self.ordination, n_axes=3)
+        self.assertEqual('PCoA', obs.short_method_name)
+        self.assertEqual(np.float32, obs.coordinates.dtype)
+        self.assertTrue(obs.coordinates.flags['C_CONTIGUOUS'])
+        self.assertEqual((20, 3), obs.coordinates.shape)
+        npt.assert_allclose(self.samples.values[:, :3], obs.coordinates,
+                            rtol=1e-6)
+        self.assertListEqual([20., 19., 18.], list(obs.eigvals))
+        self.assertEqual(3, len(obs.proportion_explained))
+
+    def test_samples(self):
+        obs = compact_ordination(self.ordination, n_axes=2)
+        samples = obs.samples
+        self.assertListEqual(list(self.samples.index), list(samples.index))
+        self.assertListEqual([0, 1], list(samples.columns))
+        self.assertTrue(np.shares_memory(samples.values, obs.coordinates))
+
+    def test_fewer_axes_than_requested(self):
+        obs = compact_ordination(self.ordination, n_axes=50)
+        self.assertEqual((20, 20), obs.coordinates.shape)
+
+    def test_neighbors(self):
+        compact = compact_ordination(self.ordination, n_axes=10)
+        exp = OrdinationNeighbors(self.ordination).k_nearest(['s0', 's5'],
+                                                             k=3)
+        obs = OrdinationNeighbors(compact).k_nearest(['s0', 's5'], k=3)
+        self.assertDictEqual(exp, obs)
+
+    def test_neighbors_share_coordinates(self):
+        compact = compact_ordination(self.ordination, n_axes=10)
+        neighbors = OrdinationNeighbors(compact)
+        self.assertEqual(np.float32, neighbors.coordinates.dtype)
+        self.assertTrue(np.shares_memory(compact.coordinates,
+                                         neighbors.coordinates))
+        # KD-trees, which copy the coordinates, are only built when used
+        self.assertIsNone(neighbors._tree)
+        neighbors.in_box([-1, -1], [1, 1])
+        self.assertIsNone(neighbors._tree)
+        neighbors.k_nearest(['s0'], k=3)
+        self.assertIsNotNone(neighbors._tree)
@@ -0,0 +1,78 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from microsetta_public_api.utils._singleflight import SingleFlight
+
+
+class SingleFlightTests(TestCase):
+
+    def setUp(self):
+        self.flights = SingleFlight()
+        self.release = threading.Event()
+        self.calls = []
+
+    def compute(self, value):
+        def _compute():
+            self.calls.append(value)
+            self.release.wait(5)
+            return {'value': value}
+        return _compute
+
+    def run_concurrently(self, keys):
+        with ThreadPoolExecutor(max_workers=len(keys)) as executor:
+            futures = [executor.submit(self.flights.do, key,
+                                       self.compute(key))
+                       for key in keys]
+            while len(self.calls) < len(set(keys)):
+                time.sleep(0.01)
+            # gives the other calls time to wait for the computations
+            time.sleep(0.1)
+            self.release.set()
+            return [future.result(timeout=5) for future in futures]
+
+    def test_do(self):
+        self.release.set()
+        self.assertDictEqual({'value': 'a'},
+                             self.flights.do('a', self.compute('a')))
+        self.assertEqual(0, len(self.flights))
+
+    def test_concurrent_calls_share_value(self):
+        obs = self.run_concurrently(['a'] * 8)
+        self.assertListEqual(['a'], self.calls)
+        self.assertTrue(all(value is obs[0] for value in obs))
+        self.assertEqual(0, len(self.flights))
+
+    def test_different_keys(self):
+        obs = self.run_concurrently(['a', 'b', 'a', 'b'])
+        self.assertListEqual(['a', 'b'], sorted(self.calls))
+        self.assertListEqual(['a', 'b', 'a', 'b'],
+                             [value['value'] for value in obs])
+
+    def test_later_calls_compute_again(self):
+        self.release.set()
+        self.flights.do('a', self.compute('a'))
+        self.flights.do('a', self.compute('a'))
+        self.assertListEqual(['a', 'a'], self.calls)
+
+    def test_exception_is_shared(self):
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            self.release.wait(5)
+            raise ValueError('failed')
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(self.flights.do, 'a', fail)
+            started.wait(5)
+            follower = executor.submit(self.flights.do, 'a',
+                                       self.compute('a'))
+            time.sleep(0.1)
+            self.release.set()
+            with self.assertRaisesRegex(ValueError, 'failed'):
+                leader.result(timeout=5)
+            with self.assertRaises(ValueError):
+                follower.result(timeout=5)
+        self.assertListEqual([], self.calls)
+        self.assertEqual(0, len(self.flights))
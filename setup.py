@@ -31,6 +31,11 @@ setup(
         'jsonschema',
         'empress>=1.1.0',
     ],
+    extras_require={
+        'compression': ['brotli', 'zstandard'],
+        'watch': ['inotify_simple'],
+        'asgi': ['asgiref>=3.7,<4'],
+    },
     package_data={'microsetta_public_api':
                   [
                      'api/microsetta_public_api.yml',